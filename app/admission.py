@@ -0,0 +1,99 @@
+"""
+Prazos por pedido e controlo de admissão.
+
+Cada pedido de classificação recebe um prazo (header ``X-Request-Timeout-Ms``
+ou ``REQUEST_TIMEOUT_MS``), propagado até ao micro-batcher e ao executor:
+trabalho cujo prazo já expirou é descartado antes da inferência, em vez de
+gastar CPU numa resposta que o cliente já não espera.
+
+O :class:`AdmissionController` limita os pedidos de inferência em curso;
+acima do limite os novos pedidos são rejeitados de imediato (429), o que
+mantém a fila — e portanto a latência dos pedidos aceites — limitada.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from app.utils.metrics import ADMISSION_IN_FLIGHT, REQUEST_QUEUE_SECONDS, REQUESTS_SHED
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+
+class DeadlineExceededError(RuntimeError):
+    """O prazo do pedido expirou antes de a inferência começar."""
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Pedido rejeitado porque a fila de inferência está acima do limite."""
+
+
+class Deadline:
+    """Prazo de um pedido, em tempo ``time.monotonic()`` (partilhado entre processos)."""
+
+    __slots__ = ("started_at", "expires_at")
+
+    def __init__(self, timeout_seconds: Optional[float], started_at: Optional[float] = None) -> None:
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.expires_at = None if timeout_seconds is None else self.started_at + timeout_seconds
+
+    @classmethod
+    def from_timeout_ms(cls, header_value: Optional[float], default_ms: Optional[float]) -> "Deadline":
+        """Usa o valor do header quando presente e positivo; caso contrário o valor por omissão."""
+        timeout_ms = header_value if header_value is not None and header_value > 0 else default_ms
+        return cls(None if timeout_ms is None else timeout_ms / 1000.0)
+
+    def renewed(self) -> "Deadline":
+        """Novo prazo com a mesma duração, a contar de agora (cada bloco de um stream)."""
+        timeout = None if self.expires_at is None else self.expires_at - self.started_at
+        return Deadline(timeout)
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def start_inference(self) -> None:
+        """
+        Marca o início da inferência: regista o tempo em fila e lança
+        :class:`DeadlineExceededError` se o prazo já passou.
+        """
+        now = time.monotonic()
+        REQUEST_QUEUE_SECONDS.observe(now - self.started_at)
+        if self.expires_at is not None and now >= self.expires_at:
+            REQUESTS_SHED.labels(reason="deadline_expired").inc()
+            raise DeadlineExceededError(
+                f"Prazo do pedido expirou há {(now - self.expires_at) * 1000:.1f} ms"
+            )
+
+
+class AdmissionController:
+    """Limita o número de pedidos de inferência admitidos em simultâneo."""
+
+    def __init__(self, max_in_flight: int) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight deve ser >= 1")
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        """Admite um pedido ou lança :class:`AdmissionRejectedError` (sem esperar)."""
+        if self._in_flight >= self.max_in_flight:
+            REQUESTS_SHED.labels(reason="queue_full").inc()
+            raise AdmissionRejectedError(
+                f"Fila de inferência cheia ({self._in_flight} pedidos em curso)"
+            )
+        self._in_flight += 1
+        ADMISSION_IN_FLIGHT.set(self._in_flight)
+
+    def release(self) -> None:
+        self._in_flight = max(self._in_flight - 1, 0)
+        ADMISSION_IN_FLIGHT.set(self._in_flight)
@@ -0,0 +1,180 @@
+"""
+Agregação dinâmica de pedidos concorrentes (micro-batching).
+
+Pedidos de `/predict` que chegam dentro de uma janela curta (ou até atingir o
+tamanho máximo do lote) são empilhados numa única matriz e classificados numa
+só chamada ao modelo; cada pedido recebe a sua própria linha do resultado.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from app.admission import Deadline, DeadlineExceededError
+from app.utils.metrics import (
+    MICROBATCH_MAX_SIZE,
+    MICROBATCH_QUEUE_DEPTH,
+    MICROBATCH_SIZE,
+    MICROBATCH_WAIT_SECONDS,
+    MICROBATCH_WINDOW_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+ScoreFunction = Callable[
+    [np.ndarray], Union[List[Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]
+]
+_PendingItem = Tuple[np.ndarray, "asyncio.Future[Dict[str, Any]]", float, Optional[Deadline]]
+
+
+class MicroBatcher:
+    """Agrupa linhas submetidas concorrentemente e classifica-as em lote."""
+
+    def __init__(self, score_fn: ScoreFunction, window_ms: float = 2.0, max_batch_size: int = 64) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser >= 1")
+        self.score_fn = score_fn
+        self.window_seconds = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[Optional[_PendingItem]] | None = None
+        self._batch_full: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._draining = False
+
+        MICROBATCH_WINDOW_SECONDS.set(self.window_seconds)
+        MICROBATCH_MAX_SIZE.set(self.max_batch_size)
+
+    async def submit(self, row: np.ndarray, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Submete uma linha de features e aguarda o respectivo resultado.
+
+        Linhas cujo ``deadline`` expirou antes de o lote ser classificado são
+        retiradas do lote e recebem :class:`DeadlineExceededError`.
+        """
+        queue = self._ensure_worker()
+        future: asyncio.Future[Dict[str, Any]] = asyncio.get_running_loop().create_future()
+        queue.put_nowait((row, future, time.perf_counter(), deadline))
+        MICROBATCH_QUEUE_DEPTH.set(queue.qsize())
+        if queue.qsize() >= self.max_batch_size - 1:
+            self._batch_full.set()
+        return await future
+
+    async def close(self, drain: bool = False) -> None:
+        """
+        Termina o worker; pedidos pendentes recebem erro.
+
+        Com ``drain`` os pedidos já em fila são classificados antes de o
+        worker terminar (troca do modelo: ver ``swap_model`` em ``app/main.py``).
+        """
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        if drain and not worker.done():
+            # Marca o fim da fila: o worker despacha o que está antes e termina.
+            self._draining = True
+            self._queue.put_nowait(None)
+            self._batch_full.set()
+            await asyncio.wait([worker])
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher encerrado"))
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        # Recria o worker se o loop mudou (p.ex. entre clientes de teste).
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._batch_full = asyncio.Event()
+            self._draining = False
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def _run(self) -> None:
+        queue = self._queue
+        batch_full = self._batch_full
+        while True:
+            first = await queue.get()
+            if first is None:
+                return
+            if self.window_seconds > 0 and not self._draining and queue.qsize() < self.max_batch_size - 1:
+                batch_full.clear()
+                try:
+                    await asyncio.wait_for(batch_full.wait(), self.window_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [first]
+            closing = False
+            while len(batch) < self.max_batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            MICROBATCH_QUEUE_DEPTH.set(queue.qsize())
+            # O lote seguinte pode formar-se enquanto este é classificado.
+            task = asyncio.get_running_loop().create_task(self._score_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            if closing:
+                return
+
+    async def _score_batch(self, batch: List[_PendingItem]) -> None:
+        live: List[_PendingItem] = []
+        for item in batch:
+            future, deadline = item[1], item[3]
+            if future.done():
+                continue
+            if deadline is not None:
+                try:
+                    deadline.start_inference()
+                except DeadlineExceededError as exc:
+                    future.set_exception(exc)
+                    continue
+            live.append(item)
+        batch = live
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, enqueued_at, _ in batch:
+            MICROBATCH_WAIT_SECONDS.observe(started - enqueued_at)
+        MICROBATCH_SIZE.observe(len(batch))
+
+        try:
+            matrix = np.stack([item[0] for item in batch])
+            results = await self._execute(matrix)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Falha ao classificar micro-lote de %d linhas: %s", len(batch), exc)
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _execute(self, matrix: np.ndarray) -> List[Dict[str, Any]]:
+        result = self.score_fn(matrix)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
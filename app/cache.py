@@ -0,0 +1,134 @@
+"""
+Cache em processo dos resultados de predição.
+
+A chave é um hash do vector de features já ordenado segundo
+``CANONICAL_FEATURES`` (opcionalmente quantizado), combinado com a versão
+do modelo e com o token de carregamento do modelo. Um modelo recarregado
+recebe um novo token, pelo que as entradas antigas deixam de ser servidas
+e são removidas por :meth:`PredictionCache.invalidate_model`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import (
+    PREDICTION_CACHE_BYTES,
+    PREDICTION_CACHE_ENTRIES,
+    PREDICTION_CACHE_EVICTIONS,
+    PREDICTION_CACHE_HITS,
+    PREDICTION_CACHE_MISSES,
+)
+
+_CacheKey = Tuple[int, str, bytes]
+_CacheEntry = Tuple[Dict[str, Any], float, int]  # (resultado, expira_em, bytes)
+
+
+def _estimate_size(value: Any) -> int:
+    """Estimativa (aproximada) da memória ocupada por um resultado."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(key) + _estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+
+class PredictionCache:
+    """Cache LRU com TTL, limitada em número de entradas e em bytes."""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        quantize_decimals: Optional[int] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.quantize_decimals = quantize_decimals
+        self._entries: "OrderedDict[_CacheKey, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def make_key(self, model, feature_vector: np.ndarray) -> _CacheKey:
+        row = np.asarray(feature_vector, dtype=np.float32)
+        if self.quantize_decimals is not None:
+            row = np.round(row, self.quantize_decimals)
+        # Soma 0.0 para que -0.0 e 0.0 produzam a mesma chave.
+        digest = hashlib.blake2b((row + 0.0).tobytes(), digest_size=16).digest()
+        return (model.load_token, model.model_version, digest)
+
+    def get(self, model, feature_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        key = self.make_key(model, feature_vector)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                PREDICTION_CACHE_MISSES.inc()
+                return None
+            result, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                PREDICTION_CACHE_EVICTIONS.labels(reason="expired").inc()
+                PREDICTION_CACHE_MISSES.inc()
+                self._update_gauges()
+                return None
+            self._entries.move_to_end(key)
+            PREDICTION_CACHE_HITS.inc()
+            return result
+
+    def put(self, model, feature_vector: np.ndarray, result: Dict[str, Any]) -> None:
+        key = self.make_key(model, feature_vector)
+        size = _estimate_size(key) + _estimate_size(result)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                PREDICTION_CACHE_EVICTIONS.labels(reason="capacity").inc()
+            self._update_gauges()
+
+    def invalidate_model(self, load_token: int) -> int:
+        """Remove todas as entradas de um carregamento de modelo; devolve quantas."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == load_token]
+            for key in stale:
+                self._remove(key)
+            if stale:
+                PREDICTION_CACHE_EVICTIONS.labels(reason="invalidated").inc(len(stale))
+            self._update_gauges()
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def _remove(self, key: _CacheKey) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _update_gauges(self) -> None:
+        PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+        PREDICTION_CACHE_BYTES.set(self._bytes)
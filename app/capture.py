@@ -0,0 +1,274 @@
+"""
+Captura amostrada de pedidos de produção para reprodução posterior.
+
+Com ``CAPTURE_ENABLED=true`` o :class:`CaptureMiddleware` guarda uma fracção
+(``CAPTURE_SAMPLE_RATE``) dos pedidos a ``/predict`` (e sub-rotas): instante
+de chegada (epoch), método, caminho, os headers que afectam o pedido
+(``Content-Type``, ``Accept``, ``X-Model-Version``, ``X-Request-Timeout-Ms``),
+o corpo tal como chegou, o estado e a latência até ao último byte. Os registos são escritos
+em NDJSON (um objecto por linha) por uma thread própria, com fila limitada,
+em ficheiros ``capture-<início>-<pid>-<n>.ndjson`` dentro de ``CAPTURE_DIR``
+que rodam a ``CAPTURE_MAX_FILE_BYTES``; cada processo mantém no máximo
+``CAPTURE_MAX_FILES`` ficheiros. Os headers de autenticação nunca são
+guardados.
+
+A reprodução (respeitando os intervalos entre chegadas) está em
+``benchmarks/replay.py``.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.admission import DEADLINE_HEADER
+from app.registry import MODEL_VERSION_HEADER
+
+logger = logging.getLogger(__name__)
+
+CAPTURED_PATHS = ("/predict",)
+# Headers que mudam o resultado ou o custo do pedido e que a reprodução reenvia.
+REPLAYED_HEADERS = ("content-type", "accept", MODEL_VERSION_HEADER.lower(), DEADLINE_HEADER.lower())
+
+
+@dataclass
+class CapturedRequest:
+    """Um pedido capturado, tal como chegou à aplicação."""
+
+    ts: float
+    method: str
+    path: str
+    query: str
+    headers: Dict[str, str]
+    body: bytes
+    status: int
+    latency_ms: float
+
+    def to_record(self) -> Dict[str, Any]:
+        """Objecto da linha NDJSON; o corpo fica tal como chegou (texto UTF-8 ou base64)."""
+        record: Dict[str, Any] = {
+            "ts": round(self.ts, 6),
+            "method": self.method,
+            "path": self.path,
+        }
+        if self.query:
+            record["query"] = self.query
+        if self.headers:
+            record["headers"] = self.headers
+        try:
+            record["body_text"] = self.body.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(self.body).decode("ascii")
+        record["status"] = self.status
+        record["latency_ms"] = round(self.latency_ms, 3)
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "CapturedRequest":
+        if "body_text" in record:
+            body = record["body_text"].encode("utf-8")
+        else:
+            body = base64.b64decode(record.get("body_b64", ""))
+        return cls(
+            ts=float(record["ts"]),
+            method=record.get("method", "POST"),
+            path=record["path"],
+            query=record.get("query", ""),
+            headers=dict(record.get("headers") or {}),
+            body=body,
+            status=int(record.get("status", 0)),
+            latency_ms=float(record.get("latency_ms", 0.0)),
+        )
+
+
+class CaptureWriter:
+    """
+    Escreve :class:`CapturedRequest` em NDJSON rotativo numa thread própria.
+
+    Como o exportador de spans, a thread é criada no primeiro ``write`` de cada
+    processo e a fila cheia descarta (``dropped``). Cada processo escreve nos
+    seus próprios ficheiros (o pid faz parte do nome), pelo que a rotação não
+    precisa de coordenação entre workers.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 10,
+        max_queue: int = 1024,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[CapturedRequest]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._files: Deque[Path] = deque()
+        self._sequence = 0
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="capture-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def write(self, captured: CapturedRequest) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(captured)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        """Escreve os pedidos pendentes e termina a thread deste processo."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._pid = None
+
+    def _new_file(self) -> Path:
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        path = self.directory / f"capture-{stamp}-{os.getpid()}-{self._sequence}.ndjson"
+        self._sequence += 1
+        self._files.append(path)
+        while len(self._files) > self.max_files:
+            oldest = self._files.popleft()
+            try:
+                oldest.unlink()
+            except FileNotFoundError:
+                pass
+        return path
+
+    def _run(self, pending: "queue.Queue[Optional[CapturedRequest]]") -> None:
+        sink = None
+        written = 0
+        try:
+            while True:
+                batch = [pending.get()]
+                while batch[-1] is not None:
+                    try:
+                        batch.append(pending.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = [
+                    json.dumps(item.to_record(), ensure_ascii=False, separators=(",", ":"))
+                    for item in batch
+                    if item is not None
+                ]
+                if lines:
+                    data = ("\n".join(lines) + "\n").encode("utf-8")
+                    if sink is None or (written and written + len(data) > self.max_file_bytes):
+                        if sink is not None:
+                            sink.close()
+                        sink = self._new_file().open("ab", buffering=0)
+                        written = 0
+                    sink.write(data)
+                    written += len(data)
+                if batch[-1] is None:
+                    return
+        except OSError as err:
+            logger.error(f"Captura de pedidos interrompida: {err}")
+        finally:
+            if sink is not None:
+                sink.close()
+
+
+class CaptureMiddleware:
+    """Middleware ASGI: captura uma amostra dos pedidos a ``paths`` com a latência da resposta."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        writer: CaptureWriter,
+        sample_rate: float = 0.01,
+        paths: Sequence[str] = CAPTURED_PATHS,
+        max_body_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.paths = tuple(paths)
+        self.max_body_bytes = max_body_bytes
+
+    def _matches(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self._matches(scope["path"])
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter_ns()
+        chunks = []
+        state = {"size": 0, "status": 0, "finished": 0}
+
+        async def receive_capturing() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                state["size"] += len(body)
+                if state["size"] <= self.max_body_bytes:
+                    chunks.append(body)
+            return message
+
+        async def send_capturing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                state["finished"] = time.perf_counter_ns()
+            await send(message)
+
+        try:
+            await self.app(scope, receive_capturing, send_capturing)
+        finally:
+            # Corpos acima do limite não são reproduzíveis: o pedido fica de fora.
+            if state["status"] and state["size"] <= self.max_body_bytes:
+                headers = {
+                    name.decode("latin-1"): value.decode("latin-1")
+                    for name, value in scope.get("headers") or []
+                    if name.decode("latin-1") in REPLAYED_HEADERS
+                }
+                finished = state["finished"] or time.perf_counter_ns()
+                self.writer.write(
+                    CapturedRequest(
+                        ts=arrived,
+                        method=scope["method"],
+                        path=scope["path"],
+                        query=scope.get("query_string", b"").decode("latin-1"),
+                        headers=headers,
+                        body=b"".join(chunks),
+                        status=state["status"],
+                        latency_ms=(finished - started) / 1e6,
+                    )
+                )
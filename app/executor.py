@@ -0,0 +1,197 @@
+"""
+Executor dedicado à inferência, fora do event loop do asyncio.
+
+As chamadas ao modelo (sklearn/NumPy, CPU-bound) correm num pool limitado de
+threads ou de processos. No modo ``process`` cada worker guarda a sua própria
+cópia do modelo (herdada via fork quando disponível). O número de tarefas
+pendentes é limitado: acima do limite o pedido é rejeitado de imediato com
+:class:`ExecutorSaturatedError`, em vez de crescer uma fila sem fim.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional, Tuple
+
+from app.admission import Deadline
+from app.utils.metrics import (
+    INFERENCE_EXECUTOR_ACTIVE,
+    INFERENCE_EXECUTOR_PENDING,
+    INFERENCE_EXECUTOR_QUEUE_WAIT_SECONDS,
+    INFERENCE_EXECUTOR_REJECTED,
+    INFERENCE_EXECUTOR_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+# Modelo mantido em cada processo worker (modo "process").
+_WORKER_MODEL = None
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """O executor de inferência atingiu o limite de tarefas pendentes."""
+
+
+def _init_worker(model) -> None:
+    global _WORKER_MODEL  # pylint: disable=global-statement
+    _WORKER_MODEL = model
+    policy = getattr(model, "thread_policy", None)
+    if policy is not None:
+        policy.limit_native_threads()
+
+
+def _call_in_worker(
+    method_name: str, args: Tuple[Any, ...], deadline: Optional[Deadline] = None
+) -> Tuple[Any, float]:
+    started_at = time.monotonic()
+    if deadline is not None:
+        deadline.start_inference()
+    return getattr(_WORKER_MODEL, method_name)(*args), started_at
+
+
+def default_worker_count() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class InferenceExecutor:
+    """Pool limitado para chamadas síncronas ao modelo."""
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None, max_queue: int = 64) -> None:
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Modo de executor desconhecido: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or default_worker_count()
+        self.max_queue = max(max_queue, 0)
+        self._pool: Executor | None = None
+        self._pool_model = None
+        # Modo "process": versões do modelo que não estão nos workers correm em threads.
+        self._side_pool: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        INFERENCE_EXECUTOR_WORKERS.set(self.max_workers)
+
+    @property
+    def capacity(self) -> int:
+        """Número máximo de tarefas em curso ou em fila."""
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self, model=None) -> None:
+        """Cria o pool. No modo ``process`` os workers recebem ``model``."""
+        if self._pool is not None:
+            return
+        if self.mode == "process":
+            if model is None:
+                raise RuntimeError("O modo 'process' requer um modelo carregado")
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model,),
+            )
+            self._pool_model = model
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        logger.info("Executor de inferência iniciado: modo=%s, workers=%d", self.mode, self.max_workers)
+
+    def swap_model(self, model) -> None:
+        """
+        Passa a usar ``model`` nas novas tarefas.
+
+        No modo ``process`` é criado um novo pool; o anterior termina as
+        tarefas em curso e encerra sem as cancelar. No modo ``thread`` o modelo
+        é passado em cada chamada e nada muda.
+        """
+        if self.mode != "process" or self._pool is None or model is self._pool_model:
+            return
+        old_pool, self._pool = self._pool, None
+        self.start(model)
+        old_pool.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        pool, self._pool = self._pool, None
+        side_pool, self._side_pool = self._side_pool, None
+        self._pool_model = None
+        for executor in (pool, side_pool):
+            if executor is not None:
+                executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def call(self, model, method_name: str, *args: Any, deadline: Optional[Deadline] = None) -> Any:
+        """
+        Executa ``model.<method_name>(*args)`` no pool e aguarda o resultado.
+
+        Com ``deadline``, a tarefa é descartada (:class:`DeadlineExceededError`)
+        se o prazo expirar enquanto espera por um worker.
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                INFERENCE_EXECUTOR_REJECTED.inc()
+                raise ExecutorSaturatedError(
+                    f"Executor de inferência saturado ({self._pending} tarefas pendentes)"
+                )
+            self._pending += 1
+            INFERENCE_EXECUTOR_PENDING.set(self._pending)
+
+        submitted_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            if self.mode == "process":
+                if self._pool is None:
+                    self.start(model)
+                elif model is not self._pool_model:
+                    # Outra versão do modelo (ver app/registry.py): os workers só têm a por omissão.
+                    if self._side_pool is None:
+                        self._side_pool = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix="inference-version"
+                        )
+                    return await loop.run_in_executor(
+                        self._side_pool, self._run_in_thread, getattr(model, method_name),
+                        args, submitted_at, deadline,
+                    )
+                result, started_at = await loop.run_in_executor(
+                    self._pool, _call_in_worker, method_name, args, deadline
+                )
+                INFERENCE_EXECUTOR_QUEUE_WAIT_SECONDS.observe(max(started_at - submitted_at, 0.0))
+                return result
+
+            if self._pool is None:
+                self.start()
+            return await loop.run_in_executor(
+                self._pool, self._run_in_thread, getattr(model, method_name), args, submitted_at, deadline
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+                INFERENCE_EXECUTOR_PENDING.set(self._pending)
+
+    def _run_in_thread(
+        self, func, args: Tuple[Any, ...], submitted_at: float, deadline: Optional[Deadline] = None
+    ) -> Any:
+        INFERENCE_EXECUTOR_QUEUE_WAIT_SECONDS.observe(time.monotonic() - submitted_at)
+        if deadline is not None:
+            deadline.start_inference()
+        with self._lock:
+            self._active += 1
+            INFERENCE_EXECUTOR_ACTIVE.set(self._active)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                INFERENCE_EXECUTOR_ACTIVE.set(self._active)
@@ -0,0 +1,302 @@
+"""
+Arranque com pré-carregamento do modelo e fork dos workers.
+
+Com ``uvicorn --workers N`` cada worker corre o ``lifespan`` e faz o unpickle
+da sua própria cópia do modelo, pelo que a memória cresce linearmente com N.
+Este launcher carrega e aquece o :class:`SustainabilityModel` uma única vez no
+processo pai, chama ``gc.freeze()`` (o GC deixa de escrever nos cabeçalhos
+dos objectos já existentes, preservando as páginas copy-on-write) e só então
+faz fork dos N workers uvicorn, que partilham o socket de escuta. No worker
+o ``lifespan`` encontra o modelo já carregado e apenas inicia o executor.
+
+Com mais de um worker (ou o executor em modo ``process``) o launcher activa o
+modo multiprocesso do ``prometheus_client`` antes de importar a aplicação:
+usa ``PROMETHEUS_MULTIPROC_DIR`` (ou cria uma pasta temporária), limpa os
+ficheiros de execuções anteriores e marca como mortos os workers que
+terminam, para que ``/metrics`` agregue todos os processos.
+
+O processo pai supervisiona os workers: reinicia os que terminam de forma
+inesperada, com espera exponencial entre reinícios
+(``WORKER_RESTART_BACKOFF_SECONDS`` até ``WORKER_RESTART_BACKOFF_MAX_SECONDS``),
+e reencaminha SIGINT/SIGTERM para um encerramento ordenado. Após
+``WORKER_RESTART_MAX`` falhas seguidas (um worker que corre mais de
+``STABLE_WORKER_SECONDS`` reinicia a contagem) o launcher encerra os restantes
+workers e termina com erro, para que o orquestrador trate da falha.
+
+Uso::
+
+    python -m app.launcher --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ROWS = (1, 64)
+# Um worker que corre pelo menos este tempo antes de terminar não conta como falha seguida.
+STABLE_WORKER_SECONDS = 60.0
+
+
+def _loop_and_http() -> Dict[str, str]:
+    """uvloop e httptools quando instalados; caso contrário as implementações puras."""
+    options = {"loop": "asyncio", "http": "h11"}
+    try:
+        import uvloop  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+
+        options["loop"] = "uvloop"
+    except ImportError:  # pragma: no cover - depende do ambiente
+        pass
+    try:
+        import httptools  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+
+        options["http"] = "httptools"
+    except ImportError:  # pragma: no cover - depende do ambiente
+        pass
+    return options
+
+
+def preload(model, load: Callable[[], bool]) -> bool:
+    """
+    Carrega o modelo com ``load`` (se necessário) e executa-o uma vez por caminho de inferência.
+
+    Se o modelo não carregar, os workers arrancam na mesma (como com
+    ``uvicorn``): o ``lifespan`` de cada um volta a tentar e ``/health``
+    reporta o serviço como não saudável até um ``/admin/reload`` resultar.
+    """
+    if not model.is_loaded() and not load():
+        logger.error("Falha ao pré-carregar o modelo: os workers arrancam sem modelo")
+        return False
+    from app.schemas import PredictionInput  # pylint: disable=import-outside-toplevel
+
+    example = PredictionInput.model_config["json_schema_extra"]["example"]
+    row = model.build_feature_vector(example)
+    with model.metrics_paused():
+        for rows in WARMUP_ROWS:
+            model.predict_matrix(np.tile(row, (rows, 1)))
+    logger.info("Modelo %s pré-carregado e aquecido", model.model_version)
+    return True
+
+
+def size_thread_policy(app_main, workers: int) -> None:
+    """
+    Reparte os cores pelos ``workers`` do launcher antes do fork.
+
+    ``app.main`` constrói a política a partir de ``WORKERS``; com ``--workers``
+    diferente cada worker usaria os cores da máquina toda.
+    """
+    if app_main.thread_policy.uvicorn_workers == workers:
+        return
+    policy = app_main.build_thread_policy(workers)
+    app_main.thread_policy = policy
+    app_main.model.thread_policy = policy
+    if app_main.model.is_loaded():
+        policy.apply(app_main.model.model)
+
+
+def freeze_heap() -> None:
+    """Move os objectos existentes para a geração permanente do GC antes do fork."""
+    gc.collect()
+    gc.freeze()
+    logger.info("gc.freeze(): %d objectos na geração permanente", gc.get_freeze_count())
+
+
+def prepare_metrics_dir() -> Tuple[Optional[Path], bool]:
+    """
+    Prepara a pasta do modo multiprocesso do ``prometheus_client``.
+
+    Tem de correr antes de ``prometheus_client`` ser importado. Devolve a
+    pasta (ou ``None`` se não foi possível activar o modo) e se foi criada aqui.
+    """
+    configured = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if "prometheus_client.values" in sys.modules and not configured:
+        logger.warning("prometheus_client já importado: métricas sem agregação entre workers")
+        return None, False
+    if configured:
+        path = Path(configured)
+        path.mkdir(parents=True, exist_ok=True)
+        for stale in path.glob("*.db"):
+            stale.unlink()
+        return path, False
+    path = Path(tempfile.mkdtemp(prefix="rihs-metrics-"))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path)
+    return path, True
+
+
+class RestartPolicy:
+    """Espera exponencial entre reinícios de workers e limite de falhas seguidas."""
+
+    def __init__(
+        self,
+        max_restarts: int,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+        stable_seconds: float = STABLE_WORKER_SECONDS,
+    ) -> None:
+        self.max_restarts = max_restarts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stable_seconds = stable_seconds
+        self.failures = 0
+
+    def next_delay(self, uptime: float) -> Optional[float]:
+        """Espera antes de reiniciar um worker que correu ``uptime`` segundos; None no limite."""
+        if uptime >= self.stable_seconds:
+            self.failures = 0
+        if self.failures >= self.max_restarts:
+            return None
+        delay = min(self.backoff_seconds * 2 ** self.failures, self.max_backoff_seconds)
+        self.failures += 1
+        return delay
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, options: Dict[str, str], access_log: bool) -> None:
+    """Corpo do processo worker: um servidor uvicorn no socket partilhado."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # log_config=None: os loggers do uvicorn propagam para a fila de app/utils/logging.py
+    config = uvicorn.Config(app, lifespan="on", access_log=access_log, log_config=None, **options)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, options: Dict[str, str], access_log: bool) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _serve(app, sock, options, access_log)
+        except BaseException:  # pylint: disable=broad-except
+            logger.exception("Worker %d terminou com erro", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)  # pylint: disable=protected-access
+    logger.info("Worker iniciado (pid %d)", pid)
+    return pid
+
+
+def run(host: str, port: int, workers: int, access_log: bool = False) -> int:
+    """Pré-carrega o modelo, faz fork de ``workers`` servidores e supervisiona-os."""
+    from core.settings import settings  # pylint: disable=import-outside-toplevel
+
+    metrics_dir, created_metrics_dir = None, False
+    if workers > 1 or settings.INFERENCE_EXECUTOR == "process":
+        metrics_dir, created_metrics_dir = prepare_metrics_dir()
+    from app import main as app_main  # pylint: disable=import-outside-toplevel
+
+    # Antes do pré-carregamento: o load aplica a política ao modelo partilhado pelos workers.
+    size_thread_policy(app_main, workers)
+    preload(app_main.model, app_main.load_configured_model)
+    sock = bind_socket(host, port)
+    options = _loop_and_http()
+    freeze_heap()
+    logger.info(
+        "A servir em %s:%d com %d workers (loop=%s, http=%s)",
+        host, port, workers, options["loop"], options["http"],
+    )
+
+    stopping = False
+    restarts = RestartPolicy(
+        settings.WORKER_RESTART_MAX,
+        settings.WORKER_RESTART_BACKOFF_SECONDS,
+        settings.WORKER_RESTART_BACKOFF_MAX_SECONDS,
+    )
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    # pid → instante (monotónico) em que o worker foi iniciado
+    children: Dict[int, float] = {
+        _spawn(app_main.app, sock, options, access_log): time.monotonic() for _ in range(workers)
+    }
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    exit_code = 0
+    gave_up = False
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:  # pragma: no cover - PEP 475 reinicia os.wait
+            continue
+        if pid not in children:
+            continue
+        uptime = time.monotonic() - children.pop(pid)
+        if metrics_dir is not None:
+            from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+
+            multiprocess.mark_process_dead(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            continue
+        exit_code = exit_code or code or 1
+        delay = restarts.next_delay(uptime)
+        if delay is None:
+            logger.error(
+                "Worker %d terminou (código %d) após %d reinícios seguidos; a encerrar o launcher",
+                pid, code, restarts.max_restarts,
+            )
+            gave_up = True
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning("Worker %d terminou (código %d); a reiniciar dentro de %.2f s", pid, code, delay)
+        # Espera em passos curtos: um SIGTERM durante a espera não adia o encerramento.
+        restart_at = time.monotonic() + delay
+        while not stopping and time.monotonic() < restart_at:
+            time.sleep(min(0.1, restart_at - time.monotonic()))
+        if not stopping:
+            children[_spawn(app_main.app, sock, options, access_log)] = time.monotonic()
+    sock.close()
+    if created_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    return exit_code if gave_up or not stopping else 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    from core.settings import settings  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers deve ser >= 1")
+    return run(args.host, args.port, args.workers, access_log=args.access_log)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,269 @@
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import time
 from pathlib import Path
+from typing import Dict, List, Literal, Optional
 
+import numpy as np
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from fastapi.openapi.utils import get_openapi
 
 from core.settings import settings
+from app.admission import (
+    DEADLINE_HEADER,
+    AdmissionController,
+    AdmissionRejectedError,
+    Deadline,
+    DeadlineExceededError,
+)
+from app.batching import MicroBatcher
+from app.cache import PredictionCache
+from app.capture import CaptureMiddleware, CaptureWriter
+from app.executor import ExecutorSaturatedError, InferenceExecutor, default_worker_count
 from app.models import SustainabilityModel
+from app.registry import (
+    MODEL_VERSION_HEADER,
+    MODEL_VERSION_QUERY,
+    ModelRegistry,
+    ModelVersionUnavailableError,
+    UnknownModelVersionError,
+)
+from app.reloader import ModelReloader, ReloadError, ReloadInProgressError
+from app.shadow import ShadowScorer
+from app.tracing import FileSpanExporter, TracingMiddleware, span
 from app.schemas import (
+    BatchPredictionInput,
+    BatchPredictionOutput,
     PredictionInput,
     PredictionOutput,
+    ReloadResponse,
     HealthResponse,
     ModelInfoResponse,
     ErrorResponse,
 )
+from app.streaming import NDJSONStreamingResponse, score_ndjson
 from app.utils import (
+    format_validation_error,
     init_metrics,
-    normalize_features,
-    validate_feature_payload,
+    setup_logging,
     verify_api_key,
 )
+from app.utils.decoding import decode_mapping, decode_many, request_validation_errors
+from app.utils.metrics import FEATURE_DECODE_SECONDS, MODEL_ACTIVE_VERSION, REQUESTS_SHED, render_latest
+from app.utils.wire import (
+    ARROW,
+    FULL,
+    JSON,
+    MEDIA_TYPES,
+    MSGPACK,
+    RESPONSE_SHAPES,
+    UnsupportedMediaTypeError,
+    WireFormatError,
+    decode_arrow_batch,
+    dump_batch_results,
+    dump_body,
+    encode_arrow_batch,
+    load_body,
+    request_format,
+    response_format,
+    shape_result,
+)
+from ml.manifest import ManifestError, read_manifest
+from ml.model_loader import load_metadata
+from ml.thread_policy import ThreadPolicy
 
-# Configura logging
+# Configura logging (fila limitada + thread de escrita: ver app/utils/logging.py)
 LOG_LEVEL = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
-logging.basicConfig(level=LOG_LEVEL)
+setup_logging(
+    level=LOG_LEVEL,
+    json_format=settings.LOG_JSON,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+)
 logger = logging.getLogger(__name__)
 
-model = SustainabilityModel()
+def build_thread_policy(uvicorn_workers: Optional[int] = None) -> ThreadPolicy:
+    """Política de threads das settings; ``uvicorn_workers`` substitui ``WORKERS`` (launcher)."""
+    return ThreadPolicy(
+        uvicorn_workers=uvicorn_workers or settings.WORKERS,
+        concurrency=settings.INFERENCE_WORKERS or default_worker_count(),
+        single_threads=settings.INFERENCE_THREADS_SINGLE,
+        batch_threads=settings.INFERENCE_THREADS_BATCH,
+        batch_min_rows=settings.INFERENCE_BATCH_MIN_ROWS,
+    )
+
+
+thread_policy = build_thread_policy()
+
+
+def build_model() -> SustainabilityModel:
+    """Instância (ainda por carregar) configurada a partir das settings."""
+    return SustainabilityModel(
+        engine=settings.INFERENCE_ENGINE,
+        early_exit=settings.EARLY_EXIT_ENABLED,
+        early_exit_tree_chunk=settings.EARLY_EXIT_TREE_CHUNK,
+        early_exit_min_rows=settings.EARLY_EXIT_MIN_ROWS,
+        time_budget_ms=settings.EARLY_EXIT_TIME_BUDGET_MS,
+        thread_policy=thread_policy,
+    )
+
+
+model = build_model()
+executor = InferenceExecutor(
+    mode=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_QUEUE_LIMIT,
+)
+prediction_cache = (
+    PredictionCache(
+        max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+        max_bytes=settings.PREDICTION_CACHE_MAX_BYTES,
+        ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+        quantize_decimals=settings.PREDICTION_CACHE_QUANTIZE_DECIMALS,
+    )
+    if settings.PREDICTION_CACHE_ENABLED
+    else None
+)
+if prediction_cache is not None:
+    model.add_reload_listener(prediction_cache.invalidate_model)
+admission = AdmissionController(settings.ADMISSION_MAX_IN_FLIGHT)
+
+
+def _build_batcher(target: SustainabilityModel) -> MicroBatcher:
+    """Micro-batcher ligado a ``target``: os lotes em fila usam sempre esse modelo."""
+    return MicroBatcher(
+        lambda matrix: executor.call(target, "predict_matrix", matrix),
+        window_ms=settings.MICROBATCH_WINDOW_MS,
+        max_batch_size=settings.MICROBATCH_MAX_SIZE,
+    )
+
+
+batcher = _build_batcher(model) if settings.MICROBATCH_ENABLED else None
+
+
+def load_configured_model(target: Optional[SustainabilityModel] = None) -> bool:
+    """Carrega o modelo pelo manifesto ou, em ``MODEL_LOAD_MODE=legacy``, por sondagem."""
+    target = model if target is None else target
+    if settings.MODEL_LOAD_MODE == "manifest":
+        return target.load_manifest(
+            settings.MODEL_MANIFEST_PATH,
+            version=settings.MODEL_VERSION,
+            metadata_path=settings.METADATA_FILE,
+            verify_checksum=settings.MODEL_VERIFY_CHECKSUM,
+        )
+    return target.load(
+        model_path=settings.MODEL_REGISTRY_PATH,
+        metadata_path=settings.METADATA_FILE,
+    )
+
+
+def swap_model(new_model: SustainabilityModel) -> SustainabilityModel:
+    """
+    Troca o modelo servido; os pedidos em curso mantêm a referência ao anterior.
+
+    O micro-batcher por omissão é substituído por um ligado ao novo modelo; o
+    anterior classifica os pedidos que já tinha em fila e termina.
+    """
+    global model, batcher  # pylint: disable=global-statement
+    previous = model
+    if prediction_cache is not None:
+        new_model.add_reload_listener(prediction_cache.invalidate_model)
+    executor.swap_model(new_model)
+    model = new_model
+    if batcher is not None:
+        previous_batcher, batcher = batcher, _build_batcher(new_model)
+        asyncio.get_running_loop().create_task(previous_batcher.close(drain=True))
+    if prediction_cache is not None:
+        prediction_cache.invalidate_model(previous.load_token)
+    return previous
+
+
+reloader = ModelReloader(build_model, load_configured_model, swap_model)
+
+
+def list_model_versions() -> List[str]:
+    """Versões disponíveis no manifesto (ou em ``METADATA_FILE`` no modo legado)."""
+    if settings.MODEL_LOAD_MODE == "manifest":
+        try:
+            return sorted(read_manifest(settings.MODEL_MANIFEST_PATH)["versions"])
+        except ManifestError:
+            return []
+    models_info = load_metadata(settings.METADATA_FILE).get("models")
+    return sorted(models_info) if isinstance(models_info, dict) else []
+
+
+def load_model_version(target: SustainabilityModel, version: str) -> bool:
+    """Carrega uma versão específica em ``target`` (usado pelo registo de versões)."""
+    if settings.MODEL_LOAD_MODE == "manifest":
+        return target.load_manifest(
+            settings.MODEL_MANIFEST_PATH,
+            version=version,
+            metadata_path=settings.METADATA_FILE,
+            verify_checksum=settings.MODEL_VERIFY_CHECKSUM,
+        )
+    info = (load_metadata(settings.METADATA_FILE).get("models") or {}).get(version) or {}
+    artifact = info.get("artifact_path")
+    if not artifact:
+        return False
+    return target.load(model_path=artifact, metadata_path=settings.METADATA_FILE) and (
+        target.model_version == version
+    )
+
+
+# Micro-batchers das versões não-padrão: lotes nunca misturam versões.
+version_batchers: Dict[str, MicroBatcher] = {}
+
+
+def _evict_version(evicted: SustainabilityModel) -> None:
+    if prediction_cache is not None:
+        prediction_cache.invalidate_model(evicted.load_token)
+    evicted_batcher = version_batchers.pop(evicted.model_version, None)
+    if evicted_batcher is not None:
+        asyncio.get_running_loop().create_task(evicted_batcher.close())
+
+
+registry = ModelRegistry(
+    default=lambda: model,
+    build=build_model,
+    load_version=load_model_version,
+    list_versions=list_model_versions,
+    max_bytes=settings.MODEL_REGISTRY_MAX_BYTES,
+    on_evict=_evict_version,
+)
+
+
+# Classificação sombra: uma fracção do tráfego de /predict é reclassificada pela
+# versão candidata depois de a resposta ser enviada.
+shadow = (
+    ShadowScorer(
+        lambda: registry.get(settings.SHADOW_MODEL_VERSION),
+        fraction=settings.SHADOW_FRACTION,
+        max_pending=settings.SHADOW_MAX_PENDING,
+    )
+    if settings.SHADOW_MODEL_VERSION and settings.SHADOW_FRACTION > 0
+    else None
+)
+
+
+def _batcher_for(target: SustainabilityModel) -> Optional[MicroBatcher]:
+    """Micro-batcher da versão de ``target``; None para chamar o executor directamente."""
+    if batcher is None:
+        return None
+    if target is model:
+        return batcher
+    if not registry.is_live(target):
+        return None
+    version_batcher = version_batchers.get(target.model_version)
+    if version_batcher is None:
+        version_batcher = _build_batcher(target)
+        version_batchers[target.model_version] = version_batcher
+    return version_batcher
 
 
 @asynccontextmanager
@@ -39,10 +273,7 @@ async def lifespan(app: FastAPI):
     
     # Só tenta carregar o modelo se ainda não estiver carregado (útil para testes)
     if not model.is_loaded():
-        success = model.load(
-            model_path=settings.MODEL_REGISTRY_PATH,
-            metadata_path=settings.METADATA_FILE,
-        )
+        success = load_configured_model()
         if success:
             logger.info("Modelo carregado com sucesso")
         else:
@@ -52,8 +283,33 @@ async def lifespan(app: FastAPI):
     
     if settings.API_KEY is None:
         logger.warning("API_KEY não configurada. Endpoints protegidos irão retornar erro 500.")
+
+    # A inferência corre num pool próprio para não bloquear o event loop
+    if model.is_loaded():
+        executor.start(model)
+        MODEL_ACTIVE_VERSION.labels(version=model.model_version).set(1)
+    watcher = None
+    if settings.MODEL_WATCH_ENABLED:
+        watched = [settings.METADATA_FILE]
+        if settings.MODEL_LOAD_MODE == "manifest":
+            watched.append(settings.MODEL_MANIFEST_PATH)
+        watcher = asyncio.create_task(
+            reloader.watch(watched, settings.MODEL_WATCH_INTERVAL_SECONDS)
+        )
     yield
-    # teardown (se necessário)
+    if watcher is not None:
+        watcher.cancel()
+    if batcher is not None:
+        await batcher.close()
+    for version_batcher in list(version_batchers.values()):
+        await version_batcher.close()
+    if shadow is not None:
+        shadow.shutdown()
+    if span_exporter is not None:
+        span_exporter.shutdown()
+    if capture_writer is not None:
+        capture_writer.shutdown()
+    executor.shutdown()
 
 
 # Cria aplicação FastAPI com documentação completa
@@ -136,6 +392,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Spans por etapa + Server-Timing (desligado por omissão; ver app/tracing.py)
+span_exporter = (
+    FileSpanExporter(settings.TRACING_EXPORT_PATH)
+    if settings.TRACING_ENABLED and settings.TRACING_EXPORT_PATH and settings.TRACING_SAMPLE_RATE > 0
+    else None
+)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, sample_rate=settings.TRACING_SAMPLE_RATE, exporter=span_exporter)
+
+# Captura amostrada de /predict para reprodução (benchmarks/replay.py); por fora do tracing
+capture_writer = (
+    CaptureWriter(settings.CAPTURE_DIR, settings.CAPTURE_MAX_FILE_BYTES, settings.CAPTURE_MAX_FILES)
+    if settings.CAPTURE_ENABLED and settings.CAPTURE_SAMPLE_RATE > 0
+    else None
+)
+if capture_writer is not None:
+    app.add_middleware(
+        CaptureMiddleware,
+        writer=capture_writer,
+        sample_rate=settings.CAPTURE_SAMPLE_RATE,
+        max_body_bytes=settings.CAPTURE_MAX_BODY_BYTES,
+    )
+
 init_metrics(app)
 
 
@@ -259,9 +538,9 @@ async def metrics():
     ```
     """
     try:
-        from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+        from prometheus_client import CONTENT_TYPE_LATEST
         return Response(
-            generate_latest(),
+            render_latest(),
             media_type=CONTENT_TYPE_LATEST
         )
     except ImportError:
@@ -271,9 +550,133 @@ async def metrics():
         )
 
 
+SINGLE_FORMATS = (JSON, MSGPACK)
+BATCH_FORMATS = (JSON, MSGPACK, ARROW)
+
+
+def _negotiate(request: Request, allowed):
+    """Formatos de entrada (``Content-Type``) e de saída (``Accept``) do pedido."""
+    try:
+        input_format = request_format(request.headers.get("content-type"), allowed)
+    except UnsupportedMediaTypeError as err:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(err)
+        ) from err
+    return input_format, response_format(request.headers.get("accept"), allowed)
+
+
+async def admission_slot():
+    """Reserva um lugar na fila de inferência; acima do limite rejeita de imediato (429)."""
+    try:
+        admission.acquire()
+    except AdmissionRejectedError as err:
+        logger.warning("Pedido rejeitado: %s", err)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados pedidos em curso, tente novamente",
+            headers={"Retry-After": "1"},
+        ) from err
+    try:
+        yield
+    finally:
+        admission.release()
+
+
+def request_deadline(
+    timeout_ms: Optional[float] = Header(
+        default=None,
+        alias=DEADLINE_HEADER,
+        description="Tempo máximo (ms) que o cliente espera pela resposta; por omissão `REQUEST_TIMEOUT_MS`",
+    ),
+) -> Deadline:
+    """Prazo do pedido, propagado até ao início da inferência."""
+    return Deadline.from_timeout_ms(timeout_ms, settings.REQUEST_TIMEOUT_MS)
+
+
+async def requested_model(
+    header_version: Optional[str] = Header(
+        default=None,
+        alias=MODEL_VERSION_HEADER,
+        description="Versão do modelo a usar (ver `models/manifest.json`); por omissão a versão activa",
+    ),
+    query_version: Optional[str] = Query(
+        default=None,
+        alias=MODEL_VERSION_QUERY,
+        description="Alternativa ao header `X-Model-Version`",
+    ),
+) -> SustainabilityModel:
+    """Modelo da versão pedida (carregada sob pedido pelo registo de versões)."""
+    try:
+        return await registry.get(header_version or query_version)
+    except UnknownModelVersionError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err)) from err
+    except ModelVersionUnavailableError as err:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err)) from err
+
+
+async def response_shape(
+    shape: Literal[RESPONSE_SHAPES] = Query(  # type: ignore[valid-type]
+        default=FULL,
+        description="`compact` omite `all_probabilities` (as probabilidades ficam só em `probabilities`)",
+    ),
+) -> str:
+    return shape
+
+
+def _overloaded(err: Exception) -> HTTPException:
+    """Converte saturação do executor ou prazo expirado na resposta HTTP adequada."""
+    if isinstance(err, DeadlineExceededError):
+        logger.warning("Pedido descartado: %s", err)
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Prazo do pedido expirou antes da inferência",
+        )
+    REQUESTS_SHED.labels(reason="executor_saturated").inc()
+    logger.warning("Pedido rejeitado: %s", err)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Serviço sobrecarregado, tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _score_vector(
+    feature_vector, target: SustainabilityModel, deadline: Optional[Deadline] = None
+):
+    """Classifica uma linha: cache, depois micro-batcher ou executor de inferência."""
+    if prediction_cache is not None:
+        cached = prediction_cache.get(target, feature_vector)
+        if cached is not None:
+            return cached
+
+    active_batcher = _batcher_for(target)
+    if active_batcher is not None:
+        result = await active_batcher.submit(feature_vector, deadline=deadline)
+    else:
+        result = (
+            await executor.call(
+                target, "predict_matrix", feature_vector.reshape(1, -1), deadline=deadline
+            )
+        )[0]
+
+    # Não guarda resultados de um modelo que entretanto foi substituído ou descarregado.
+    if prediction_cache is not None and registry.is_live(target):
+        prediction_cache.put(target, feature_vector, result)
+    return result
+
+
 @app.post(
     "/predict",
     response_model=PredictionOutput,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                MEDIA_TYPES[JSON]: {"schema": PredictionInput.model_json_schema()},
+                MEDIA_TYPES[MSGPACK]: {"schema": PredictionInput.model_json_schema()},
+            },
+        }
+    },
     tags=["Classificação"],
     summary="Classificar Sustentabilidade",
     description="""
@@ -325,14 +728,32 @@ async def metrics():
             "description": "Modelo não disponível ou não carregado",
             "model": ErrorResponse,
         },
+        404: {
+            "description": "Versão do modelo pedida (`X-Model-Version`) não existe",
+            "model": ErrorResponse,
+        },
+        429: {
+            "description": "Fila de inferência cheia (`ADMISSION_MAX_IN_FLIGHT`); repetir após `Retry-After`",
+            "model": ErrorResponse,
+        },
+        504: {
+            "description": "Prazo do pedido (`X-Request-Timeout-Ms`) expirou antes da inferência",
+            "model": ErrorResponse,
+        },
         500: {
             "description": "Erro interno do servidor",
             "model": ErrorResponse,
         }
     },
-    dependencies=[Depends(verify_api_key)],
+    dependencies=[Depends(verify_api_key), Depends(admission_slot)],
 )
-async def predict(input_data: PredictionInput):
+async def predict(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    deadline: Deadline = Depends(request_deadline),
+    target: SustainabilityModel = Depends(requested_model),
+    shape: str = Depends(response_shape),
+):
     """
     Endpoint para classificar sustentabilidade de hotel.
     
@@ -388,9 +809,26 @@ async def predict(input_data: PredictionInput):
     print(f"Confiança: {result['confidence']}%")
     ```
     """
+    # Descodifica o corpo uma única vez, directamente para o vector float32 do modelo
+    # (mesmos limites e mensagens de erro de `PredictionInput`).
+    input_format, output_format = _negotiate(request, SINGLE_FORMATS)
+    try:
+        with span("read_body"):
+            body = await request.body()
+        decode_started = time.perf_counter()
+        with span("decode", format=input_format):
+            feature_vector = decode_mapping(load_body(body, input_format))
+        FEATURE_DECODE_SECONDS.labels(endpoint="predict", format=input_format).observe(
+            time.perf_counter() - decode_started
+        )
+    except WireFormatError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
+    except ValueError as err:
+        raise RequestValidationError(request_validation_errors(err)) from err
+
     try:
         model_path = Path(settings.MODEL_REGISTRY_PATH)
-        fallback_path = getattr(model, "loaded_path", None)
+        fallback_path = getattr(target, "loaded_path", None)
         if not model_path.exists() and not (fallback_path and Path(fallback_path).exists()):
             logger.error("Modelo indisponível em %s", model_path)
             raise HTTPException(
@@ -405,28 +843,46 @@ async def predict(input_data: PredictionInput):
                 detail="API key missing"
             )
 
-        if not model.is_loaded():
+        if not target.is_loaded():
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Modelo não carregado"
             )
         
-        features = normalize_features(input_data.to_feature_dict())
-        validate_feature_payload(features)
-
-        # Faz predição
-        prediction_result = model.predict(features)
+        # Faz predição (agregada com pedidos concorrentes quando o micro-batching está activo)
+        started = time.perf_counter()
+        with span("inference", model_version=target.model_version):
+            prediction_result = await _score_vector(feature_vector, target, deadline)
+        if (
+            shadow is not None
+            and target.model_version != settings.SHADOW_MODEL_VERSION
+            and shadow.sample()
+        ):
+            # Corre depois de a resposta ser enviada; não acrescenta latência ao pedido
+            background_tasks.add_task(
+                shadow.submit, feature_vector.copy(), prediction_result, time.perf_counter() - started
+            )
         
+        # Formatação adiada: só a thread de escrita formata (e só se o registo for amostrado)
         logger.info(
-            f"Predição realizada: {prediction_result['prediction_label']} "
-            f"(classe {prediction_result['prediction']}) com "
-            f"{prediction_result['confidence']}% de confiança"
+            "Predição realizada: %s (classe %s) com %s%% de confiança",
+            prediction_result["prediction_label"],
+            prediction_result["prediction"],
+            prediction_result["confidence"],
         )
         
-        return PredictionOutput(**prediction_result)
+        # O resultado foi criado pelo próprio modelo: é escrito directamente
+        # (orjson), sem validação por `PredictionOutput` nem `jsonable_encoder`.
+        with span("serialize", format=output_format):
+            return Response(
+                dump_body(shape_result(prediction_result, shape), output_format),
+                media_type=MEDIA_TYPES[output_format],
+            )
     except HTTPException as http_exc:
         # Propaga HTTPException sem mascarar o status code
         raise http_exc
+    except (ExecutorSaturatedError, DeadlineExceededError) as err:
+        raise _overloaded(err) from err
     except ValueError as err:
         logger.warning("Payload inválido recebido: %s", err)
         raise HTTPException(
@@ -441,6 +897,262 @@ async def predict(input_data: PredictionInput):
         )
 
 
+def _check_batch_size(total: int) -> None:
+    """413 quando o lote excede ``PREDICT_BATCH_MAX_SIZE``."""
+    max_size = settings.PREDICT_BATCH_MAX_SIZE
+    if total > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote com {total} itens excede o máximo de {max_size}",
+        )
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionOutput,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                MEDIA_TYPES[JSON]: {"schema": BatchPredictionInput.model_json_schema()},
+                MEDIA_TYPES[MSGPACK]: {"schema": BatchPredictionInput.model_json_schema()},
+                MEDIA_TYPES[ARROW]: {
+                    "schema": {"type": "string", "format": "binary"},
+                    "description": "Stream Arrow IPC com uma coluna numérica por feature",
+                },
+            },
+        }
+    },
+    tags=["Classificação"],
+    summary="Classificar Sustentabilidade em Lote",
+    description="""
+    Classifica vários hotéis numa única requisição.
+
+    Todas as linhas válidas são avaliadas numa única chamada ao modelo.
+    Os resultados são devolvidos na ordem de entrada e os erros são
+    reportados por item, sem falhar o lote inteiro.
+
+    Aceita e devolve JSON, MessagePack (`application/msgpack`) e Arrow IPC
+    (`application/vnd.apache.arrow.stream`, uma coluna por feature), conforme
+    os headers `Content-Type` e `Accept`.
+    """,
+    response_description="Resultados da classificação por item",
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {
+            "description": "Corpo MessagePack/Arrow inválido ou colunas Arrow incorrectas",
+            "model": ErrorResponse,
+        },
+        413: {
+            "description": "Lote excede o tamanho máximo configurado (`PREDICT_BATCH_MAX_SIZE`)",
+            "model": ErrorResponse,
+        },
+        403: {
+            "description": "Acesso negado (API Key incorreta)",
+            "model": ErrorResponse,
+        },
+        415: {
+            "description": "Content-Type não suportado (ou pacote opcional não instalado)",
+            "model": ErrorResponse,
+        },
+        404: {
+            "description": "Versão do modelo pedida (`X-Model-Version`) não existe",
+            "model": ErrorResponse,
+        },
+        429: {
+            "description": "Fila de inferência cheia (`ADMISSION_MAX_IN_FLIGHT`); repetir após `Retry-After`",
+            "model": ErrorResponse,
+        },
+        503: {
+            "description": "Modelo não disponível ou não carregado",
+            "model": ErrorResponse,
+        },
+        504: {
+            "description": "Prazo do pedido (`X-Request-Timeout-Ms`) expirou antes da inferência",
+            "model": ErrorResponse,
+        },
+    },
+    dependencies=[Depends(verify_api_key), Depends(admission_slot)],
+)
+async def predict_batch(
+    request: Request,
+    deadline: Deadline = Depends(request_deadline),
+    batch_model: SustainabilityModel = Depends(requested_model),
+    shape: str = Depends(response_shape),
+):
+    """
+    Endpoint para classificação em lote.
+
+    Cada item é validado individualmente com o schema de `/predict`.
+    Itens inválidos recebem `error` e os restantes recebem `result`.
+
+    ### 🔒 Autenticação
+
+    Requer header `X-API-KEY` com uma chave válida.
+    """
+    input_format, output_format = _negotiate(request, BATCH_FORMATS)
+    with span("read_body"):
+        body = await request.body()
+    decode_started = time.perf_counter()
+    try:
+        if input_format == ARROW:
+            with span("decode", format=input_format):
+                feature_matrix, valid_indices, errors = decode_arrow_batch(body)
+            total = len(valid_indices) + len(errors)
+        else:
+            with span("validate", format=input_format):
+                payload = load_body(body, input_format)
+                # Recusa lotes acima do limite antes de validar cada item.
+                raw_items = payload.get("items") if isinstance(payload, dict) else None
+                if isinstance(raw_items, list):
+                    _check_batch_size(len(raw_items))
+                batch = BatchPredictionInput.model_validate(payload)
+            total = len(batch.items)
+    except WireFormatError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
+    except ValueError as err:
+        raise RequestValidationError(request_validation_errors(err)) from err
+
+    _check_batch_size(total)
+
+    if not batch_model.is_loaded():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não carregado"
+        )
+
+    if input_format != ARROW:
+        with span("decode", format=input_format, rows=total):
+            feature_matrix, valid_indices, validation_errors = decode_many(batch.items)
+            errors = {index: format_validation_error(err) for index, err in validation_errors.items()}
+    FEATURE_DECODE_SECONDS.labels(endpoint="predict_batch", format=input_format).observe(
+        time.perf_counter() - decode_started
+    )
+
+    # Respostas colunares (Arrow) usam as matrizes de resultado directamente.
+    method_name = "predict_arrays" if output_format == ARROW else "predict_matrix"
+    batch_results = None
+    if valid_indices:
+        try:
+            with span("inference", model_version=batch_model.model_version, rows=len(valid_indices)):
+                batch_results = await executor.call(batch_model, method_name, feature_matrix, deadline=deadline)
+        except (ExecutorSaturatedError, DeadlineExceededError) as err:
+            raise _overloaded(err) from err
+        except Exception as e:
+            logger.error("Erro no endpoint /predict/batch: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erro interno: {str(e)}"
+            )
+
+    logger.info("Lote classificado: %d itens, %d com erro", total, len(errors))
+
+    if output_format == ARROW:
+        predictions, probabilities = batch_results or (
+            np.empty(0, dtype=np.int64), np.empty((0, len(batch_model.class_labels)))
+        )
+        with span("serialize", format=ARROW):
+            return Response(
+                encode_arrow_batch(
+                    total, valid_indices, predictions, probabilities,
+                    batch_model.class_labels, errors, batch_model.model_version,
+                ),
+                media_type=MEDIA_TYPES[ARROW],
+            )
+
+    with span("serialize", format=output_format):
+        return Response(
+            dump_batch_results(
+                total, valid_indices, batch_results or [], errors,
+                batch_model.model_version, shape, output_format,
+            ),
+            media_type=MEDIA_TYPES[output_format],
+        )
+
+
+@app.post(
+    "/predict/stream",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": PredictionInput.model_json_schema()}},
+        }
+    },
+    tags=["Classificação"],
+    summary="Classificar Sustentabilidade em Streaming",
+    description="""
+    Classifica hotéis enviados em NDJSON (um objecto JSON por linha).
+
+    O corpo é lido de forma incremental e classificado em blocos de
+    `PREDICT_STREAM_CHUNK_SIZE` linhas; os resultados são devolvidos em NDJSON
+    à medida que cada bloco fica pronto. Linhas inválidas recebem `error`
+    sem interromper o stream. Conta para `ADMISSION_MAX_IN_FLIGHT` durante
+    todo o stream; com o executor saturado ou o prazo (`X-Request-Timeout-Ms`,
+    por bloco) expirado, o stream termina com uma linha de erro.
+    """,
+    response_description="Resultados em NDJSON, uma linha por linha de entrada",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "description": "Stream de resultados",
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"line": 1, "prediction": 3, "prediction_label": "Alto", "...": "..."}\n'
+                               '{"line": 2, "error": "JSON inválido: Expecting value"}\n'
+                }
+            },
+        },
+        403: {
+            "description": "Acesso negado (API Key incorreta)",
+            "model": ErrorResponse,
+        },
+        429: {
+            "description": "Fila de inferência cheia (`ADMISSION_MAX_IN_FLIGHT`); repetir após `Retry-After`",
+            "model": ErrorResponse,
+        },
+        503: {
+            "description": "Modelo não disponível ou não carregado",
+            "model": ErrorResponse,
+        },
+    },
+    dependencies=[Depends(verify_api_key), Depends(admission_slot)],
+)
+async def predict_stream(
+    request: Request,
+    stream_model: SustainabilityModel = Depends(requested_model),
+    deadline: Deadline = Depends(request_deadline),
+):
+    """
+    Endpoint para classificação em streaming (NDJSON).
+
+    Cada linha é validada com o schema de `/predict`. A resposta contém uma
+    linha por linha de entrada não vazia, com o campo `line` (a partir de 1)
+    e o resultado da classificação ou `error`.
+
+    ### 🔒 Autenticação
+
+    Requer header `X-API-KEY` com uma chave válida.
+    """
+    if not stream_model.is_loaded():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não carregado"
+        )
+
+    async def score(matrix, block_deadline):
+        return await executor.call(stream_model, "predict_matrix", matrix, deadline=block_deadline)
+
+    return NDJSONStreamingResponse(
+        score_ndjson(
+            request.stream(),
+            score,
+            chunk_size=settings.PREDICT_STREAM_CHUNK_SIZE,
+            max_line_bytes=settings.PREDICT_STREAM_MAX_LINE_BYTES,
+            deadline=deadline,
+        ),
+    )
+
+
 @app.get(
     "/model/info",
     response_model=ModelInfoResponse,
@@ -468,6 +1180,14 @@ async def predict(input_data: PredictionInput):
                         "metadata": {
                             "accuracy": 0.92,
                             "f1_weighted": 0.91
+                        },
+                        "threading": {
+                            "cpus": 8,
+                            "uvicorn_workers": 2,
+                            "inference_concurrency": 2,
+                            "single_threads": 1,
+                            "batch_threads": 2,
+                            "batch_min_rows": 64
                         }
                     }
                 }
@@ -497,6 +1217,7 @@ async def model_info():
     - Mapeamento de classes (código -> rótulo)
     - Versão do modelo
     - Metadados adicionais (métricas de performance, data de treino, etc.)
+    - Política de threads efectiva (cores, workers, threads por chamada)
     
     **Uso típico:**
     - Verificar quais features são necessárias para fazer predições
@@ -523,6 +1244,7 @@ async def model_info():
         class_labels=class_labels_dict,
         version=model.model_version,
         metadata=model.metadata or {},
+        threading=model.thread_policy.describe() if model.thread_policy is not None else None,
     )
 
 
@@ -589,6 +1311,54 @@ async def metadata():
     return model.metadata or {"version": model.model_version}
 
 
+@app.post(
+    "/admin/reload",
+    response_model=ReloadResponse,
+    tags=["Modelo"],
+    summary="Recarregar Modelo",
+    description="Carrega, valida e troca o modelo servido sem interromper os pedidos em curso.",
+    response_description="Versões antes e depois da troca",
+    status_code=status.HTTP_200_OK,
+    responses={
+        403: {
+            "description": "Acesso negado",
+            "model": ErrorResponse,
+        },
+        409: {
+            "description": "Já existe um recarregamento em curso",
+            "model": ErrorResponse,
+        },
+        500: {
+            "description": "O novo modelo não carregou ou falhou a validação; o modelo actual continua activo",
+            "model": ErrorResponse,
+        },
+    },
+    dependencies=[Depends(verify_api_key)],
+)
+async def reload_model():
+    """
+    Recarrega o modelo a partir do manifesto (ou de `MODEL_REGISTRY_PATH` em modo legado).
+
+    O novo modelo é carregado e aquecido em segundo plano e validado contra um
+    lote de teste; só então substitui o actual. Pedidos em curso terminam com o
+    modelo anterior. Com vários workers, este endpoint só recarrega o worker que
+    recebe o pedido — use `MODEL_WATCH_ENABLED` para recarregar todos.
+
+    ### 🔒 Autenticação
+
+    Requer header `X-API-KEY` com uma chave válida.
+    """
+    try:
+        return await reloader.reload(reason="admin")
+    except ReloadInProgressError as err:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(err)) from err
+    except ReloadError as err:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Recarregamento falhou, modelo actual mantido: {err}",
+        ) from err
+
+
 # Customização do OpenAPI schema
 def custom_openapi():
     if app.openapi_schema:
@@ -625,7 +1395,7 @@ def custom_openapi():
     
     # Aplica segurança aos endpoints que precisam
     for path, path_item in openapi_schema["paths"].items():
-        if path in ["/predict", "/model/info", "/metadata"]:
+        if path in ["/predict", "/predict/batch", "/predict/stream", "/model/info", "/metadata", "/admin/reload"]:
             for method in path_item:
                 if method != "options":
                     path_item[method]["security"] = [{"ApiKeyAuth": []}]
@@ -1,40 +1,100 @@
 from __future__ import annotations
 
+import itertools
 import logging
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
 
 import numpy as np
 
 from app.utils.feature_aliases import CANONICAL_FEATURES
+from app.utils.metrics import (
+    INFERENCE_ROWS,
+    INFERENCE_SECONDS,
+    MODEL_LOAD_SECONDS,
+    PREDICTED_CLASSES,
+    batch_size_label,
+)
 from app.utils.validation import (
     ensure_only_known_features,
     normalize_features,
     validate_feature_payload,
 )
+from ml.manifest import ManifestError, load_artifact
 from ml.model_loader import load_metadata, load_model
+from ml.thread_policy import ThreadPolicy
+from ml.tree_engine import DEFAULT_TREE_CHUNK, CompiledForest, load_or_compile
 
 logger = logging.getLogger(__name__)
 
+INFERENCE_ENGINES = ("compiled", "sklearn")
+# Acima deste número de linhas o XGBoost nativo (C++ multi-thread) é mais rápido
+# do que a travessia NumPy; o motor compilado fica reservado a lotes pequenos.
+XGBOOST_COMPILED_MAX_ROWS = 32
+# Abaixo deste número de linhas a paragem antecipada é mais lenta do que uma
+# passagem única por todas as árvores (o custo fixo por nível domina).
+EARLY_EXIT_MIN_ROWS = 256
+
+CLASS_LABELS: Dict[int, str] = {
+    0: "Muito Baixo",
+    1: "Baixo",
+    2: "Médio",
+    3: "Alto",
+    4: "Muito Alto",
+}
+
+# Cada carregamento bem-sucedido recebe um token único (usado p.ex. pela cache).
+_LOAD_TOKENS = itertools.count(1)
+
 
 class SustainabilityModel:
     """Classe para gerenciar o ciclo de vida do modelo de sustentabilidade."""
     
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        engine: str = "compiled",
+        early_exit: bool = False,
+        early_exit_tree_chunk: int = DEFAULT_TREE_CHUNK,
+        early_exit_min_rows: int = EARLY_EXIT_MIN_ROWS,
+        time_budget_ms: float | None = None,
+        thread_policy: ThreadPolicy | None = None,
+    ) -> None:
+        if engine not in INFERENCE_ENGINES:
+            raise ValueError(f"Motor de inferência desconhecido: {engine}")
+        self.engine_mode = engine
+        # Paragem antecipada (só com o motor compilado): ver ``_predict_proba``.
+        self.early_exit = early_exit
+        self.early_exit_tree_chunk = early_exit_tree_chunk
+        self.early_exit_min_rows = early_exit_min_rows
+        self.time_budget_ms = time_budget_ms
+        # Threads por chamada ao estimador (ver ``ml.thread_policy``); None mantém o artefacto.
+        self.thread_policy = thread_policy
+        self.engine: CompiledForest | None = None
         self.model = None
         self.feature_names = CANONICAL_FEATURES
-        self.class_labels = {
-            0: "Muito Baixo",
-            1: "Baixo",
-            2: "Médio",
-            3: "Alto",
-            4: "Muito Alto",
-        }
+        self.class_labels = dict(CLASS_LABELS)
         self.metadata: Dict[str, Any] = {}
         self.model_version: str = "desconhecido"
         self.loaded_path: Path | None = None
+        self.load_token: int = 0
+        # Nomes das classes por índice, construídos uma vez por carregamento (ver ``_format_result``).
+        self._label_keys: Tuple[str, ...] = self._build_label_keys()
+        self._reload_listeners: List[Callable[[int], None]] = []
+        # Desligado durante aquecimento/validação para não contar tráfego sintético.
+        self.record_metrics = True
+
+    def add_reload_listener(self, listener: Callable[[int], None]) -> None:
+        """Regista um callback chamado com o token anterior quando o modelo é recarregado."""
+        self._reload_listeners.append(listener)
 
     def load(self, model_path: str, metadata_path: str) -> bool:
+        """
+        Carregamento legado: sonda ``model_path`` e ficheiros alternativos até
+        encontrar um estimador. Preferir :meth:`load_manifest`.
+        """
+        load_started = time.perf_counter()
         try:
             loaded_obj, resolved_path = load_model(model_path)
             self.loaded_path = resolved_path
@@ -178,38 +238,264 @@ class SustainabilityModel:
 
             self.metadata = selected_metadata
             self.model_version = version
+            if self.thread_policy is not None:
+                self.thread_policy.apply(self.model)
+            self.engine = self._build_engine(resolved_path)
+            self._mark_loaded(load_started)
             return True
         except Exception as exc:  # pylint: disable=broad-except
             logger.error("Erro ao carregar modelo principal: %s", exc)
             self.model = None
             return False
     
+    def load_manifest(
+        self,
+        manifest_path: str,
+        version: str | None = None,
+        metadata_path: str | None = None,
+        verify_checksum: bool = True,
+    ) -> bool:
+        """
+        Carrega a versão indicada em ``models/manifest.json`` com uma única desserialização.
+
+        Ao contrário de :meth:`load`, não sonda outros ficheiros: um manifesto
+        ausente ou inconsistente faz o carregamento falhar.
+        """
+        load_started = time.perf_counter()
+        try:
+            estimator, version, entry, resolved_path = load_artifact(
+                manifest_path, version=version, verify_checksum=verify_checksum
+            )
+            feature_names = entry.get("feature_names") or list(CANONICAL_FEATURES)
+            if list(feature_names) != list(CANONICAL_FEATURES):
+                raise ManifestError(
+                    "Ordem das features no manifesto difere da usada pela API: "
+                    + ", ".join(feature_names)
+                )
+            labels = entry.get("class_labels") or CLASS_LABELS
+            class_labels = {int(key): value for key, value in labels.items()}
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Erro ao carregar modelo pelo manifesto: %s", exc)
+            return False
+
+        metadata = {**entry.get("metadata", {}), "version": version}
+        if metadata_path:
+            models_info = load_metadata(metadata_path).get("models")
+            if isinstance(models_info, dict) and isinstance(models_info.get(version), dict):
+                metadata = {**models_info[version], **metadata}
+
+        self.model = estimator
+        self.loaded_path = resolved_path
+        self.class_labels = class_labels
+        self.metadata = metadata
+        self.model_version = version
+        if self.thread_policy is not None:
+            self.thread_policy.apply(self.model)
+        self.engine = self._build_engine(resolved_path, entry.get("sha256"))
+        self._mark_loaded(load_started)
+        return True
+
     def predict(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Realiza uma predição a partir de um payload de features."""
         if not self.is_loaded():
             raise RuntimeError("Modelo não está carregado.")
 
+        feature_vector = self.build_feature_vector(payload)
+        return self.predict_matrix(feature_vector.reshape(1, -1))[0]
+
+    def predict_many(self, payloads: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Realiza predições em lote com uma única chamada a ``predict_proba``.
+
+        Retorna um resultado por payload, na mesma ordem de entrada. Payloads
+        inválidos produzem ``{"error": "<mensagem>"}`` sem interromper o lote.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo não está carregado.")
+
+        results: List[Dict[str, Any]] = [{} for _ in payloads]
+        feature_matrix = np.empty((len(payloads), len(self.feature_names)), dtype=np.float64)
+        valid_indices: List[int] = []
+
+        for index, payload in enumerate(payloads):
+            try:
+                feature_matrix[len(valid_indices)] = self.build_feature_vector(payload)
+            except (ValueError, TypeError) as err:
+                results[index] = {"error": str(err)}
+                continue
+            valid_indices.append(index)
+
+        if valid_indices:
+            batch_results = self.predict_matrix(feature_matrix[: len(valid_indices)])
+            for index, result in zip(valid_indices, batch_results):
+                results[index] = result
+
+        return results
+
+    def build_feature_vector(self, payload: Dict[str, Any]) -> np.ndarray:
+        """Normaliza, valida e ordena um payload segundo ``feature_names``."""
         normalized_features = normalize_features(payload)
         ensure_only_known_features(normalized_features)
         validate_feature_payload(normalized_features)
 
-        feature_vector = np.array(
-            [[normalized_features[feature] for feature in self.feature_names]]
+        return np.array(
+            [normalized_features[feature] for feature in self.feature_names],
+            dtype=np.float64,
         )
 
-        prediction = int(self.model.predict(feature_vector)[0])
-        probabilities_array = self.model.predict_proba(feature_vector)[0]
+    def predict_matrix(self, feature_matrix: np.ndarray) -> List[Dict[str, Any]]:
+        """Classifica uma matriz (N x features) já ordenada, numa única chamada ao modelo."""
+        predictions, probabilities_matrix, trees_used = self._score(feature_matrix)
+        best_indices = probabilities_matrix.argmax(axis=1)
+
+        return [
+            self._format_result(
+                int(prediction),
+                probabilities_row,
+                int(best_index),
+                None if row_trees is None else int(row_trees),
+            )
+            for prediction, probabilities_row, best_index, row_trees in zip(
+                predictions, probabilities_matrix, best_indices, trees_used
+            )
+        ]
+
+    def predict_arrays(self, feature_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classifica uma matriz sem construir dicionários por linha.
+
+        Devolve ``(predições, probabilidades)``, usado pelas respostas colunares.
+        """
+        predictions, probabilities_matrix, _ = self._score(feature_matrix)
+        return predictions, probabilities_matrix
+
+    def _score(self, feature_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Sequence[int | None]]:
+        if not self.is_loaded():
+            raise RuntimeError("Modelo não está carregado.")
+
+        started = time.perf_counter()
+        probabilities_matrix, trees_used = self._predict_proba(feature_matrix)
+        best_indices = probabilities_matrix.argmax(axis=1)
+        classes = getattr(self.model, "classes_", None)
+        predictions = (
+            np.asarray(classes)[best_indices] if classes is not None else best_indices
+        )
+        self._record_inference(predictions, time.perf_counter() - started)
+        if trees_used is None:
+            trees_used = [self._total_trees()] * len(predictions)
+        return predictions, probabilities_matrix, trees_used
+
+    @contextmanager
+    def metrics_paused(self) -> Iterator[None]:
+        """Não regista métricas de inferência (aquecimento e lotes de validação)."""
+        self.record_metrics = False
+        try:
+            yield
+        finally:
+            self.record_metrics = True
+
+    def _record_inference(self, predictions: np.ndarray, seconds: float) -> None:
+        if not self.record_metrics:
+            return
+        rows = len(predictions)
+        version = self.model_version
+        INFERENCE_SECONDS.labels(model_version=version, batch_size=batch_size_label(rows)).observe(seconds)
+        INFERENCE_ROWS.labels(model_version=version).inc(rows)
+        if rows == 1:
+            PREDICTED_CLASSES.labels(model_version=version, prediction=str(predictions[0])).inc()
+            return
+        values, counts = np.unique(predictions, return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            PREDICTED_CLASSES.labels(model_version=version, prediction=str(value)).inc(count)
+
+    def _total_trees(self) -> int | None:
+        if self.engine is not None:
+            return self.engine.n_trees
+        estimators = getattr(self.model, "estimators_", None)
+        return len(estimators) if estimators is not None else None
+
+    def _build_label_keys(self) -> Tuple[str, ...]:
+        n_classes = max(self.class_labels, default=-1) + 1
+        return tuple(self.class_labels.get(i, f"Classe {i}") for i in range(n_classes))
+
+    def _mark_loaded(self, load_started: float | None = None) -> None:
+        if load_started is not None:
+            MODEL_LOAD_SECONDS.labels(version=self.model_version).observe(time.perf_counter() - load_started)
+        self._label_keys = self._build_label_keys()
+        previous_token, self.load_token = self.load_token, next(_LOAD_TOKENS)
+        if previous_token:
+            for listener in self._reload_listeners:
+                listener(previous_token)
+
+    def _predict_proba(self, feature_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray | None]:
+        """
+        Calcula probabilidades pelo motor compilado, quando disponível.
+
+        Devolve também as árvores usadas por linha quando há paragem antecipada
+        (``None`` quando todas as árvores foram avaliadas). Abaixo de
+        ``early_exit_min_rows`` linhas uma única passagem por todas as árvores
+        é mais rápida do que a avaliação por blocos.
+        """
+        engine = self.engine
+        n_rows = feature_matrix.shape[0]
+        if engine is not None and self.early_exit and n_rows >= self.early_exit_min_rows:
+            deadline = (
+                time.perf_counter() + self.time_budget_ms / 1000.0
+                if self.time_budget_ms
+                else None
+            )
+            return engine.predict_proba_early(
+                feature_matrix, tree_chunk=self.early_exit_tree_chunk, deadline=deadline
+            )
+        if engine is not None and not (
+            engine.kind == "xgboost" and n_rows > XGBOOST_COMPILED_MAX_ROWS
+        ):
+            return engine.predict_proba(feature_matrix), None
+        if self.thread_policy is not None:
+            with self.thread_policy.context(n_rows):
+                return np.asarray(self.model.predict_proba(feature_matrix)), None
+        return np.asarray(self.model.predict_proba(feature_matrix)), None
+
+    def _build_engine(
+        self, artifact_path: Path | None, source_sha256: str | None = None
+    ) -> CompiledForest | None:
+        """Compila o estimador carregado; devolve None para usar ``predict_proba``."""
+        if self.engine_mode != "compiled":
+            return None
+        try:
+            engine = load_or_compile(self.model, artifact_path, source_sha256)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Falha ao compilar o modelo, a usar predict_proba: %s", exc)
+            return None
+        if engine is None:
+            logger.info("Motor compilado indisponível para %s", type(self.model).__name__)
+        else:
+            logger.info(
+                "Motor compilado activo: %s com %d árvores", engine.kind, engine.n_trees
+            )
+        return engine
+
+    def _format_result(
+        self,
+        prediction: int,
+        probabilities_array: np.ndarray,
+        best_index: int,
+        trees_used: int | None = None,
+    ) -> Dict[str, Any]:
+        """Constrói o dicionário de resposta para uma linha de probabilidades."""
         probabilities = probabilities_array.tolist()
         prediction_label = self.class_labels.get(prediction, "Desconhecido")
-        
+
         # Calcula a confiança (probabilidade da classe predita)
-        confidence = float(probabilities_array[prediction]) * 100.0
-        
-        # Mapeia todas as probabilidades para os nomes das classes
-        all_probabilities = {
-            self.class_labels.get(i, f"Classe {i}"): float(prob) 
-            for i, prob in enumerate(probabilities)
-        }
+        confidence = probabilities[best_index] * 100.0
+
+        # Mapeia todas as probabilidades para os nomes das classes (pré-calculados no carregamento)
+        label_keys = self._label_keys
+        if len(label_keys) < len(probabilities):
+            label_keys = label_keys + tuple(
+                f"Classe {i}" for i in range(len(label_keys), len(probabilities))
+            )
+        all_probabilities = dict(zip(label_keys, probabilities))
 
         return {
             "prediction": prediction,
@@ -218,8 +504,9 @@ class SustainabilityModel:
             "confidence": round(confidence, 2),
             "all_probabilities": all_probabilities,
             "model_version": self.model_version,
+            "trees_used": trees_used,
         }
-    
+
     def is_loaded(self) -> bool:
         """Verifica se o modelo está carregado."""
         return self.model is not None
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Registo de versões do modelo servidas em simultâneo.
+
+A versão por omissão (o modelo carregado no arranque, ou o último trocado
+por ``/admin/reload``) fica sempre fixa em memória. As outras versões do
+manifesto (ou de ``models/metadata.json`` em modo legado) são carregadas na
+primeira utilização, fora do event loop, e mantidas numa LRU limitada por um
+orçamento de memória: quando a soma estimada excede ``max_bytes`` as versões
+menos usadas recentemente são descarregadas.
+
+A memória de cada versão é estimada pelo tamanho do artefacto em disco mais
+os arrays do motor compilado — uma aproximação, não uma medição do heap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import (
+    MODEL_REGISTRY_BYTES,
+    MODEL_REGISTRY_EVICTIONS,
+    MODEL_REGISTRY_LOADS,
+    MODEL_REGISTRY_VERSIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION_HEADER = "X-Model-Version"
+MODEL_VERSION_QUERY = "model_version"
+
+
+class UnknownModelVersionError(LookupError):
+    """A versão pedida não existe no manifesto/metadados."""
+
+
+class ModelVersionUnavailableError(RuntimeError):
+    """A versão existe mas não foi possível carregá-la."""
+
+
+def estimate_model_bytes(model) -> int:
+    """Tamanho do artefacto em disco mais os arrays do motor compilado."""
+    size = 0
+    path = getattr(model, "loaded_path", None)
+    if path is not None and Path(path).exists():
+        size += Path(path).stat().st_size
+    engine = getattr(model, "engine", None)
+    if engine is not None:
+        size += sum(value.nbytes for value in vars(engine).values() if isinstance(value, np.ndarray))
+    return size
+
+
+class ModelRegistry:
+    """LRU de versões do modelo, com a versão por omissão fixa."""
+
+    def __init__(
+        self,
+        default: Callable[[], Any],
+        build: Callable[[], Any],
+        load_version: Callable[[Any, str], bool],
+        list_versions: Callable[[], List[str]],
+        max_bytes: int,
+        on_evict: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        self._default = default
+        self._build = build
+        self._load_version = load_version
+        self._list_versions = list_versions
+        self.max_bytes = max_bytes
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    @property
+    def default(self):
+        return self._default()
+
+    def loaded_versions(self) -> List[str]:
+        """Versões em memória, da menos para a mais recentemente usada (sem a por omissão)."""
+        return list(self._entries)
+
+    def available_versions(self) -> List[str]:
+        return self._list_versions()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def is_live(self, model) -> bool:
+        """Se ``model`` ainda é servido (por omissão ou presente na LRU)."""
+        if model is self.default:
+            return True
+        entry = self._entries.get(model.model_version)
+        return entry is not None and entry[0] is model
+
+    async def get(self, version: Optional[str] = None):
+        """
+        Modelo da ``version`` pedida; ``None`` ou a versão por omissão devolvem o modelo fixo.
+
+        Carrega a versão na primeira utilização (pedidos concorrentes à mesma
+        versão partilham o carregamento).
+        """
+        default = self.default
+        if not version or version == default.model_version:
+            return default
+        entry = self._entries.get(version)
+        if entry is not None:
+            self._entries.move_to_end(version)
+            return entry[0]
+        if version not in self.available_versions():
+            raise UnknownModelVersionError(f"Versão do modelo desconhecida: {version}")
+
+        pending = self._loading.get(version)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(self._load, version))
+            self._loading[version] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(version, None))
+        model = await asyncio.shield(pending)
+        if version not in self._entries:
+            self._admit(version, model)
+        self._entries.move_to_end(version)
+        return self._entries[version][0]
+
+    def _load(self, version: str):
+        model = self._build()
+        if not self._load_version(model, version):
+            raise ModelVersionUnavailableError(f"Não foi possível carregar a versão {version}")
+        MODEL_REGISTRY_LOADS.labels(version=version).inc()
+        logger.info("Versão %s do modelo carregada sob pedido", version)
+        return model
+
+    def _admit(self, version: str, model) -> None:
+        self._entries[version] = (model, estimate_model_bytes(model))
+        # A versão acabada de carregar fica sempre, mesmo que sozinha exceda o orçamento.
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_version, (evicted, _) = self._entries.popitem(last=False)
+            MODEL_REGISTRY_EVICTIONS.inc()
+            logger.info("Versão %s do modelo descarregada (orçamento de memória)", evicted_version)
+            if self._on_evict is not None:
+                self._on_evict(evicted)
+        MODEL_REGISTRY_VERSIONS.set(len(self._entries))
+        MODEL_REGISTRY_BYTES.set(self.total_bytes)
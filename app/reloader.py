@@ -0,0 +1,186 @@
+"""
+Recarregamento do modelo sem interrupção do serviço.
+
+O novo modelo é construído, carregado e aquecido numa thread em segundo
+plano e validado contra um lote de teste (probabilidades finitas, que somam
+1, e classes conhecidas). Só depois a referência usada pelos endpoints é
+trocada, de forma atómica no event loop. Os pedidos em curso mantêm a
+referência ao modelo antigo e terminam com ele; um modelo inválido nunca
+chega a ser servido.
+
+O recarregamento é pedido por ``POST /admin/reload`` ou pelo watcher
+opcional, que verifica periodicamente a data de modificação de
+``models/metadata.json`` (e do manifesto). Com vários workers cada processo
+tem o seu watcher, pelo que o watcher é a forma de recarregar todos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.decoding import FEATURE_BOUNDS, N_FEATURES, decode_mapping
+from app.utils.metrics import (
+    MODEL_ACTIVE_VERSION,
+    MODEL_RELOAD_SECONDS,
+    MODEL_RELOADS,
+    MODEL_SWAP_SECONDS,
+    MODEL_SWAPS,
+)
+
+logger = logging.getLogger(__name__)
+
+SMOKE_ROWS = 32
+
+
+class ReloadError(RuntimeError):
+    """O novo modelo não pôde ser carregado ou falhou a validação."""
+
+
+class ReloadInProgressError(RuntimeError):
+    """Já existe um recarregamento em curso."""
+
+
+def smoke_batch(rows: int = SMOKE_ROWS, seed: int = 0) -> np.ndarray:
+    """Lote de teste: o exemplo do schema seguido de linhas aleatórias dentro dos limites."""
+    from app.schemas import PredictionInput  # pylint: disable=import-outside-toplevel
+
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((max(rows, 1), N_FEATURES), dtype=np.float64)
+    matrix[0] = decode_mapping(PredictionInput.model_config["json_schema_extra"]["example"])
+    for column, (lower, upper, is_int) in enumerate(FEATURE_BOUNDS):
+        high = upper if np.isfinite(upper) else lower + 1000.0
+        values = rng.uniform(lower, high, size=len(matrix) - 1)
+        matrix[1:, column] = np.round(values) if is_int else values
+    return matrix
+
+
+def validate_model(model, matrix: np.ndarray) -> None:
+    """Classifica ``matrix`` (linha a linha e em lote) e verifica a sanidade do resultado."""
+    model.predict_matrix(matrix[:1])
+    predictions, probabilities = model.predict_arrays(matrix)
+    probabilities = np.asarray(probabilities)
+    if probabilities.shape != (len(matrix), len(model.class_labels)):
+        raise ReloadError(
+            f"Forma das probabilidades inesperada: {probabilities.shape} "
+            f"(esperado {(len(matrix), len(model.class_labels))})"
+        )
+    if not np.isfinite(probabilities).all():
+        raise ReloadError("Probabilidades não finitas no lote de teste")
+    if not np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-3):
+        raise ReloadError("Probabilidades do lote de teste não somam 1")
+    unknown = set(np.asarray(predictions).tolist()) - set(model.class_labels)
+    if unknown:
+        raise ReloadError(f"Classes desconhecidas no lote de teste: {sorted(unknown)}")
+
+
+class ModelReloader:
+    """Carrega, valida e troca o modelo servido, um recarregamento de cada vez."""
+
+    def __init__(
+        self,
+        build: Callable[[], Any],
+        load: Callable[[Any], bool],
+        swap: Callable[[Any], Any],
+        smoke_rows: int = SMOKE_ROWS,
+    ) -> None:
+        self._build = build
+        self._load = load
+        self._swap = swap
+        self.smoke_rows = smoke_rows
+        self._lock = asyncio.Lock()
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._lock.locked()
+
+    def _prepare(self):
+        candidate = self._build()
+        if not self._load(candidate):
+            raise ReloadError("Falha ao carregar o novo modelo")
+        # O lote de teste não conta nas métricas de inferência.
+        paused = getattr(candidate, "metrics_paused", contextlib.nullcontext)
+        with paused():
+            validate_model(candidate, smoke_batch(self.smoke_rows))
+        return candidate
+
+    async def reload(self, reason: str = "admin") -> Dict[str, Any]:
+        """
+        Carrega e valida o novo modelo fora do event loop e troca-o atomicamente.
+
+        Lança :class:`ReloadInProgressError` se já houver um recarregamento em
+        curso e :class:`ReloadError` se o novo modelo for inválido (o modelo
+        actual continua a ser servido).
+        """
+        if self._lock.locked():
+            raise ReloadInProgressError("Recarregamento já em curso")
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                candidate = await asyncio.to_thread(self._prepare)
+            except Exception as exc:
+                MODEL_RELOADS.labels(outcome="failed").inc()
+                logger.error("Recarregamento do modelo (%s) falhou: %s", reason, exc)
+                if isinstance(exc, ReloadError):
+                    raise
+                raise ReloadError(str(exc)) from exc
+            load_seconds = time.perf_counter() - started
+            MODEL_RELOAD_SECONDS.observe(load_seconds)
+
+            swap_started = time.perf_counter()
+            previous = self._swap(candidate)
+            swap_seconds = time.perf_counter() - swap_started
+            MODEL_SWAP_SECONDS.observe(swap_seconds)
+
+            old_version = getattr(previous, "model_version", "desconhecido")
+            new_version = candidate.model_version
+            MODEL_RELOADS.labels(outcome="swapped").inc()
+            MODEL_SWAPS.labels(old_version=old_version, new_version=new_version).inc()
+            if old_version != new_version:
+                MODEL_ACTIVE_VERSION.labels(version=old_version).set(0)
+            MODEL_ACTIVE_VERSION.labels(version=new_version).set(1)
+            logger.info(
+                "Modelo trocado (%s): %s -> %s, carregamento %.3fs, troca %.6fs",
+                reason, old_version, new_version, load_seconds, swap_seconds,
+            )
+            self.last_result = {
+                "previous_version": old_version,
+                "version": new_version,
+                "reason": reason,
+                "load_seconds": round(load_seconds, 6),
+                "swap_seconds": round(swap_seconds, 6),
+            }
+            return self.last_result
+
+    async def watch(self, paths: Sequence[str], interval_seconds: float) -> None:
+        """Recarrega quando a data de modificação de algum ficheiro em ``paths`` muda."""
+        targets: List[Path] = [Path(path) for path in paths]
+
+        def snapshot() -> List[Optional[int]]:
+            stamps: List[Optional[int]] = []
+            for target in targets:
+                try:
+                    stamps.append(target.stat().st_mtime_ns)
+                except OSError:
+                    stamps.append(None)
+            return stamps
+
+        last = snapshot()
+        logger.info("Watcher de modelo activo: %s (cada %.1fs)", ", ".join(map(str, targets)), interval_seconds)
+        while True:
+            await asyncio.sleep(interval_seconds)
+            current = snapshot()
+            if current == last:
+                continue
+            last = current
+            try:
+                await self.reload(reason="watcher")
+            except (ReloadError, ReloadInProgressError) as exc:
+                logger.warning("Watcher: modelo mantido (%s)", exc)
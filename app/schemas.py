@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -288,7 +288,8 @@ class PredictionOutput(BaseModel):
                     "Alto": 0.15,
                     "Muito Alto": 0.70
                 },
-                "model_version": "1.0.0"
+                "model_version": "1.0.0",
+                "trees_used": 200
             }
         }
     )
@@ -341,6 +342,68 @@ class PredictionOutput(BaseModel):
         examples=["1.0.0", "1.1.0"]
     )
 
+    trees_used: Optional[int] = Field(
+        default=None,
+        description="Número de árvores do ensemble avaliadas (menor que o total com paragem antecipada)",
+        ge=0,
+        examples=[200, 96]
+    )
+
+
+class BatchPredictionInput(BaseModel):
+    """
+    Schema de entrada para classificação em lote.
+
+    Cada item segue o formato de `PredictionInput`, mas é validado
+    individualmente: um item inválido não invalida o lote inteiro.
+    """
+    model_config = ConfigDict(
+        extra="forbid",
+        json_schema_extra={
+            "example": {
+                "items": [
+                    PredictionInput.model_config["json_schema_extra"]["example"],
+                ]
+            }
+        }
+    )
+
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        description="Lista de payloads no formato de `PredictionInput`",
+        min_length=1,
+    )
+
+
+class BatchPredictionItem(BaseModel):
+    """Resultado de um item do lote: predição ou mensagem de erro."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    index: int = Field(..., description="Posição do item no lote de entrada", ge=0)
+    result: Optional[PredictionOutput] = Field(
+        default=None,
+        description="Resultado da classificação (ausente quando o item é inválido)",
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Mensagem de erro do item (ausente quando a classificação foi bem-sucedida)",
+    )
+
+
+class BatchPredictionOutput(BaseModel):
+    """
+    Schema de saída da classificação em lote.
+
+    Os resultados são devolvidos na mesma ordem dos itens de entrada.
+    """
+    model_config = ConfigDict(protected_namespaces=())
+
+    results: List[BatchPredictionItem] = Field(..., description="Resultados por item, na ordem de entrada")
+    total: int = Field(..., description="Número de itens recebidos", ge=0)
+    succeeded: int = Field(..., description="Número de itens classificados com sucesso", ge=0)
+    failed: int = Field(..., description="Número de itens com erro", ge=0)
+    model_version: str = Field(..., description="Versão do modelo utilizado no lote")
+
 
 class HealthResponse(BaseModel):
     """
@@ -409,6 +472,34 @@ class ModelInfoResponse(BaseModel):
     class_labels: Dict[str, str] = Field(..., description="Mapeamento de classes (código -> rótulo)")
     version: str = Field(..., description="Versão do modelo")
     metadata: Dict = Field(..., description="Metadados adicionais do modelo (métricas, performance, etc.)")
+    threading: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Política de threads efectiva: cores, workers, threads por chamada e pools OpenMP/BLAS",
+    )
+
+
+class ReloadResponse(BaseModel):
+    """
+    Resultado de um recarregamento do modelo (``POST /admin/reload``).
+    """
+    model_config = ConfigDict(
+        protected_namespaces=(),
+        json_schema_extra={
+            "example": {
+                "previous_version": "latest",
+                "version": "latest",
+                "reason": "admin",
+                "load_seconds": 0.412,
+                "swap_seconds": 0.000021
+            }
+        }
+    )
+
+    previous_version: str = Field(..., description="Versão servida antes da troca")
+    version: str = Field(..., description="Versão servida a partir de agora")
+    reason: str = Field(..., description="Origem do recarregamento (admin ou watcher)")
+    load_seconds: float = Field(..., description="Tempo de carregamento, aquecimento e validação (s)")
+    swap_seconds: float = Field(..., description="Duração da troca da referência do modelo (s)")
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,130 @@
+"""
+Classificação sombra (shadow) contra um modelo candidato.
+
+Uma fracção configurável dos pedidos a ``/predict`` é classificada de novo
+por um segundo modelo, numa thread própria e só depois de a resposta ter
+sido enviada (background task), pelo que não acrescenta latência ao pedido.
+A concordância, a matriz de confusão (classe servida x classe candidata) e a
+diferença de latência são agregadas em memória e publicadas em ``/metrics``.
+
+O trabalho sombra nunca entra numa fila sem limite: com ``max_pending``
+tarefas em curso, novas amostras são descartadas (``outcome="dropped"``).
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import (
+    SHADOW_AGREEMENT_RATE,
+    SHADOW_COMPARISONS,
+    SHADOW_LATENCY_DELTA_SECONDS,
+    SHADOW_REQUESTS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Reclassifica uma amostra do tráfego com um modelo candidato, em segundo plano."""
+
+    def __init__(
+        self,
+        resolve: Callable[[], Awaitable[Any]],
+        fraction: float,
+        max_pending: int = 32,
+        workers: int = 1,
+        seed: Optional[int] = None,
+    ) -> None:
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError("fraction deve estar entre 0 e 1")
+        self._resolve = resolve
+        self.fraction = fraction
+        self.max_pending = max_pending
+        self._random = random.Random(seed)
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._compared = 0
+        self._agreed = 0
+        self._confusion: Dict[Tuple[int, int], int] = {}
+        self._latency_delta_total = 0.0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def sample(self) -> bool:
+        """Decide se o pedido actual entra na amostra sombra."""
+        return self.fraction > 0.0 and self._random.random() < self.fraction
+
+    async def submit(self, feature_vector: np.ndarray, primary: Dict[str, Any], primary_seconds: float) -> None:
+        """
+        Agenda a classificação sombra de uma linha já servida.
+
+        Chamado como background task, depois de a resposta ter sido enviada.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                SHADOW_REQUESTS.labels(outcome="dropped").inc()
+                return
+            self._pending += 1
+        try:
+            candidate = await self._resolve()
+            future = self._pool.submit(self._score, candidate, feature_vector, primary, primary_seconds)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._finish()
+            SHADOW_REQUESTS.labels(outcome="failed").inc()
+            logger.warning("Classificação sombra não agendada: %s", exc)
+            return
+        future.add_done_callback(lambda _: self._finish())
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _score(self, candidate, feature_vector: np.ndarray, primary: Dict[str, Any], primary_seconds: float) -> None:
+        started = time.perf_counter()
+        try:
+            shadow = candidate.predict_matrix(np.asarray(feature_vector).reshape(1, -1))[0]
+        except Exception as exc:  # pylint: disable=broad-except
+            SHADOW_REQUESTS.labels(outcome="failed").inc()
+            logger.warning("Classificação sombra falhou: %s", exc)
+            return
+        self.record(int(primary["prediction"]), int(shadow["prediction"]), time.perf_counter() - started - primary_seconds)
+
+    def record(self, primary_class: int, shadow_class: int, latency_delta: float) -> None:
+        """Acrescenta uma comparação aos agregados em memória e às métricas."""
+        with self._lock:
+            self._compared += 1
+            self._agreed += primary_class == shadow_class
+            key = (primary_class, shadow_class)
+            self._confusion[key] = self._confusion.get(key, 0) + 1
+            self._latency_delta_total += latency_delta
+            rate = self._agreed / self._compared
+        SHADOW_REQUESTS.labels(outcome="scored").inc()
+        SHADOW_COMPARISONS.labels(primary=str(primary_class), shadow=str(shadow_class)).inc()
+        SHADOW_LATENCY_DELTA_SECONDS.observe(latency_delta)
+        SHADOW_AGREEMENT_RATE.set(rate)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            compared = self._compared
+            return {
+                "compared": compared,
+                "agreement_rate": self._agreed / compared if compared else None,
+                "confusion": {f"{p}->{s}": n for (p, s), n in sorted(self._confusion.items())},
+                "mean_latency_delta_ms": (
+                    self._latency_delta_total / compared * 1000.0 if compared else None
+                ),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,222 @@
+"""
+Classificação em streaming de payloads NDJSON (`/predict/stream`).
+
+O corpo é lido de forma incremental, uma linha JSON por hotel. As linhas
+válidas são escritas num buffer float32 reutilizado e classificadas em
+blocos de até ``chunk_size`` linhas; os resultados são devolvidos em NDJSON à
+medida que cada bloco fica pronto, pela ordem das linhas de entrada. Linhas
+malformadas produzem uma linha de erro sem interromper o stream e contam para
+o tamanho do bloco, pelo que a memória usada é limitada pelo tamanho do bloco,
+independentemente do tamanho do upload e da proporção de linhas inválidas.
+
+Cada bloco é submetido ao executor com um prazo com a duração do pedido,
+contado a partir do momento em que o bloco fica completo: o tempo que o
+cliente demora a enviar as linhas não conta. Se o executor continuar
+saturado após ``SATURATION_RETRIES`` tentativas, ou se o prazo expirar antes
+da inferência, o stream termina com uma linha de erro, como os 503/504 dos
+outros endpoints.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.admission import Deadline, DeadlineExceededError
+from app.executor import ExecutorSaturatedError
+from app.utils.decoding import FEATURE_DTYPE, N_FEATURES, JSONBodyError, decode_mapping, parse_json
+from app.utils.metrics import FEATURE_DECODE_SECONDS, REQUESTS_SHED
+from app.utils.validation import format_validation_error
+
+try:
+    import orjson
+
+    def _dumps(value: Dict[str, Any]) -> bytes:
+        return orjson.dumps(value)
+except ImportError:  # pragma: no cover - depende do ambiente
+    def _dumps(value: Dict[str, Any]) -> bytes:
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+logger = logging.getLogger(__name__)
+
+ScoreMatrix = Callable[[np.ndarray, Optional[Deadline]], Awaitable[List[Dict[str, Any]]]]
+
+# Tentativas (com espera crescente) quando o executor de inferência está saturado;
+# esgotadas, o stream é interrompido em vez de esperar indefinidamente.
+SATURATION_RETRIES = 3
+SATURATION_BACKOFF_SECONDS = 0.05
+
+
+class _StreamAborted(Exception):
+    """Sinaliza que a linha de erro final já foi emitida e o stream deve terminar."""
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Resposta NDJSON cujo gerador consome o próprio corpo do pedido.
+
+    O ``StreamingResponse`` do Starlette escuta ``http.disconnect`` em paralelo
+    com o gerador, o que lhe roubaria as mensagens do corpo. Aqui só o gerador
+    lê ``receive``; uma desconexão do cliente surge como ``ClientDisconnect``
+    em ``request.stream()``.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Divide um stream de bytes em linhas numeradas (a partir de 1).
+
+    Linhas maiores do que ``max_line_bytes`` são descartadas sem as acumular em
+    memória e entregues como ``None``.
+    """
+    pending = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                if not oversized:
+                    pending += chunk[start:]
+                    if len(pending) > max_line_bytes:
+                        oversized = True
+                        pending.clear()
+                break
+            line_number += 1
+            if oversized:
+                yield line_number, None
+            else:
+                pending += chunk[start:newline]
+                yield line_number, (None if len(pending) > max_line_bytes else bytes(pending))
+            pending.clear()
+            oversized = False
+            start = newline + 1
+    if pending or oversized:
+        line_number += 1
+        yield line_number, (None if oversized else bytes(pending))
+
+
+async def score_ndjson(
+    chunks: AsyncIterator[bytes],
+    score: ScoreMatrix,
+    chunk_size: int = 256,
+    max_line_bytes: int = 65536,
+    deadline: Optional[Deadline] = None,
+) -> AsyncIterator[bytes]:
+    """Lê NDJSON de ``chunks`` e produz linhas NDJSON com os resultados."""
+    try:
+        async for output in _score_lines(chunks, score, chunk_size, max_line_bytes, deadline):
+            yield output
+    except _StreamAborted:
+        return
+
+
+async def _score_lines(
+    chunks: AsyncIterator[bytes],
+    score: ScoreMatrix,
+    chunk_size: int,
+    max_line_bytes: int,
+    deadline: Optional[Deadline],
+) -> AsyncIterator[bytes]:
+    buffer = np.empty((chunk_size, N_FEATURES), dtype=FEATURE_DTYPE)
+    # Cada entrada: (número da linha, índice no buffer ou None, mensagem de erro)
+    slots: List[Tuple[int, Optional[int], Optional[str]]] = []
+    filled = 0
+    # Tempo de descodificação acumulado por bloco (uma observação por bloco classificado).
+    decode_metric = FEATURE_DECODE_SECONDS.labels(endpoint="predict_stream", format="json")
+    decode_seconds = 0.0
+
+    async for line_number, line in iter_lines(chunks, max_line_bytes):
+        if line is None:
+            slots.append((line_number, None, f"Linha excede {max_line_bytes} bytes"))
+        elif not line.strip():
+            continue
+        else:
+            decode_started = time.perf_counter()
+            try:
+                decode_mapping(parse_json(line), buffer[filled])
+            except JSONBodyError as err:
+                slots.append((line_number, None, f"JSON inválido: {err}"))
+            except ValidationError as err:
+                slots.append((line_number, None, format_validation_error(err)))
+            else:
+                slots.append((line_number, filled, None))
+                filled += 1
+            decode_seconds += time.perf_counter() - decode_started
+
+        # Conta também as linhas com erro: um stream quase todo inválido não
+        # pode acumular linhas sem limite à espera de um bloco completo.
+        if len(slots) == chunk_size:
+            decode_metric.observe(decode_seconds)
+            async for output in _flush(slots, buffer, filled, score, deadline):
+                yield output
+            slots, filled, decode_seconds = [], 0, 0.0
+
+    if slots:
+        decode_metric.observe(decode_seconds)
+        async for output in _flush(slots, buffer, filled, score, deadline):
+            yield output
+
+
+async def _flush(
+    slots: List[Tuple[int, Optional[int], Optional[str]]],
+    buffer: np.ndarray,
+    filled: int,
+    score: ScoreMatrix,
+    deadline: Optional[Deadline] = None,
+) -> AsyncIterator[bytes]:
+    results: List[Dict[str, Any]] = []
+    batch_error: Optional[str] = None
+    if filled:
+        # O prazo conta a partir do bloco completo, não da leitura do upload.
+        block_deadline = deadline.renewed() if deadline is not None else None
+        try:
+            results = await _score_with_retry(score, buffer[:filled], block_deadline)
+        except ExecutorSaturatedError as exc:
+            REQUESTS_SHED.labels(reason="executor_saturated").inc()
+            logger.warning("Stream interrompido: %s", exc)
+            yield _dumps({"line": slots[0][0], "error": "Serviço sobrecarregado: stream interrompido"}) + b"\n"
+            raise _StreamAborted() from exc
+        except DeadlineExceededError as exc:
+            logger.warning("Stream interrompido: %s", exc)
+            yield _dumps({"line": slots[0][0], "error": "Prazo do pedido expirou: stream interrompido"}) + b"\n"
+            raise _StreamAborted() from exc
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Falha ao classificar bloco de %d linhas: %s", filled, exc)
+            batch_error = f"Erro interno: {exc}"
+
+    for line_number, row, error in slots:
+        if row is None:
+            record: Dict[str, Any] = {"line": line_number, "error": error}
+        elif batch_error is not None:
+            record = {"line": line_number, "error": batch_error}
+        else:
+            record = {"line": line_number, **results[row]}
+        yield _dumps(record) + b"\n"
+
+
+async def _score_with_retry(
+    score: ScoreMatrix, matrix: np.ndarray, deadline: Optional[Deadline] = None
+) -> List[Dict[str, Any]]:
+    for attempt in range(SATURATION_RETRIES):
+        try:
+            return await score(matrix, deadline)
+        except ExecutorSaturatedError:
+            await asyncio.sleep(SATURATION_BACKOFF_SECONDS * (attempt + 1))
+    return await score(matrix, deadline)
@@ -0,0 +1,288 @@
+"""
+Spans por etapa do pedido, header ``Server-Timing`` e exportação local.
+
+Com ``TRACING_ENABLED=true`` o :class:`TracingMiddleware` abre um trace por
+pedido HTTP; as etapas instrumentadas (``span("decode")``, ``span("inference")``,
+...) são medidas com ``time.perf_counter_ns`` e as de primeiro nível são
+devolvidas no header ``Server-Timing`` (em ms), mais ``total``. Uma fracção
+dos traces (``TRACING_SAMPLE_RATE``) é exportada para ``TRACING_EXPORT_PATH``
+em JSON Lines no formato OTLP/JSON (um ``ExportTraceServiceRequest`` por
+linha, o formato do file exporter do OpenTelemetry Collector), escrito por
+uma thread própria com fila limitada.
+
+Sem trace activo ``span()`` devolve um objecto nulo partilhado: o custo é uma
+leitura de ``ContextVar`` (ver ``benchmarks/tracing.py``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+SERVICE_NAME = "rihs-api"
+_SPAN_KIND_INTERNAL = 1
+_SPAN_KIND_SERVER = 2
+
+# Como no SDK do OpenTelemetry: ids aleatórios sem chamada ao sistema por span.
+_random_bits = random.getrandbits
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("rihs_trace", default=None)
+
+
+class _NoopSpan:
+    """Span usado quando não há trace activo: não mede nem guarda nada."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Uma etapa medida dentro de um :class:`Trace`."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = f"{_random_bits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = 0
+        self.end_ns = 0
+        self.attributes = attributes
+
+    def __enter__(self) -> "Span":
+        self.trace._stack.append(self.span_id)  # pylint: disable=protected-access
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.perf_counter_ns()
+        self.trace._stack.pop()  # pylint: disable=protected-access
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.spans.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans de um pedido; o span raiz cobre o pedido até ao início da resposta."""
+
+    def __init__(self, name: str, sampled: bool, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.trace_id = f"{_random_bits(128):032x}"
+        self.sampled = sampled
+        self.root = Span(self, name, None, attributes or {})
+        self.spans: List[Span] = []
+        self._stack: List[str] = [self.root.span_id]
+        # Relógio de parede no início, para converter perf_counter_ns em epoch.
+        self._epoch_ns = time.time_ns()
+        self.root.start_ns = time.perf_counter_ns()
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        return Span(self, name, self._stack[-1], attributes)
+
+    def finish(self) -> None:
+        if not self.root.end_ns:
+            self.root.end_ns = time.perf_counter_ns()
+
+    def server_timing(self) -> str:
+        """Valor do header ``Server-Timing`` com os spans de primeiro nível e o total."""
+        parts = []
+        for span in self.spans:
+            if span.parent_id == self.root.span_id:
+                parts.append(f"{span.name};dur={span.duration_ms:.3f}")
+        total_ns = (self.root.end_ns or time.perf_counter_ns()) - self.root.start_ns
+        parts.append(f"total;dur={total_ns / 1e6:.3f}")
+        return ", ".join(parts)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """``ExportTraceServiceRequest`` em OTLP/JSON com o span raiz e os filhos."""
+        origin = self.root.start_ns
+
+        def encode(span: Span, kind: int) -> Dict[str, Any]:
+            encoded: Dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": kind,
+                "startTimeUnixNano": str(self._epoch_ns + span.start_ns - origin),
+                "endTimeUnixNano": str(self._epoch_ns + span.end_ns - origin),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2 if "error" in span.attributes else 0},
+            }
+            if span.parent_id:
+                encoded["parentSpanId"] = span.parent_id
+            return encoded
+
+        spans = [encode(self.root, _SPAN_KIND_SERVER)]
+        spans.extend(encode(span, _SPAN_KIND_INTERNAL) for span in self.spans)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def span(name: str, **attributes: Any):
+    """Mede a etapa ``name`` no trace do pedido actual; sem trace não faz nada."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return trace.span(name, **attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class FileSpanExporter:
+    """
+    Escreve traces em JSON Lines (OTLP/JSON) numa thread própria; fila cheia descarta.
+
+    A thread é criada no primeiro ``export`` de cada processo (não sobrevive ao
+    fork dos workers). Cada lote é escrito com um único ``write`` em modo
+    append, pelo que vários workers podem partilhar o ficheiro.
+    """
+
+    def __init__(self, path: str | Path, max_queue: int = 1024) -> None:
+        self.path = Path(path)
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="span-exporter", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def export(self, trace: Trace) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        """Escreve os traces pendentes e termina a thread deste processo."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._pid = None
+
+    def _run(self, pending: "queue.Queue[Optional[Trace]]") -> None:
+        with self.path.open("ab", buffering=0) as sink:
+            while True:
+                batch = [pending.get()]
+                while batch[-1] is not None:
+                    try:
+                        batch.append(pending.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = [
+                    json.dumps(trace.to_otlp(), separators=(",", ":")) for trace in batch if trace is not None
+                ]
+                if lines:
+                    sink.write(("\n".join(lines) + "\n").encode("utf-8"))
+                if batch[-1] is None:
+                    return
+
+
+class TracingMiddleware:
+    """Middleware ASGI: abre o trace, acrescenta ``Server-Timing`` e exporta os traces amostrados."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 0.0,
+        exporter: Optional[FileSpanExporter] = None,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.exporter is not None and random.random() < self.sample_rate
+        trace = Trace(
+            f"{scope['method']} {scope['path']}",
+            sampled,
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                trace.finish()
+                trace.root.attributes["http.status_code"] = message["status"]
+                MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            if trace.sampled:
+                self.exporter.export(trace)
@@ -3,6 +3,7 @@
 from .logging import setup_logging, timing_decorator  # noqa: F401
 from .validation import (  # noqa: F401
     REQUIRED_FEATURES,
+    format_validation_error,
     normalize_features,
     validate_feature_payload,
 )
@@ -0,0 +1,166 @@
+"""
+Descodificação rápida de pedidos de predição.
+
+Faz o parse do corpo JSON uma única vez, resolve os aliases através de
+``FEATURE_ALIASES`` e escreve os valores directamente num vector float32 na
+ordem de colunas do modelo, aplicando os mesmos limites de ``PredictionInput``.
+
+O caminho rápido só aceita o caso comum (todas as features, números do tipo
+certo, dentro dos limites). Qualquer outro payload é entregue ao
+``PredictionInput`` do Pydantic, que produz exactamente os mesmos erros (ou
+aceita as mesmas coerções) que o schema.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.schemas import PredictionInput
+
+from .feature_aliases import CANONICAL_FEATURES, resolve_feature_name
+
+try:  # orjson é opcional: acelera o parse, mas json da stdlib é suficiente
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSONDecodeError: Tuple[type, ...] = (orjson.JSONDecodeError,)
+except ImportError:  # pragma: no cover - depende do ambiente
+    _json_loads = json.loads
+    _JSONDecodeError = (json.JSONDecodeError,)
+
+FEATURE_DTYPE = np.float32
+N_FEATURES = len(CANONICAL_FEATURES)
+
+
+def _build_feature_table() -> Tuple[Dict[str, int], List[Tuple[float, float, bool]]]:
+    """Mapeia cada nome aceite pelo schema para a coluna do modelo e os seus limites."""
+    index: Dict[str, int] = {}
+    bounds: List[Tuple[float, float, bool]] = [(-math.inf, math.inf, False)] * N_FEATURES
+    for field_name, field in PredictionInput.model_fields.items():
+        column = CANONICAL_FEATURES.index(resolve_feature_name(field_name))
+        for accepted_name in {field_name, field.alias or field_name}:
+            if resolve_feature_name(accepted_name) != CANONICAL_FEATURES[column]:
+                raise RuntimeError(f"Alias inconsistente com FEATURE_ALIASES: {accepted_name}")
+            index[accepted_name] = column
+        lower, upper = -math.inf, math.inf
+        for constraint in field.metadata:
+            lower = getattr(constraint, "ge", lower)
+            upper = getattr(constraint, "le", upper)
+        bounds[column] = (float(lower), float(upper), field.annotation is int)
+    return index, bounds
+
+
+FEATURE_INDEX, FEATURE_BOUNDS = _build_feature_table()
+
+
+class JSONBodyError(ValueError):
+    """O corpo do pedido não é JSON válido (ou está vazio)."""
+
+    def __init__(self, message: str, position: int = 0, missing: bool = False) -> None:
+        super().__init__(message)
+        self.position = position
+        self.missing = missing
+
+
+def parse_json(body: bytes) -> Any:
+    """Faz o parse do corpo JSON (com orjson, quando disponível)."""
+    if not body:
+        raise JSONBodyError("Field required", missing=True)
+    try:
+        return _json_loads(body)
+    except _JSONDecodeError:
+        pass
+    # Erro: repete com a stdlib para obter a mesma posição/mensagem que o FastAPI.
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as err:
+        raise JSONBodyError(err.msg, position=err.pos) from err
+
+
+def decode_features(body: bytes, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Descodifica um corpo JSON de `/predict` para um vector float32 ordenado."""
+    return decode_mapping(parse_json(body), out)
+
+
+def decode_mapping(payload: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Escreve um payload (dict já descodificado) em ``out`` na ordem do modelo.
+
+    ``out`` pode ser uma linha de uma matriz pré-alocada; quando omitido é
+    alocado um vector novo. Lança ``pydantic.ValidationError`` para payloads
+    que o schema rejeita.
+    """
+    if out is None:
+        out = np.empty(N_FEATURES, dtype=FEATURE_DTYPE)
+    if _decode_fast(payload, out):
+        return out
+
+    # Caminho lento: o Pydantic decide (e produz as mensagens de erro do schema).
+    validated = PredictionInput.model_validate(payload)
+    values = validated.to_feature_dict()
+    for column, feature in enumerate(CANONICAL_FEATURES):
+        out[column] = values[feature]
+    return out
+
+
+def _decode_fast(payload: Any, out: np.ndarray) -> bool:
+    if type(payload) is not dict or len(payload) != N_FEATURES:
+        return False
+    seen = 0
+    index_get = FEATURE_INDEX.get
+    for key, value in payload.items():
+        column = index_get(key)
+        if column is None:
+            return False
+        lower, upper, is_int = FEATURE_BOUNDS[column]
+        value_type = type(value)
+        if value_type is not int and (is_int or value_type is not float):
+            return False
+        if not lower <= value <= upper:
+            return False
+        out[column] = value
+        seen |= 1 << column
+    # Garante que nenhuma feature foi enviada duas vezes (alias + nome canónico).
+    return seen == (1 << N_FEATURES) - 1
+
+
+def request_validation_errors(exc: Exception) -> List[Dict[str, Any]]:
+    """Converte erros de descodificação no formato de erro de corpo do FastAPI."""
+    if isinstance(exc, JSONBodyError):
+        if exc.missing:
+            return [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        return [{
+            "type": "json_invalid",
+            "loc": ("body", exc.position),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": str(exc)},
+        }]
+    if isinstance(exc, ValidationError):
+        return [{**error, "loc": ("body", *error["loc"])} for error in exc.errors()]
+    raise TypeError(f"Erro de descodificação inesperado: {exc!r}")
+
+
+def decode_many(payloads: List[Mapping[str, Any]]) -> Tuple[np.ndarray, List[int], Dict[int, ValidationError]]:
+    """
+    Descodifica vários payloads para uma matriz (N x features) float32.
+
+    Devolve a matriz das linhas válidas, os índices de origem dessas linhas
+    e os erros de validação por índice.
+    """
+    matrix = np.empty((len(payloads), N_FEATURES), dtype=FEATURE_DTYPE)
+    valid_indices: List[int] = []
+    errors: Dict[int, ValidationError] = {}
+    for index, payload in enumerate(payloads):
+        try:
+            decode_mapping(payload, matrix[len(valid_indices)])
+        except ValidationError as err:
+            errors[index] = err
+            continue
+        valid_indices.append(index)
+    return matrix[: len(valid_indices)], valid_indices, errors
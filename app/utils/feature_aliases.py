@@ -35,6 +35,7 @@ FEATURE_ALIASES: Dict[str, str] = {
     "avaliação_clientes": "avaliacao_clientes",
     "distância_do_centro_km": "distancia_do_centro_km",
     "energia_renovável": "energia_renovavel",
+    "energia_renovável_%": "energia_renovavel",
     "gestão_resíduos_índice": "gestao_residuos_indice",
     "consumo_água_por_hóspede": "consumo_agua_por_hospede",
     "região_encoded": "regiao_encoded",
@@ -1,28 +1,306 @@
+"""
+Configuração de logging da aplicação.
+
+Os registos não são escritos na thread que os emite: o handler do logger
+raiz apenas coloca o ``LogRecord`` numa fila limitada e uma thread dedicada
+faz a formatação (JSON estruturado, uma linha por registo) e a escrita, em
+lotes. Com a fila cheia o registo é descartado (nunca bloqueia o event loop)
+e contado em ``rihs_log_records_dropped_total{reason="queue_full"}``.
+
+Cada logger pode ter uma taxa de amostragem (``LOG_SAMPLE_RATES``, p.ex.
+``app.main=0.01,uvicorn.access=0.1``; vale o prefixo mais longo). Avisos e
+erros nunca são amostrados.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import sys
+import threading
 import time
+from datetime import datetime, timezone
 from functools import wraps
-from typing import Any, Callable
+from typing import IO, Any, Callable, Dict, List, Mapping, Optional
+
+from ..tracing import span
+from .metrics import LOG_RECORDS_DROPPED
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Atributos de qualquer LogRecord; o resto veio de ``extra=`` e entra no JSON.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional["BatchingQueueListener"] = None
+_handler: Optional["DroppingQueueHandler"] = None
+
+
+def parse_sample_rates(value: str | Mapping[str, float] | None) -> Dict[str, float]:
+    """Converte ``"logger=taxa,..."`` num dicionário; taxas fora de [0, 1] são erro."""
+    if not value:
+        return {}
+    items = value.items() if isinstance(value, Mapping) else (
+        part.split("=", 1) for part in value.split(",") if part.strip()
+    )
+    rates: Dict[str, float] = {}
+    for name, rate in items:
+        rate = float(rate)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"Taxa de amostragem de {name!r} deve estar entre 0 e 1")
+        rates[name.strip()] = rate
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """Um objecto JSON por registo: ``ts``, ``level``, ``logger``, ``message`` e campos ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode("utf-8")
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar uma fracção dos registos abaixo de WARNING, por logger."""
+
+    def __init__(self, rates: Mapping[str, float]) -> None:
+        super().__init__()
+        # Prefixos mais longos primeiro: "app.main" prevalece sobre "app".
+        self._rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._cache: Dict[str, float] = {}
+        self._random = random.random
+        self._dropped = LOG_RECORDS_DROPPED.labels(reason="sampled")
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, prefix_rate in self._rates:
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = prefix_rate
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or self._random() < rate:
+            return True
+        self._dropped.inc()
+        return False
+
+
+class DroppingQueueHandler(logging.Handler):
+    """Coloca o registo na fila sem formatar nem bloquear; com a fila cheia descarta-o."""
+
+    def __init__(self, record_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__()
+        self.queue = record_queue
+        self._dropped = LOG_RECORDS_DROPPED.labels(reason="queue_full")
 
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._dropped.inc()
 
-def setup_logging() -> None:
-    """Configura o logging padrão da aplicação."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Sem o lock do Handler: a fila já é thread-safe.
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+
+class BatchingQueueListener:
+    """Thread que esvazia a fila, formata os registos e escreve-os em lotes."""
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        record_queue: "queue.Queue[Any]",
+        stream: Optional[IO[str]],
+        formatter: logging.Formatter,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+    ) -> None:
+        self.queue = record_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Escreve o que ainda está na fila e termina a thread."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.queue.put(self._STOP, timeout=max(deadline - time.monotonic(), 0.01))
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    break
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Any] = [self.queue.get()]
+            # Junta o que chegar durante ``flush_interval`` (até ``batch_size`` registos).
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._STOP
+            self._write([record for record in batch if record is not self._STOP])
+            if stopping:
+                return
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        if not records:
+            return
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:  # pylint: disable=broad-except
+                LOG_RECORDS_DROPPED.labels(reason="format_error").inc()
+        if not lines:
+            return
+        # Sem stream explícito usa o sys.stderr actual (pode ter sido substituído, p.ex. pelo pytest).
+        stream = self.stream or sys.stderr
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:  # pylint: disable=broad-except  # pragma: no cover - stream fechado
+            pass
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    json_format: bool = True,
+    sample_rates: str | Mapping[str, float] | None = None,
+    queue_size: int = 10_000,
+    batch_size: int = 256,
+    stream: Optional[IO[str]] = None,
+) -> BatchingQueueListener:
+    """
+    Configura o logger raiz com a fila limitada e a thread de escrita.
+
+    Chamadas repetidas substituem a configuração anterior (depois de escrever
+    o que estava pendente). Após ``fork`` o filho recebe uma fila e uma
+    thread novas.
+    """
+    global _listener, _handler  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+
+    formatter: logging.Formatter = (
+        JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT)
     )
+    record_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(record_queue)
+    rates = parse_sample_rates(sample_rates)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+
+    # Nenhum dos formatos usa ficheiro/linha/processo: evita a inspecção da pilha
+    # (findCaller) e as consultas ao processo em cada LogRecord criado (ver a
+    # secção "Optimization" do Logging HOWTO).
+    logging._srcfile = None  # pylint: disable=protected-access
+    logging.logMultiprocessing = False
+    logging.logProcesses = False
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, DroppingQueueHandler) or type(existing) is logging.StreamHandler:
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = BatchingQueueListener(record_queue, stream, formatter, batch_size=batch_size)
+    listener.start()
+    _listener, _handler = listener, handler
+    return listener
+
+
+def _restart_in_child() -> None:
+    """Após ``fork``, dá ao filho uma fila e uma thread novas para a configuração actual."""
+    # A thread de escrita não sobrevive ao fork e a fila pode ter ficado com o lock preso.
+    global _listener  # pylint: disable=global-statement
+    if _listener is None or _handler is None:
+        return
+    fresh: "queue.Queue[Any]" = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler.queue = fresh
+    child = BatchingQueueListener(
+        fresh,
+        _listener.stream,
+        _listener.formatter,
+        batch_size=_listener.batch_size,
+        flush_interval=_listener.flush_interval,
+    )
+    child.start()
+    _listener = child
+
+
+def shutdown_logging() -> None:
+    """Escreve os registos pendentes e pára a thread de escrita."""
+    global _listener, _handler  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _handler = None
+
+
+atexit.register(shutdown_logging)
+# Um único hook por processo, para a configuração que estiver activa no fork.
+os.register_at_fork(after_in_child=_restart_in_child)
 
 
 def timing_decorator(func: Callable) -> Callable:
-    """Decorator para medir tempo de execução de funções síncronas."""
+    """Decorator para medir tempo de execução de funções síncronas (e registá-lo como span)."""
 
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        duration = time.time() - start_time
+        start_ns = time.perf_counter_ns()
+        with span(func.__name__):
+            result = func(*args, **kwargs)
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
         logging.info("%s executado em %.4f segundos", func.__name__, duration)
         return result
 
     return wrapper
-
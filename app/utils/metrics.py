@@ -1,9 +1,250 @@
+"""
+Métricas Prometheus da aplicação (prefixo ``rihs_``).
+
+Com vários processos (``python -m app.launcher --workers N`` ou o executor em
+modo ``process``) as métricas usam o modo multiprocesso do ``prometheus_client``:
+com ``PROMETHEUS_MULTIPROC_DIR`` definida antes do arranque cada processo
+escreve os seus valores num ficheiro dessa pasta e ``/metrics`` agrega-os
+(contadores e histogramas somados; cada gauge declara o seu
+``multiprocess_mode``). O launcher cria e limpa a pasta automaticamente.
+"""
+
 from __future__ import annotations
 
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
 from prometheus_fastapi_instrumentator import Instrumentator
 
+# Micro-batching de pedidos concorrentes (app/batching.py)
+MICROBATCH_SIZE = Histogram(
+    "rihs_microbatch_size",
+    "Número de linhas por micro-lote classificado",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+MICROBATCH_WAIT_SECONDS = Histogram(
+    "rihs_microbatch_wait_seconds",
+    "Tempo de espera de cada pedido na fila do micro-batcher",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+MICROBATCH_QUEUE_DEPTH = Gauge(
+    "rihs_microbatch_queue_depth",
+    "Pedidos à espera na fila do micro-batcher",
+    multiprocess_mode="livesum",
+)
+MICROBATCH_WINDOW_SECONDS = Gauge(
+    "rihs_microbatch_window_seconds",
+    "Janela configurada de agregação do micro-batcher",
+    multiprocess_mode="livemax",
+)
+MICROBATCH_MAX_SIZE = Gauge(
+    "rihs_microbatch_max_size",
+    "Tamanho máximo configurado de cada micro-lote",
+    multiprocess_mode="livemax",
+)
+
+# Executor de inferência (app/executor.py)
+INFERENCE_EXECUTOR_WORKERS = Gauge(
+    "rihs_inference_executor_workers",
+    "Número de workers do executor de inferência",
+    multiprocess_mode="livemax",
+)
+INFERENCE_EXECUTOR_PENDING = Gauge(
+    "rihs_inference_executor_pending",
+    "Tarefas de inferência em curso ou em fila no executor",
+    multiprocess_mode="livesum",
+)
+INFERENCE_EXECUTOR_ACTIVE = Gauge(
+    "rihs_inference_executor_active",
+    "Tarefas de inferência em execução nos workers (modo thread)",
+    multiprocess_mode="livesum",
+)
+INFERENCE_EXECUTOR_REJECTED = Counter(
+    "rihs_inference_executor_rejected",
+    "Tarefas rejeitadas por saturação do executor de inferência",
+)
+INFERENCE_EXECUTOR_QUEUE_WAIT_SECONDS = Histogram(
+    "rihs_inference_executor_queue_wait_seconds",
+    "Tempo entre a submissão e o início da tarefa no executor",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Cache de resultados de predição (app/cache.py)
+PREDICTION_CACHE_HITS = Counter(
+    "rihs_prediction_cache_hits",
+    "Predições servidas a partir da cache",
+)
+PREDICTION_CACHE_MISSES = Counter(
+    "rihs_prediction_cache_misses",
+    "Consultas à cache de predições sem resultado",
+)
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "rihs_prediction_cache_evictions",
+    "Entradas removidas da cache de predições",
+    ["reason"],
+)
+PREDICTION_CACHE_ENTRIES = Gauge(
+    "rihs_prediction_cache_entries",
+    "Número de entradas na cache de predições",
+    multiprocess_mode="livesum",
+)
+PREDICTION_CACHE_BYTES = Gauge(
+    "rihs_prediction_cache_bytes",
+    "Memória estimada ocupada pela cache de predições",
+    multiprocess_mode="livesum",
+)
+
+# Prazos e controlo de admissão (app/admission.py)
+ADMISSION_IN_FLIGHT = Gauge(
+    "rihs_admission_in_flight",
+    "Pedidos de inferência admitidos e ainda em curso",
+    multiprocess_mode="livesum",
+)
+REQUESTS_SHED = Counter(
+    "rihs_requests_shed",
+    "Pedidos descartados ou rejeitados por sobrecarga",
+    ["reason"],
+)
+REQUEST_QUEUE_SECONDS = Histogram(
+    "rihs_request_queue_seconds",
+    "Tempo desde a chegada do pedido até ao início da inferência",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# Recarregamento do modelo (app/reloader.py)
+MODEL_RELOADS = Counter(
+    "rihs_model_reloads",
+    "Tentativas de recarregamento do modelo, por resultado",
+    ["outcome"],
+)
+MODEL_RELOAD_SECONDS = Histogram(
+    "rihs_model_reload_seconds",
+    "Tempo para carregar, aquecer e validar o novo modelo (em segundo plano)",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+MODEL_SWAP_SECONDS = Histogram(
+    "rihs_model_swap_seconds",
+    "Duração da troca da referência do modelo servido",
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0),
+)
+MODEL_SWAPS = Counter(
+    "rihs_model_swaps",
+    "Trocas do modelo servido, por versão antiga e nova",
+    ["old_version", "new_version"],
+)
+MODEL_ACTIVE_VERSION = Gauge(
+    "rihs_model_active_version",
+    "1 para a versão do modelo actualmente servida, 0 para versões substituídas",
+    ["version"],
+    multiprocess_mode="livemax",
+)
+
+# Registo de versões do modelo (app/registry.py)
+MODEL_REGISTRY_VERSIONS = Gauge(
+    "rihs_model_registry_versions",
+    "Versões não-padrão do modelo carregadas em memória",
+    multiprocess_mode="livesum",
+)
+MODEL_REGISTRY_BYTES = Gauge(
+    "rihs_model_registry_bytes",
+    "Memória estimada das versões não-padrão carregadas",
+    multiprocess_mode="livesum",
+)
+MODEL_REGISTRY_LOADS = Counter(
+    "rihs_model_registry_loads",
+    "Carregamentos de versões do modelo sob pedido",
+    ["version"],
+)
+MODEL_REGISTRY_EVICTIONS = Counter(
+    "rihs_model_registry_evictions",
+    "Versões descarregadas por excederem o orçamento de memória",
+)
+
+# Classificação sombra (app/shadow.py)
+SHADOW_REQUESTS = Counter(
+    "rihs_shadow_requests",
+    "Pedidos amostrados para classificação sombra, por resultado (scored/dropped/failed)",
+    ["outcome"],
+)
+SHADOW_COMPARISONS = Counter(
+    "rihs_shadow_comparisons",
+    "Matriz de confusão entre a classe servida e a classe do modelo sombra",
+    ["primary", "shadow"],
+)
+SHADOW_AGREEMENT_RATE = Gauge(
+    "rihs_shadow_agreement_rate",
+    "Fracção das classificações sombra que coincidem com a classe servida",
+    multiprocess_mode="liveall",
+)
+SHADOW_LATENCY_DELTA_SECONDS = Histogram(
+    "rihs_shadow_latency_delta_seconds",
+    "Latência do modelo sombra menos a latência servida (negativo: sombra mais rápido)",
+    buckets=(-0.1, -0.025, -0.01, -0.005, -0.001, 0.0, 0.001, 0.005, 0.01, 0.025, 0.1, 0.5),
+)
+
+# Logging assíncrono (app/utils/logging.py)
+LOG_RECORDS_DROPPED = Counter(
+    "rihs_log_records_dropped",
+    "Registos de log descartados, por motivo (sampled/queue_full/format_error)",
+    ["reason"],
+)
+
+# Inferência (app/models.py) e descodificação dos pedidos (app/main.py, app/streaming.py)
+BATCH_SIZE_LABELS = ((1, "1"), (8, "2-8"), (64, "9-64"), (512, "65-512"))
+
+
+def batch_size_label(rows: int) -> str:
+    """Classe de tamanho do lote usada como label (cardinalidade limitada)."""
+    for limit, label in BATCH_SIZE_LABELS:
+        if rows <= limit:
+            return label
+    return "513+"
+
+
+INFERENCE_SECONDS = Histogram(
+    "rihs_inference_seconds",
+    "Duração de cada chamada ao modelo, por versão e tamanho do lote",
+    ["model_version", "batch_size"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+INFERENCE_ROWS = Counter(
+    "rihs_inference_rows",
+    "Linhas classificadas (linhas/s: rate(rihs_inference_rows_total[1m]))",
+    ["model_version"],
+)
+PREDICTED_CLASSES = Counter(
+    "rihs_predicted_classes",
+    "Distribuição das classes preditas, por versão do modelo",
+    ["model_version", "prediction"],
+)
+FEATURE_DECODE_SECONDS = Histogram(
+    "rihs_feature_decode_seconds",
+    "Tempo de descodificação do corpo até à matriz de features, por endpoint e formato",
+    ["endpoint", "format"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.05, 0.25),
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "rihs_model_load_seconds",
+    "Tempo de carregamento do modelo (desserialização, compilação e política de threads)",
+    ["version"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
 
 def init_metrics(app) -> None:
-    """Configura o Prometheus Instrumentator para expor métricas em /metrics."""
-    Instrumentator().instrument(app).expose(app, endpoint="/metrics", include_in_schema=False)
+    """Configura o Prometheus Instrumentator (métricas HTTP); ``/metrics`` é servido por :func:`render_latest`."""
+    Instrumentator().instrument(app)
+
+
+def render_latest() -> bytes:
+    """
+    Métricas no formato de texto do Prometheus.
 
+    Com ``PROMETHEUS_MULTIPROC_DIR`` agrega os ficheiros de todos os processos
+    num registo novo; o registo por omissão só teria os valores deste worker.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
+from pydantic import ValidationError
+
 from .feature_aliases import CANONICAL_FEATURES, FEATURE_ALIASES, resolve_feature_name
 
 REQUIRED_FEATURES = tuple(CANONICAL_FEATURES)
@@ -44,3 +46,11 @@ def ensure_only_known_features(features: Dict[str, Any]) -> None:
     if unknown:
         raise ValueError(f"Features desconhecidas recebidas: {', '.join(unknown)}")
 
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    """Resume um ``ValidationError`` do Pydantic numa única linha legível."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'payload'}: {error['msg']}"
+        for error in exc.errors()
+    )
@@ -0,0 +1,324 @@
+"""
+Formatos de transporte dos endpoints de classificação.
+
+Além de JSON, os endpoints aceitam e devolvem MessagePack (``msgpack``) e,
+para lotes, Apache Arrow IPC (``pyarrow``, formato *stream*). Ambos os pacotes
+são opcionais: sem eles o formato correspondente responde 415.
+
+As respostas JSON são escritas directamente com ``orjson`` (quando instalado)
+a partir dos dicionários produzidos pelo modelo, sem voltar a validá-los com
+Pydantic. A forma ``compact`` omite ``all_probabilities`` (as mesmas
+probabilidades de ``probabilities``, indexadas pelo nome da classe).
+
+Um lote Arrow tem uma coluna por feature (nome canónico ou alias) e é escrito
+directamente na matriz de features do modelo, coluna a coluna, sem criar
+dicionários por linha. Os mesmos limites de ``PredictionInput`` são
+verificados de forma vectorizada; linhas fora dos limites recebem erro
+individual. A resposta Arrow tem uma linha por linha de entrada.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .decoding import FEATURE_BOUNDS, FEATURE_DTYPE, N_FEATURES, parse_json
+from .feature_aliases import CANONICAL_FEATURES, resolve_feature_name
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pa_ipc = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+
+MEDIA_TYPES: Dict[str, str] = {
+    JSON: "application/json",
+    MSGPACK: "application/msgpack",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+_FORMAT_BY_MEDIA_TYPE: Dict[str, str] = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+
+FULL = "full"
+COMPACT = "compact"
+RESPONSE_SHAPES = (FULL, COMPACT)
+
+
+class UnsupportedMediaTypeError(ValueError):
+    """Formato não suportado pelo endpoint ou sem o pacote opcional instalado."""
+
+
+class WireFormatError(ValueError):
+    """Corpo binário inválido (MessagePack/Arrow malformado ou colunas erradas)."""
+
+
+def available_formats() -> List[str]:
+    """Formatos utilizáveis neste processo (dependem dos pacotes instalados)."""
+    formats = [JSON]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if pa is not None:
+        formats.append(ARROW)
+    return formats
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def request_format(content_type: Optional[str], allowed: Sequence[str]) -> str:
+    """
+    Formato do corpo do pedido a partir do ``Content-Type``.
+
+    Tipos não reconhecidos (ou ausentes) são tratados como JSON, tal como antes.
+    """
+    fmt = _FORMAT_BY_MEDIA_TYPE.get(_media_type(content_type or ""), JSON)
+    if fmt not in allowed or fmt not in available_formats():
+        raise UnsupportedMediaTypeError(f"Content-Type não suportado: {MEDIA_TYPES[fmt]}")
+    return fmt
+
+
+def response_format(accept: Optional[str], allowed: Sequence[str]) -> str:
+    """Escolhe o formato da resposta pelo ``Accept`` (qualidade ``q``); por omissão JSON."""
+    if not accept:
+        return JSON
+    usable = [fmt for fmt in allowed if fmt in available_formats()]
+    best, best_quality = JSON, 0.0
+    for position, item in enumerate(accept.split(",")):
+        media_type, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        fmt = _FORMAT_BY_MEDIA_TYPE.get(media_type.strip().lower())
+        # Em caso de empate ganha o primeiro da lista (subtrai-se a posição).
+        score = quality - position * 1e-6
+        if fmt in usable and quality > 0 and score > best_quality:
+            best, best_quality = fmt, score
+    return best
+
+
+def load_body(body: bytes, fmt: str) -> Any:
+    """Faz o parse de um corpo JSON ou MessagePack para objectos Python."""
+    if fmt == JSON:
+        return parse_json(body)
+    if fmt == MSGPACK:
+        try:
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        except Exception as exc:  # pylint: disable=broad-except
+            raise WireFormatError(f"Corpo MessagePack inválido: {exc}") from exc
+    raise UnsupportedMediaTypeError(f"Formato sem representação em objectos: {fmt}")
+
+
+def dump_body(value: Any, fmt: str) -> bytes:
+    """Serializa um objecto Python (dicts/listas/números) em JSON ou MessagePack."""
+    if fmt == MSGPACK:
+        return msgpack.packb(value, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def shape_result(result: Dict[str, Any], shape: str) -> Dict[str, Any]:
+    """Resultado na forma pedida; ``compact`` remove ``all_probabilities``."""
+    if shape == COMPACT and "all_probabilities" in result:
+        compact = dict(result)  # o dicionário do modelo pode estar na cache: não é alterado
+        del compact["all_probabilities"]
+        return compact
+    return result
+
+
+def dump_batch_results(
+    total: int,
+    valid_indices: Sequence[int],
+    results: Sequence[Dict[str, Any]],
+    errors: Mapping[int, str],
+    model_version: str,
+    shape: str,
+    fmt: str,
+) -> bytes:
+    """Serializa um lote com a estrutura de ``BatchPredictionOutput``, sem modelos Pydantic."""
+    items: List[Optional[Dict[str, Any]]] = [None] * total
+    for index, message in errors.items():
+        items[index] = {"index": index, "result": None, "error": message}
+    for index, result in zip(valid_indices, results):
+        items[index] = {"index": index, "result": shape_result(result, shape), "error": None}
+    return dump_body(
+        {
+            "results": items,
+            "total": total,
+            "succeeded": total - len(errors),
+            "failed": len(errors),
+            "model_version": model_version,
+        },
+        fmt,
+    )
+
+
+def _read_arrow_table(body: bytes):
+    try:
+        return pa_ipc.open_stream(pa.py_buffer(body)).read_all()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OSError) as exc:
+        raise WireFormatError(f"Corpo Arrow IPC inválido: {exc}") from exc
+
+
+def _arrow_columns(table) -> List[Tuple[str, int]]:
+    """Associa cada coluna do lote à coluna do modelo; erros estruturais levantam WireFormatError."""
+    columns: List[Tuple[str, int]] = []
+    seen: Dict[int, str] = {}
+    unknown: List[str] = []
+    for name in table.column_names:
+        canonical = resolve_feature_name(name)
+        if canonical not in CANONICAL_FEATURES:
+            unknown.append(name)
+            continue
+        column = CANONICAL_FEATURES.index(canonical)
+        if column in seen:
+            raise WireFormatError(f"Feature enviada em duplicado: {seen[column]} e {name}")
+        field_type = table.schema.field(name).type
+        if not (pa.types.is_integer(field_type) or pa.types.is_floating(field_type)):
+            raise WireFormatError(f"Coluna {name} deve ser numérica (recebido {field_type})")
+        seen[column] = name
+        columns.append((name, column))
+    if unknown:
+        raise WireFormatError(f"Features não suportadas: {', '.join(sorted(unknown))}")
+    missing = [CANONICAL_FEATURES[c] for c in range(N_FEATURES) if c not in seen]
+    if missing:
+        raise WireFormatError(f"Features obrigatórias ausentes: {', '.join(missing)}")
+    return columns
+
+
+def decode_arrow_batch(body: bytes) -> Tuple[np.ndarray, List[int], Dict[int, str]]:
+    """
+    Descodifica um lote Arrow IPC para a matriz de features (float32).
+
+    Devolve a matriz das linhas válidas, os índices de origem dessas linhas e
+    as mensagens de erro por índice, como ``decode_many``.
+    """
+    table = _read_arrow_table(body)
+    columns = _arrow_columns(table)
+    n_rows = table.num_rows
+    matrix = np.empty((n_rows, N_FEATURES), dtype=FEATURE_DTYPE)
+    invalid = np.zeros(n_rows, dtype=bool)
+    messages: Dict[int, List[str]] = {}
+
+    def reject(mask: np.ndarray, message: str) -> None:
+        for index in np.flatnonzero(mask):
+            messages.setdefault(int(index), []).append(message)
+        np.logical_or(invalid, mask, out=invalid)
+
+    for name, column in columns:
+        values = np.asarray(
+            table.column(name).to_numpy(zero_copy_only=False), dtype=np.float64
+        )
+        lower, upper, is_int = FEATURE_BOUNDS[column]
+        missing = np.isnan(values)
+        if missing.any():
+            reject(missing, f"{name}: valor em falta")
+        present = ~missing
+        if is_int:
+            reject(present & (values != np.trunc(values)), f"{name}: deve ser um inteiro")
+        with np.errstate(invalid="ignore"):
+            out_of_range = present & ((values < lower) | (values > upper))
+        if out_of_range.any():
+            reject(out_of_range, f"{name}: deve estar entre {lower:g} e {upper:g}")
+        matrix[:, column] = values
+
+    valid_indices = np.flatnonzero(~invalid)
+    errors = {index: "; ".join(parts) for index, parts in messages.items()}
+    if len(valid_indices) == n_rows:
+        return matrix, valid_indices.tolist(), errors
+    return matrix[valid_indices], valid_indices.tolist(), errors
+
+
+def encode_arrow_batch(
+    n_rows: int,
+    valid_indices: Sequence[int],
+    predictions: np.ndarray,
+    probabilities: np.ndarray,
+    class_labels: Mapping[int, str],
+    errors: Mapping[int, str],
+    model_version: str,
+) -> bytes:
+    """
+    Serializa os resultados de um lote num stream Arrow IPC.
+
+    Colunas: ``index``, ``prediction``, ``prediction_label``, ``confidence``,
+    uma coluna ``prob_<classe>`` por classe e ``error``. Linhas com erro têm
+    os campos do resultado a nulo. A versão do modelo vai nos metadados do schema.
+    """
+    valid = np.asarray(valid_indices, dtype=np.int64)
+    mask = np.ones(n_rows, dtype=bool)
+    mask[valid] = False  # True = nulo
+
+    prediction_column = np.zeros(n_rows, dtype=np.int64)
+    confidence_column = np.zeros(n_rows, dtype=np.float64)
+    labels: List[Optional[str]] = [None] * n_rows
+    if len(valid):
+        prediction_column[valid] = predictions
+        confidence_column[valid] = np.round(probabilities.max(axis=1) * 100.0, 2)
+        label_lookup = {int(k): v for k, v in class_labels.items()}
+        for index, prediction in zip(valid.tolist(), np.asarray(predictions).tolist()):
+            labels[index] = label_lookup.get(int(prediction), "Desconhecido")
+
+    arrays = [
+        pa.array(np.arange(n_rows, dtype=np.int64)),
+        pa.array(prediction_column, mask=mask),
+        pa.array(labels, type=pa.string()),
+        pa.array(confidence_column, mask=mask),
+    ]
+    names = ["index", "prediction", "prediction_label", "confidence"]
+    n_classes = probabilities.shape[1] if probabilities.ndim == 2 else len(class_labels)
+    for class_index in range(n_classes):
+        column = np.zeros(n_rows, dtype=np.float64)
+        if len(valid):
+            column[valid] = probabilities[:, class_index]
+        arrays.append(pa.array(column, mask=mask))
+        names.append(f"prob_{class_index}")
+    arrays.append(pa.array([errors.get(index) for index in range(n_rows)], type=pa.string()))
+    names.append("error")
+
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    schema = batch.schema.with_metadata({"model_version": str(model_version)})
+    sink = pa.BufferOutputStream()
+    with pa_ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+
+def features_to_arrow(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Constrói um corpo Arrow IPC a partir de dicts (útil para clientes e testes)."""
+    rows = list(rows)
+    columns = {name: [row.get(name) for row in rows] for name in (rows[0] if rows else {})}
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa_ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1 @@
+"""Benchmarks de desempenho do caminho de inferência."""
@@ -0,0 +1,84 @@
+"""
+Compara o custo por pedido da descodificação rápida com o caminho anterior.
+
+Caminho anterior: ``PredictionInput`` -> ``to_feature_dict`` -> ``normalize_features``
+-> ``validate_feature_payload`` -> ``SustainabilityModel.build_feature_vector``
+(que normaliza e valida de novo). Caminho novo: ``decode_features``.
+
+Uso::
+
+    python -m benchmarks.decode --iterations 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.models import SustainabilityModel
+from app.schemas import PredictionInput
+from app.utils.decoding import decode_features
+from app.utils.validation import normalize_features, validate_feature_payload
+
+
+def legacy_decode(body: bytes, model: SustainabilityModel):
+    input_data = PredictionInput.model_validate_json(body)
+    features = normalize_features(input_data.to_feature_dict())
+    validate_feature_payload(features)
+    return model.build_feature_vector(features)
+
+
+def fast_decode(body: bytes, model: SustainabilityModel):
+    return decode_features(body)
+
+
+def measure(func, body: bytes, model: SustainabilityModel, iterations: int) -> dict:
+    for _ in range(min(iterations, 1000)):
+        func(body, model)
+
+    started = time.process_time()
+    for _ in range(iterations):
+        func(body, model)
+    cpu_seconds = time.process_time() - started
+
+    # Pico de memória alocada durante cada pedido (inclui objectos temporários).
+    sample = min(iterations, 1000)
+    peaks = 0
+    tracemalloc.start()
+    for _ in range(sample):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(body, model)
+        peaks += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return {
+        "cpu_us_per_request": cpu_seconds / iterations * 1e6,
+        "peak_bytes_per_request": peaks / sample,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    body = json.dumps(PredictionInput.model_config["json_schema_extra"]["example"]).encode()
+    model = SustainabilityModel()
+    results = {
+        "legacy": measure(legacy_decode, body, model, args.iterations),
+        "fast": measure(fast_decode, body, model, args.iterations),
+    }
+    for name, result in results.items():
+        print(
+            f"{name:>6}: {result['cpu_us_per_request']:8.2f} µs CPU/pedido, "
+            f"{result['peak_bytes_per_request']:8.0f} bytes alocados (pico)/pedido"
+        )
+    speedup = results["legacy"]["cpu_us_per_request"] / results["fast"]["cpu_us_per_request"]
+    print(f"redução de CPU: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
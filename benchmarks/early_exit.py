@@ -0,0 +1,86 @@
+"""
+Paragem antecipada do ensemble: latência e concordância com o ensemble completo.
+
+Usa as linhas de ``dataset_ready_for_ml.csv`` (repetidas para formar lotes
+maiores) e compara ``CompiledForest.predict_proba`` (todas as árvores) com
+``predict_proba_early`` para vários tamanhos de bloco e, opcionalmente, com
+um orçamento de tempo. Reporta a concordância da classe prevista com o
+ensemble completo, a média de árvores usadas e o desvio máximo de
+probabilidade.
+
+Uso::
+
+    python -m benchmarks.early_exit --rows 1 96 960 9600 --chunks 8 16 32 --budget-ms 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from ml.model_loader import load_model
+from ml.score import DEFAULT_MODEL_PATH, read_feature_matrix
+from ml.tree_engine import compile_estimator
+
+
+def best_of(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="dataset_ready_for_ml.csv")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 96, 960, 9600])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--budget-ms", type=float, nargs="*", default=[])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    loaded, _ = load_model(args.model)
+    estimator = loaded.get("model") if isinstance(loaded, dict) else loaded
+    forest = compile_estimator(estimator)
+    if forest is None:
+        raise SystemExit(f"Estimador {type(estimator).__name__} não suportado pelo motor compilado")
+
+    data = read_feature_matrix(args.data)
+    print(
+        f"{forest.kind}: {forest.n_trees} árvores; primeira paragem possível após "
+        f"{forest.first_exit} árvores; {len(data)} linhas em {args.data}"
+    )
+    print(f"{'linhas':>7} {'modo':>12} {'ms':>9} {'speedup':>8} {'árvores':>8} {'concord.':>9} {'max Δp':>8}")
+
+    for rows in args.rows:
+        matrix = np.resize(data, (rows, data.shape[1]))
+        full = forest.predict_proba(matrix)
+        full_classes = full.argmax(axis=1)
+        full_seconds = best_of(lambda: forest.predict_proba(matrix), args.repeats)
+        print(f"{rows:>7} {'completo':>12} {full_seconds * 1e3:9.3f} {'1.00x':>8} {forest.n_trees:8.1f} {'100.0%':>9} {0.0:8.4f}")
+
+        modes = [(f"bloco={chunk}", chunk, None) for chunk in args.chunks]
+        modes += [(f"{budget:g}ms", args.chunks[0], budget) for budget in args.budget_ms]
+        for label, chunk, budget in modes:
+            def run():
+                deadline = time.perf_counter() + budget / 1000.0 if budget else None
+                return forest.predict_proba_early(matrix, tree_chunk=chunk, deadline=deadline)
+
+            seconds = best_of(run, args.repeats)
+            probabilities, trees_used = run()
+            agreement = (probabilities.argmax(axis=1) == full_classes).mean() * 100.0
+            deviation = np.abs(probabilities - full).max()
+            print(
+                f"{rows:>7} {label:>12} {seconds * 1e3:9.3f} {full_seconds / seconds:7.2f}x "
+                f"{trees_used.mean():8.1f} {agreement:8.1f}% {deviation:8.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
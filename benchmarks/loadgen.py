@@ -0,0 +1,408 @@
+"""
+Gerador de carga para ``/predict`` com percentis de latência.
+
+Dois modos:
+
+* ``closed`` (ciclo fechado): ``--users`` clientes concorrentes, cada um envia
+  o pedido seguinte quando recebe a resposta (mede a capacidade máxima);
+* ``open`` (ciclo aberto): chegadas a ritmo fixo (``--rate`` pedidos/s,
+  uniformes ou Poisson) independentemente das respostas. A latência conta a
+  partir do instante *previsto* de envio, para não esconder as filas
+  (coordinated omission); acima de ``--max-in-flight`` pedidos pendentes as
+  chegadas são descartadas e contadas.
+
+O alvo é a aplicação FastAPI no próprio processo (``--target asgi``, via
+``httpx.ASGITransport``, com o lifespan) ou um servidor já a correr
+(``--target http://127.0.0.1:8080``). Os payloads são as linhas de
+``dataset_ready_for_ml.csv`` que passam a validação do ``PredictionInput``,
+com as chaves originais (acentuadas), já serializadas antes da medição.
+
+As latências vão para um histograma log-linear ao estilo HdrHistogram
+(erro relativo < 1%); o relatório indica débito, p50/p95/p99/p99.9, máximo e
+a contagem de erros por tipo (``http_503``, ``timeout``, ...)::
+
+    python -m benchmarks.loadgen --mode closed --users 16 --duration 30
+    python -m benchmarks.loadgen --mode open --rate 200 --duration 30 --target http://127.0.0.1:8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from pydantic import ValidationError
+
+from app.schemas import PredictionInput
+from app.utils.feature_aliases import CANONICAL_FEATURES
+from ml.score import read_feature_matrix
+
+CLOSED = "closed"
+OPEN = "open"
+ASGI_TARGET = "asgi"
+REPORTED_PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências (µs) com baldes log-lineares, como o HdrHistogram.
+
+    Cada valor é truncado aos ``sub_bucket_bits`` bits mais significativos,
+    o que mantém o erro relativo abaixo de ``2 ** -(sub_bucket_bits - 1)``
+    com memória proporcional ao número de baldes usados, não de valores.
+    """
+
+    def __init__(self, significant_digits: int = 2) -> None:
+        self.significant_digits = significant_digits
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10**significant_digits))
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def _bucket(self, value: int) -> int:
+        shift = max(value.bit_length() - self._sub_bucket_bits, 0)
+        return (value >> shift) << shift
+
+    def _highest_equivalent(self, bucket: int) -> int:
+        shift = max(bucket.bit_length() - self._sub_bucket_bits, 0)
+        return bucket + (1 << shift) - 1
+
+    def record(self, value_us: float) -> None:
+        value = max(int(value_us), 0)
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> int:
+        """Maior valor equivalente ao balde que contém o percentil pedido."""
+        if not self.total:
+            return 0
+        rank = max(math.ceil(percentile / 100.0 * self.total), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._highest_equivalent(bucket), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def distribution(
+        self, percentiles: Sequence[float] = (50, 75, 90, 95, 99, 99.9, 99.99, 100)
+    ) -> List[Tuple[float, int]]:
+        return [(percentile, self.percentile(percentile)) for percentile in percentiles]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "unit": "us",
+            "significant_digits": self.significant_digits,
+            "counts": sorted(self.counts.items()),
+        }
+
+
+@dataclass
+class LoadResult:
+    """Resultado de uma execução: contagens, histograma e erros por tipo."""
+
+    mode: str
+    target: str
+    endpoint: str
+    concurrency: Optional[int] = None
+    rate: Optional[float] = None
+    duration_s: float = 0.0
+    sent: int = 0
+    ok: int = 0
+    dropped: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    errors: Counter = field(default_factory=Counter)
+
+    @property
+    def completed(self) -> int:
+        return self.ok + sum(self.errors.values())
+
+    def summary(self) -> Dict[str, Any]:
+        duration = self.duration_s or 1e-9
+        latency = {
+            f"p{percentile:g}": self.histogram.percentile(percentile) / 1000.0 for percentile in REPORTED_PERCENTILES
+        }
+        latency["mean"] = self.histogram.mean / 1000.0
+        latency["max"] = self.histogram.max / 1000.0
+        return {
+            "mode": self.mode,
+            "target": self.target,
+            "endpoint": self.endpoint,
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "duration_s": self.duration_s,
+            "sent": self.sent,
+            "completed": self.completed,
+            "ok": self.ok,
+            "dropped": self.dropped,
+            "throughput_rps": self.completed / duration,
+            "success_rps": self.ok / duration,
+            "latency_ms": latency,
+            "errors": dict(self.errors),
+            "histogram": self.histogram.to_dict(),
+        }
+
+
+def load_payloads(
+    path: str | Path = "dataset_ready_for_ml.csv",
+    batch_size: int = 1,
+    limit: Optional[int] = None,
+) -> List[bytes]:
+    """
+    Corpos JSON a partir das linhas do dataset.
+
+    Linhas que o ``PredictionInput`` rejeita (p.ex. ``price_category`` fora do
+    intervalo) ficam de fora. Com ``batch_size`` > 1 os corpos são
+    ``{"items": [...]}`` para ``/predict/batch``.
+    """
+    items: List[Dict[str, Any]] = []
+    for row in read_feature_matrix(path):
+        values = {
+            name: int(value) if float(value).is_integer() else float(value)
+            for name, value in zip(CANONICAL_FEATURES, row.tolist())
+        }
+        try:
+            items.append(PredictionInput.model_validate(values).model_dump(mode="json", by_alias=True))
+        except ValidationError:
+            continue
+        if limit is not None and len(items) >= limit * batch_size:
+            break
+    if not items:
+        raise ValueError(f"Nenhuma linha válida em {path}")
+    if batch_size <= 1:
+        return [json.dumps(item).encode() for item in items]
+    return [
+        json.dumps({"items": [items[(start + offset) % len(items)] for offset in range(batch_size)]}).encode()
+        for start in range(0, len(items), batch_size)
+    ]
+
+
+@contextlib.asynccontextmanager
+async def open_client(
+    target: str = ASGI_TARGET,
+    app: Any = None,
+    run_lifespan: bool = True,
+    timeout: float = 10.0,
+    max_connections: int = 100,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Cliente para o servidor em ``target`` ou para a aplicação ASGI no próprio processo."""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    if target != ASGI_TARGET:
+        async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    if app is None:
+        from app.main import app  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    lifespan = app.router.lifespan_context(app) if run_lifespan else contextlib.nullcontext()
+    async with lifespan:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi", timeout=timeout) as client:
+            yield client
+
+
+async def _send(client: httpx.AsyncClient, endpoint: str, body: bytes, headers: Dict[str, str]) -> Optional[str]:
+    """Envia um pedido; devolve ``None`` se correu bem ou o tipo de erro."""
+    try:
+        response = await client.post(endpoint, content=body, headers=headers)
+    except httpx.TimeoutException:
+        return "timeout"
+    except httpx.HTTPError as err:
+        return type(err).__name__
+    if response.status_code != 200:
+        return f"http_{response.status_code}"
+    return None
+
+
+def _record(result: LoadResult, outcome: Optional[str], latency_ns: int) -> None:
+    result.histogram.record(latency_ns / 1000.0)
+    if outcome is None:
+        result.ok += 1
+    else:
+        result.errors[outcome] += 1
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    payloads: Sequence[bytes],
+    users: int,
+    duration: float,
+    endpoint: str = "/predict",
+    headers: Optional[Dict[str, str]] = None,
+    warmup: float = 0.0,
+    max_requests: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> LoadResult:
+    """``users`` clientes em ciclo pedido→resposta durante ``duration`` segundos (após ``warmup``)."""
+    result = LoadResult(CLOSED, str(client.base_url), endpoint, concurrency=users)
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    chooser = random.Random(seed)
+    started = time.perf_counter_ns()
+    measure_from = started + int(warmup * 1e9)
+    stop_at = measure_from + int(duration * 1e9)
+
+    async def user() -> None:
+        while True:
+            now = time.perf_counter_ns()
+            if now >= stop_at or (max_requests is not None and result.sent >= max_requests):
+                return
+            measured = now >= measure_from
+            if measured:
+                result.sent += 1
+            outcome = await _send(client, endpoint, chooser.choice(payloads), headers)
+            if measured:
+                _record(result, outcome, time.perf_counter_ns() - now)
+
+    await asyncio.gather(*(user() for _ in range(users)))
+    result.duration_s = (time.perf_counter_ns() - max(measure_from, started)) / 1e9
+    return result
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    payloads: Sequence[bytes],
+    rate: float,
+    duration: float,
+    endpoint: str = "/predict",
+    headers: Optional[Dict[str, str]] = None,
+    warmup: float = 0.0,
+    arrival: str = "uniform",
+    max_in_flight: int = 1000,
+    seed: Optional[int] = None,
+) -> LoadResult:
+    """Chegadas a ``rate`` pedidos/s durante ``duration`` segundos (após ``warmup``)."""
+    result = LoadResult(OPEN, str(client.base_url), endpoint, rate=rate)
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    rng = random.Random(seed)
+    started = time.perf_counter_ns()
+    measure_from = started + int(warmup * 1e9)
+    stop_at = measure_from + int(duration * 1e9)
+    pending: set = set()
+
+    async def request(intended: int, measured: bool) -> None:
+        outcome = await _send(client, endpoint, rng.choice(payloads), headers)
+        if measured:
+            _record(result, outcome, time.perf_counter_ns() - intended)
+
+    intended = started
+    while intended < stop_at:
+        delay = (intended - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measured = intended >= measure_from
+        if len(pending) >= max_in_flight:
+            if measured:
+                result.dropped += 1
+        else:
+            if measured:
+                result.sent += 1
+            task = asyncio.ensure_future(request(intended, measured))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        gap = rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        intended += int(gap * 1e9)
+
+    if pending:
+        await asyncio.gather(*pending)
+    result.duration_s = (max(time.perf_counter_ns(), stop_at) - measure_from) / 1e9
+    return result
+
+
+def format_report(summary: Dict[str, Any], distribution: Optional[List[Tuple[float, int]]] = None) -> str:
+    if summary["mode"] == CLOSED:
+        header = f"ciclo fechado, {summary['concurrency']} utilizadores"
+    else:
+        header = f"ciclo aberto, {summary['rate']:g} pedidos/s"
+    latency = summary["latency_ms"]
+    lines = [
+        f"{header}, {summary['duration_s']:.1f} s em {summary['target']}{summary['endpoint']}",
+        f"pedidos: {summary['sent']} enviados, {summary['completed']} concluídos ({summary['ok']} ok), "
+        f"{summary['dropped']} descartados no cliente",
+        f"débito: {summary['throughput_rps']:.1f} pedidos/s ({summary['success_rps']:.1f} com sucesso)",
+        "latência (ms): " + "  ".join(
+            f"{name} {latency[name]:.2f}" for name in ("p50", "p95", "p99", "p99.9", "max")
+        ),
+    ]
+    if summary["errors"]:
+        lines.append("erros: " + ", ".join(f"{kind}={count}" for kind, count in sorted(summary["errors"].items())))
+    if distribution:
+        lines.append("distribuição:")
+        lines.extend(f"  {percentile:>7g}%  {value / 1000.0:10.3f} ms" for percentile, value in distribution)
+    return "\n".join(lines)
+
+
+async def _main_async(args: argparse.Namespace) -> LoadResult:
+    payloads = load_payloads(args.data, args.batch_size)
+    headers = {"X-API-KEY": args.api_key} if args.api_key else {}
+    concurrency = args.users if args.mode == CLOSED else args.max_in_flight
+    async with open_client(args.target, timeout=args.timeout, max_connections=concurrency) as client:
+        if args.mode == CLOSED:
+            return await run_closed_loop(
+                client, payloads, args.users, args.duration, args.endpoint, headers,
+                warmup=args.warmup, max_requests=args.requests, seed=args.seed,
+            )
+        return await run_open_loop(
+            client, payloads, args.rate, args.duration, args.endpoint, headers,
+            warmup=args.warmup, arrival=args.arrival, max_in_flight=args.max_in_flight, seed=args.seed,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=(CLOSED, OPEN), default=CLOSED)
+    parser.add_argument("--target", default=ASGI_TARGET, help="'asgi' (no próprio processo) ou URL base do servidor")
+    parser.add_argument("--endpoint", default="/predict")
+    parser.add_argument("--batch-size", type=int, default=1, help="> 1 envia {'items': [...]} (p.ex. /predict/batch)")
+    parser.add_argument("--users", type=int, default=8, help="Clientes concorrentes (ciclo fechado)")
+    parser.add_argument("--rate", type=float, default=100.0, help="Pedidos/s (ciclo aberto)")
+    parser.add_argument("--arrival", choices=("uniform", "poisson"), default="uniform")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--requests", type=int, help="Máximo de pedidos medidos (ciclo fechado)")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--data", default="dataset_ready_for_ml.csv")
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--histogram", action="store_true", help="Mostra a distribuição completa de percentis")
+    parser.add_argument("--output", help="Escreve o resumo (com o histograma) em JSON")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(_main_async(args))
+    summary = result.summary()
+    print(format_report(summary, result.histogram.distribution() if args.histogram else None))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(summary, indent=1), encoding="utf-8")
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,445 @@
+"""
+Controlo de regressões de desempenho com histórico local e baseline.
+
+``record`` corre os microbenchmarks (``benchmarks.suite``) e os cenários de
+carga (``benchmarks.loadgen``, no próprio processo) e acrescenta o resultado
+ao histórico (JSON Lines, uma entrada por execução com commit, versão do
+modelo e máquina). ``check`` faz o mesmo e compara com a baseline:
+
+* a entrada indicada por ``--baseline <commit>``; ou
+* a última entrada marcada com ``record --baseline`` para a mesma versão do
+  modelo, perfil e máquina; ou, sem nenhuma, a última de outro commit (ou
+  do mesmo commit sem alterações locais).
+
+Não se comparam valores isolados: para cada métrica calcula-se, por
+bootstrap das amostras (rondas dos microbenchmarks, latências dos cenários
+de carga), o intervalo de confiança da variação relativa da mediana (ou do
+p99). Há regressão quando todo o intervalo fica acima do orçamento
+configurado em ``benchmarks/budgets.json`` e melhoria quando fica abaixo do
+simétrico; se só a estimativa pontual o ultrapassa, o resultado é
+inconclusivo. O débito, sem amostras, nunca é mais do que inconclusivo.
+
+Para descontar a velocidade variável da máquina, cada ronda de
+microbenchmark é dividida pela ronda de controlo
+(``suite.reference_workload``) medida imediatamente antes, e as latências
+dos cenários de carga são escaladas pelo controlo medido antes e depois do
+cenário. Microbenchmarks que regridem são medidos de novo e só contam se a
+regressão se confirmar. ``check`` termina com código 1 se houver regressões::
+
+    python -m benchmarks.regression record --baseline
+    python -m benchmarks.regression check
+    python -m pytest --perf -m perf
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import os
+import platform
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks import loadgen, suite
+
+DEFAULT_HISTORY = suite.RESULTS_DIR / "history.jsonl"
+DEFAULT_BUDGETS = Path(__file__).with_name("budgets.json")
+
+REGRESSION = "regressão"
+IMPROVEMENT = "melhoria"
+UNCHANGED = "igual"
+INCONCLUSIVE = "inconclusivo"
+NEW = "novo"
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "quick": {
+        "rounds": 12,
+        "min_round_ms": 2.0,
+        "batch_sizes": (1, 64, 512),
+        "filter": (),
+        "artifacts": None,
+        "load": {
+            "closed-8": {"mode": loadgen.CLOSED, "users": 8, "duration": 2.0},
+            "open-100": {"mode": loadgen.OPEN, "rate": 100.0, "duration": 2.0},
+        },
+    },
+    "full": {
+        "rounds": 30,
+        "min_round_ms": 5.0,
+        "batch_sizes": suite.DEFAULT_BATCH_SIZES,
+        "filter": (),
+        "artifacts": "models/latest",
+        "load": {
+            "closed-8": {"mode": loadgen.CLOSED, "users": 8, "duration": 10.0},
+            "open-200": {"mode": loadgen.OPEN, "rate": 200.0, "duration": 10.0},
+        },
+    },
+}
+
+
+@dataclass
+class Budgets:
+    """Variação máxima tolerada (fracção) por métrica e nível de significância."""
+
+    default: float = 0.10
+    tail: float = 0.25
+    # Cada limite do intervalo de confiança é unilateral a este nível.
+    alpha: float = 0.05
+    overrides: Optional[Dict[str, float]] = None
+
+    @classmethod
+    def load(cls, path: str | Path | None = DEFAULT_BUDGETS) -> "Budgets":
+        if path is None or not Path(path).exists():
+            return cls()
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls(**json.load(handle))
+
+    def for_metric(self, name: str, tail: bool = False) -> float:
+        for pattern, budget in (self.overrides or {}).items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return budget
+        return self.tail if tail else self.default
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[float]
+    current: float
+    unit: str
+    change: Optional[float]
+    ci_low: Optional[float]
+    ci_high: Optional[float]
+    budget: float
+    verdict: str
+
+
+def host_fingerprint() -> str:
+    return f"{platform.machine()}-{os.cpu_count()}cpu-py{platform.python_version()}"
+
+
+def _histogram_samples(histogram: Dict[str, Any]) -> np.ndarray:
+    buckets = np.array([bucket for bucket, _ in histogram["counts"]], dtype=np.float64)
+    counts = np.array([count for _, count in histogram["counts"]], dtype=np.int64)
+    return np.repeat(buckets, counts)
+
+
+async def _run_load(profile: Dict[str, Any], app: Any, api_key: Optional[str], run_lifespan: bool) -> Dict[str, Any]:
+    payloads = loadgen.load_payloads()
+    headers = {"X-API-KEY": api_key} if api_key else {}
+    results = {}
+    async with loadgen.open_client(app=app, run_lifespan=run_lifespan) as client:
+        for name, scenario in profile["load"].items():
+            options = dict(scenario)
+            mode = options.pop("mode")
+            runner = loadgen.run_closed_loop if mode == loadgen.CLOSED else loadgen.run_open_loop
+            reference = suite.measure_reference()
+            result = await runner(client, payloads, headers=headers, warmup=0.5, seed=0, **options)
+            results[name] = result.summary()
+            results[name]["reference_ns"] = reference + suite.measure_reference()
+    return results
+
+
+def run_scenarios(
+    profile_name: str = "quick",
+    run_lifespan: bool = True,
+    only: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Corre os microbenchmarks e os cenários de carga do perfil e devolve uma entrada de histórico.
+
+    Com ``only`` corre apenas os microbenchmarks com esses nomes (sem carga).
+    """
+    profile = PROFILES[profile_name]
+    logging.disable(logging.ERROR)
+    try:
+        from app import main as app_main  # pylint: disable=import-outside-toplevel
+
+        model = suite.load_benchmark_model(
+            app_main.settings.MODEL_MANIFEST_PATH, app_main.settings.METADATA_FILE, app_main.settings.INFERENCE_ENGINE
+        )
+        benchmarks = suite.build_benchmarks(
+            model,
+            profile["batch_sizes"],
+            artifacts_dir=profile["artifacts"],
+            metadata_path=app_main.settings.METADATA_FILE,
+        )
+        if only is not None:
+            benchmarks = [bench for bench in benchmarks if bench.name in only]
+        results = suite.run_suite(
+            benchmarks, profile["rounds"], profile["min_round_ms"], profile["filter"], reference=True
+        )
+        load = {} if only is not None else asyncio.run(
+            _run_load(profile, app_main.app, app_main.settings.API_KEY, run_lifespan)
+        )
+    finally:
+        logging.disable(logging.NOTSET)
+
+    environment = suite.collect_environment(model)
+    return {
+        "commit": environment["commit"],
+        "dirty": environment["dirty"],
+        "model_version": environment["model_version"],
+        "profile": profile_name,
+        "host": host_fingerprint(),
+        "environment": environment,
+        "benchmarks": {
+            result["name"]: {key: result[key] for key in ("p50_ns", "mean_ns", "rows", "samples_ns", "reference_ns")}
+            for result in results
+            if "p50_ns" in result
+        },
+        "load": {
+            name: {
+                key: summary[key]
+                for key in ("mode", "throughput_rps", "ok", "errors", "latency_ms", "histogram", "reference_ns")
+            }
+            for name, summary in load.items()
+        },
+    }
+
+
+def load_history(path: str | Path = DEFAULT_HISTORY) -> List[Dict[str, Any]]:
+    if not Path(path).exists():
+        return []
+    with open(path, "r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def append_history(entry: Dict[str, Any], path: str | Path = DEFAULT_HISTORY) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def select_baseline(
+    history: Sequence[Dict[str, Any]], current: Dict[str, Any], ref: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Entrada de referência para ``current`` (ver a docstring do módulo)."""
+    if ref:
+        matches = [entry for entry in history if (entry.get("commit") or "").startswith(ref)]
+        return matches[-1] if matches else None
+    comparable = [
+        entry
+        for entry in history
+        if entry.get("model_version") == current.get("model_version")
+        and entry.get("profile") == current.get("profile")
+        and entry.get("host") == current.get("host")
+    ]
+    pinned = [entry for entry in comparable if entry.get("baseline")]
+    if pinned:
+        return pinned[-1]
+    # Alterações por commitar comparam-se com o mesmo commit limpo.
+    state = (current.get("commit"), bool(current.get("dirty")))
+    others = [entry for entry in comparable if (entry.get("commit"), bool(entry.get("dirty"))) != state]
+    return others[-1] if others else None
+
+
+def bootstrap_change(
+    baseline: Sequence[float], current: Sequence[float], percentile: float = 50.0, alpha: float = 0.05, seed: int = 0
+) -> tuple:
+    """Intervalo ``[alpha, 1 - alpha]`` da variação relativa do percentil, por bootstrap."""
+    before = np.asarray(baseline, dtype=np.float64)
+    after = np.asarray(current, dtype=np.float64)
+    # Limita a memória (reamostragens x amostras) nos cenários de carga com muitos pedidos.
+    resamples = int(min(1000, max(200, 4_000_000 // max(before.size, after.size))))
+    rng = np.random.default_rng(seed)
+    old = np.percentile(rng.choice(before, (resamples, before.size)), percentile, axis=1)
+    new = np.percentile(rng.choice(after, (resamples, after.size)), percentile, axis=1)
+    changes = new / np.maximum(old, 1e-12) - 1.0
+    return float(np.quantile(changes, alpha)), float(np.quantile(changes, 1.0 - alpha))
+
+
+def _verdict(change: float, ci_low: Optional[float], ci_high: Optional[float], budget: float) -> str:
+    if abs(change) <= budget:
+        return UNCHANGED
+    if ci_low is not None and ci_low > budget:
+        return REGRESSION
+    if ci_high is not None and ci_high < -budget:
+        return IMPROVEMENT
+    return INCONCLUSIVE
+
+
+def _compare_samples(
+    name: str,
+    before: Sequence[float],
+    after: Sequence[float],
+    percentile: float,
+    budget: float,
+    alpha: float,
+    before_reference: Optional[Sequence[float]] = None,
+    after_reference: Optional[Sequence[float]] = None,
+) -> Comparison:
+    old = float(np.percentile(before, percentile))
+    value = float(np.percentile(after, percentile))
+    if before_reference and after_reference:
+        # Cada ronda dividida pela ronda de controlo que a precedeu: desconta a
+        # velocidade da máquina naquele instante (ver ``suite.reference_workload``).
+        before = np.asarray(before) / np.asarray(before_reference)
+        after = np.asarray(after) / np.asarray(after_reference)
+    relative_old = float(np.percentile(before, percentile))
+    change = float(np.percentile(after, percentile)) / relative_old - 1.0 if relative_old else 0.0
+    ci_low, ci_high = bootstrap_change(before, after, percentile, alpha)
+    verdict = _verdict(change, ci_low, ci_high, budget)
+    return Comparison(name, old, value, "ns", change, ci_low, ci_high, budget, verdict)
+
+
+def compare_entries(
+    baseline: Optional[Dict[str, Any]], current: Dict[str, Any], budgets: Budgets
+) -> List[Comparison]:
+    """Compara as medianas dos microbenchmarks e o p50/p99 e débito dos cenários de carga."""
+    rows: List[Comparison] = []
+    previous = (baseline or {}).get("benchmarks", {})
+    for name, result in current["benchmarks"].items():
+        budget = budgets.for_metric(name)
+        before = previous.get(name)
+        if before is None:
+            rows.append(Comparison(name, None, result["p50_ns"], "ns", None, None, None, budget, NEW))
+            continue
+        rows.append(
+            _compare_samples(
+                name, before["samples_ns"], result["samples_ns"], 50.0, budget, budgets.alpha,
+                before.get("reference_ns"), result.get("reference_ns"),
+            )
+        )
+
+    previous_load = (baseline or {}).get("load", {})
+    for scenario, result in current["load"].items():
+        before = previous_load.get(scenario)
+        samples_now = _histogram_samples(result["histogram"]) * 1000.0
+        samples_before = None if before is None else _histogram_samples(before["histogram"]) * 1000.0
+        if samples_before is not None and before.get("reference_ns") and result.get("reference_ns"):
+            # Sem rondas intercaladas: um factor por cenário, do controlo medido antes e depois.
+            speed = float(np.median(result["reference_ns"]) / np.median(before["reference_ns"]))
+        else:
+            speed = 1.0
+        for stat, percentile, tail in (("p50", 50.0, False), ("p99", 99.0, True)):
+            name = f"loadtest.{scenario}.{stat}"
+            budget = budgets.for_metric(name, tail=tail)
+            if samples_before is None or not samples_before.size or not samples_now.size:
+                value = result["latency_ms"][stat] * 1e6
+                rows.append(Comparison(name, None, value, "ns", None, None, None, budget, NEW))
+                continue
+            row = _compare_samples(name, samples_before, samples_now / speed, percentile, budget, budgets.alpha)
+            row.current = result["latency_ms"][stat] * 1e6
+            rows.append(row)
+
+        name = f"loadtest.{scenario}.throughput"
+        budget = budgets.for_metric(name)
+        throughput = result["throughput_rps"]
+        if before is None:
+            rows.append(Comparison(name, None, throughput, "req/s", None, None, None, budget, NEW))
+            continue
+        # Um único valor por execução, sem amostras: no máximo inconclusivo. Menos débito é pior;
+        # em ciclo aberto o débito é imposto pelo ritmo de chegadas e não se escala.
+        scale = speed if result.get("mode") == loadgen.CLOSED else 1.0
+        change = before["throughput_rps"] / (throughput * scale) - 1.0 if throughput else 1.0
+        rows.append(
+            Comparison(
+                name, before["throughput_rps"], throughput, "req/s", change, None, None, budget,
+                _verdict(change, None, None, budget),
+            )
+        )
+    return rows
+
+
+def _format_value(value: Optional[float], unit: str) -> str:
+    if value is None:
+        return "-"
+    return suite.format_ns(value) if unit == "ns" else f"{value:,.1f} {unit}"
+
+
+def format_report(rows: Sequence[Comparison], baseline: Optional[Dict[str, Any]], current: Dict[str, Any]) -> str:
+    def describe(entry: Dict[str, Any]) -> str:
+        commit = (entry.get("commit") or "local")[:10] + ("+alterações" if entry.get("dirty") else "")
+        return f"{commit} (modelo {entry.get('model_version')}, perfil {entry.get('profile')})"
+
+    order = {REGRESSION: 0, INCONCLUSIVE: 1, IMPROVEMENT: 2, NEW: 3, UNCHANGED: 4}
+    lines = [
+        f"baseline: {describe(baseline) if baseline else 'nenhuma'}",
+        f"actual:   {describe(current)}",
+        "",
+        f"{'métrica':<44} {'baseline':>12} {'actual':>12} {'variação':>9} {'IC':>17} {'orçam.':>7}  resultado",
+    ]
+    for row in sorted(rows, key=lambda item: (order[item.verdict], item.name)):
+        change = f"{row.change * 100:+.1f}%" if row.change is not None else "-"
+        interval = (
+            f"[{row.ci_low * 100:+.1f}, {row.ci_high * 100:+.1f}]%" if row.ci_low is not None else "-"
+        )
+        lines.append(
+            f"{row.name:<44} {_format_value(row.baseline, row.unit):>12} {_format_value(row.current, row.unit):>12} "
+            f"{change:>9} {interval:>17} {row.budget * 100:>6.0f}%  {row.verdict}"
+        )
+    counts = {verdict: sum(1 for row in rows if row.verdict == verdict) for verdict in order}
+    lines.append("")
+    lines.append(", ".join(f"{count} {verdict}" for verdict, count in counts.items() if count))
+    return "\n".join(lines)
+
+
+def check(
+    profile: str = "quick",
+    history_path: str | Path = DEFAULT_HISTORY,
+    budgets: Optional[Budgets] = None,
+    baseline_ref: Optional[str] = None,
+    record: bool = True,
+    run_lifespan: bool = True,
+) -> tuple:
+    """Corre os cenários e compara-os com a baseline; devolve (baseline, entrada, comparações)."""
+    budgets = budgets or Budgets.load()
+    current = run_scenarios(profile, run_lifespan=run_lifespan)
+    baseline = select_baseline(load_history(history_path), current, baseline_ref)
+    rows = compare_entries(baseline, current, budgets)
+
+    # As rondas de um benchmark são consecutivas: uma rajada de outro processo na
+    # máquina afecta-as todas. Uma regressão só conta se a nova medição a confirmar.
+    suspects = [row.name for row in rows if row.verdict == REGRESSION and row.name in current["benchmarks"]]
+    if suspects:
+        current["benchmarks"].update(run_scenarios(profile, only=suspects)["benchmarks"])
+        rows = compare_entries(baseline, current, budgets)
+    if record:
+        append_history(current, history_path)
+    return baseline, current, rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("record", "check"))
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--history", default=str(DEFAULT_HISTORY))
+    parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS))
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        const=True,
+        default=None,
+        help="record: marca a entrada como baseline; check: commit (prefixo) a usar como baseline",
+    )
+    parser.add_argument("--no-record", action="store_true", help="check: não acrescenta a execução ao histórico")
+    parser.add_argument("--json", help="check: escreve as comparações em JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        entry = run_scenarios(args.profile)
+        entry["baseline"] = bool(args.baseline)
+        append_history(entry, args.history)
+        print(f"Registado {(entry['commit'] or 'local')[:10]} (modelo {entry['model_version']}) em {args.history}")
+        return 0
+
+    ref = args.baseline if isinstance(args.baseline, str) else None
+    baseline, current, rows = check(
+        args.profile, args.history, Budgets.load(args.budgets), ref, record=not args.no_record
+    )
+    print(format_report(rows, baseline, current))
+    if args.json:
+        Path(args.json).write_text(json.dumps([asdict(row) for row in rows], indent=1), encoding="utf-8")
+    return 1 if any(row.verdict == REGRESSION for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Reprodução de capturas de produção (``app/capture.py``) com o mesmo perfil temporal.
+
+Lê um ou mais ficheiros NDJSON (ou pastas com ``*.ndjson``, p.ex. a
+``CAPTURE_DIR`` de vários workers), ordena os pedidos pelo instante de chegada
+e envia-os ao alvo mantendo os intervalos entre chegadas, divididos por
+``--speed`` (``1`` = tempo real, ``4`` = quatro vezes mais depressa). Com
+``--speed max`` os pedidos seguem pela ordem original sem esperas, limitados a
+``--max-in-flight`` pendentes. Os corpos são enviados byte a byte como foram
+recebidos, com os headers capturados (``X-Model-Version``,
+``X-Request-Timeout-Ms``, ``Content-Type`` e ``Accept``).
+
+Como no ciclo aberto do ``benchmarks.loadgen``, a latência reproduzida conta a
+partir do instante *previsto* de envio (inclui o tempo em fila no cliente) e
+os pedidos acima de ``--max-in-flight`` são descartados e contados. A latência
+capturada é medida no servidor, sem a rede: contra um servidor remoto a
+diferença inclui o tempo de ida e volta.
+
+O relatório compara os percentis capturados e reproduzidos, a diferença por
+pedido (reproduzida − capturada) e os pedidos cujo estado HTTP mudou.
+
+Uso::
+
+    python -m benchmarks.replay captures/ --speed 1
+    python -m benchmarks.replay captures/capture-*.ndjson --speed 10 --target http://127.0.0.1:8080
+    python -m benchmarks.replay captures/ --speed max --output benchmarks/results/replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.capture import CapturedRequest
+from benchmarks.loadgen import ASGI_TARGET, REPORTED_PERCENTILES, LatencyHistogram, open_client
+
+MAX_SPEED = "max"
+
+
+def load_capture(
+    paths: Sequence[str | Path],
+    path_prefix: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[CapturedRequest]:
+    """Pedidos capturados em ``paths`` (ficheiros ou pastas), por ordem de chegada."""
+    files: List[Path] = []
+    for item in map(Path, paths):
+        files.extend(sorted(item.glob("*.ndjson")) if item.is_dir() else [item])
+
+    records: List[CapturedRequest] = []
+    for path in files:
+        with path.open(encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    captured = CapturedRequest.from_record(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # Linha cortada (p.ex. processo terminado a meio da escrita)
+                    continue
+                if path_prefix is None or captured.path.startswith(path_prefix):
+                    records.append(captured)
+    records.sort(key=lambda captured: captured.ts)
+    return records[:limit] if limit is not None else records
+
+
+@dataclass
+class ReplayResult:
+    """Latências capturadas e reproduzidas dos mesmos pedidos."""
+
+    target: str
+    speed: Optional[float]
+    captured_span_s: float
+    duration_s: float = 0.0
+    sent: int = 0
+    same_status: int = 0
+    dropped: int = 0
+    max_lag_ms: float = 0.0
+    recorded: LatencyHistogram = field(default_factory=LatencyHistogram)
+    replayed: LatencyHistogram = field(default_factory=LatencyHistogram)
+    deltas_ms: List[float] = field(default_factory=list)
+    status_changes: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+
+    def summary(self) -> Dict[str, Any]:
+        latency: Dict[str, Dict[str, Optional[float]]] = {}
+        for name, recorded_us, replayed_us in [
+            *(
+                (f"p{percentile:g}", self.recorded.percentile(percentile), self.replayed.percentile(percentile))
+                for percentile in REPORTED_PERCENTILES
+            ),
+            ("mean", self.recorded.mean, self.replayed.mean),
+            ("max", self.recorded.max, self.replayed.max),
+        ]:
+            latency[name] = {
+                "recorded": recorded_us / 1000.0,
+                "replayed": replayed_us / 1000.0,
+                "change": (replayed_us - recorded_us) / recorded_us if recorded_us else None,
+            }
+        deltas = sorted(self.deltas_ms)
+        per_request = {
+            name: deltas[min(int(len(deltas) * fraction), len(deltas) - 1)] if deltas else 0.0
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
+        per_request["max"] = deltas[-1] if deltas else 0.0
+        return {
+            "target": self.target,
+            "speed": self.speed if self.speed is not None else MAX_SPEED,
+            "captured_span_s": self.captured_span_s,
+            "duration_s": self.duration_s,
+            "sent": self.sent,
+            "completed": self.replayed.total,
+            "same_status": self.same_status,
+            "dropped": self.dropped,
+            "max_lag_ms": self.max_lag_ms,
+            "latency_ms": latency,
+            "delta_ms": per_request,
+            "status_changes": dict(self.status_changes),
+            "errors": dict(self.errors),
+        }
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: Sequence[CapturedRequest],
+    speed: Optional[float] = 1.0,
+    headers: Optional[Dict[str, str]] = None,
+    max_in_flight: int = 1000,
+) -> ReplayResult:
+    """
+    Envia ``records`` mantendo os intervalos entre chegadas divididos por ``speed``.
+
+    ``speed=None`` reproduz à velocidade máxima: cada pedido sai quando há
+    lugar entre os ``max_in_flight`` pendentes e a latência conta desde esse
+    instante.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed tem de ser positivo (ou None para a velocidade máxima)")
+    origin = records[0].ts if records else 0.0
+    result = ReplayResult(
+        str(client.base_url), speed, captured_span_s=(records[-1].ts - origin) if records else 0.0
+    )
+    extra_headers = headers or {}
+    pending: set = set()
+    slots = asyncio.Semaphore(max_in_flight)
+
+    async def request(captured: CapturedRequest, intended: int) -> None:
+        # Versão do modelo e prazo como no pedido original; a chave vem de ``headers``.
+        request_headers = {**captured.headers, **extra_headers}
+        url = f"{captured.path}?{captured.query}" if captured.query else captured.path
+        try:
+            response = await client.request(captured.method, url, content=captured.body, headers=request_headers)
+            # Lê o corpo todo: a latência capturada vai até ao último byte.
+            await response.aread()
+        except httpx.TimeoutException:
+            result.errors["timeout"] += 1
+            return
+        except httpx.HTTPError as err:
+            result.errors[type(err).__name__] += 1
+            return
+        finally:
+            if speed is None:
+                slots.release()
+        latency_ns = time.perf_counter_ns() - intended
+        result.recorded.record(captured.latency_ms * 1000.0)
+        result.replayed.record(latency_ns / 1000.0)
+        result.deltas_ms.append(latency_ns / 1e6 - captured.latency_ms)
+        if response.status_code == captured.status:
+            result.same_status += 1
+        else:
+            result.status_changes[f"{captured.status}→{response.status_code}"] += 1
+
+    started = time.perf_counter_ns()
+    for captured in records:
+        if speed is None:
+            await slots.acquire()
+            intended = time.perf_counter_ns()
+        else:
+            intended = started + int((captured.ts - origin) / speed * 1e9)
+            delay = (intended - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                await asyncio.sleep(delay)
+            result.max_lag_ms = max(result.max_lag_ms, (time.perf_counter_ns() - intended) / 1e6)
+            if len(pending) >= max_in_flight:
+                result.dropped += 1
+                continue
+        result.sent += 1
+        task = asyncio.ensure_future(request(captured, intended))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+    result.duration_s = (time.perf_counter_ns() - started) / 1e9
+    return result
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """``"max"`` → ``None`` (sem esperas); caso contrário o factor de aceleração."""
+    if value.strip().lower() == MAX_SPEED:
+        return None
+    speed = float(value.rstrip("xX×"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("a velocidade tem de ser positiva ou 'max'")
+    return speed
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    speed = summary["speed"]
+    pace = "velocidade máxima" if speed == MAX_SPEED else f"{speed:g}×"
+    lines = [
+        f"reprodução a {pace} de {summary['sent'] + summary['dropped']} pedidos "
+        f"(capturados em {summary['captured_span_s']:.1f} s) em {summary['target']}: {summary['duration_s']:.1f} s",
+        f"pedidos: {summary['sent']} enviados, {summary['completed']} concluídos "
+        f"({summary['same_status']} com o estado capturado), {summary['dropped']} descartados no cliente",
+    ]
+    if speed != MAX_SPEED:
+        lines.append(f"atraso máximo no envio: {summary['max_lag_ms']:.2f} ms")
+    lines.append(f"{'latência (ms)':<14}{'capturada':>12}{'reproduzida':>13}{'variação':>10}")
+    for name, values in summary["latency_ms"].items():
+        change = f"{values['change']:+.1%}" if values["change"] is not None else "—"
+        lines.append(f"  {name:<12}{values['recorded']:>12.2f}{values['replayed']:>13.2f}{change:>10}")
+    delta = summary["delta_ms"]
+    lines.append(
+        "diferença por pedido (ms): " + "  ".join(f"{name} {delta[name]:+.2f}" for name in ("p50", "p95", "p99", "max"))
+    )
+    if summary["status_changes"]:
+        lines.append(
+            "estados diferentes: " + ", ".join(f"{kind}={count}" for kind, count in sorted(summary["status_changes"].items()))
+        )
+    if summary["errors"]:
+        lines.append("erros: " + ", ".join(f"{kind}={count}" for kind, count in sorted(summary["errors"].items())))
+    return "\n".join(lines)
+
+
+async def _main_async(args: argparse.Namespace, records: List[CapturedRequest]) -> ReplayResult:
+    headers = {"X-API-KEY": args.api_key} if args.api_key else {}
+    async with open_client(args.target, timeout=args.timeout, max_connections=args.max_in_flight) as client:
+        return await replay(client, records, args.speed, headers, max_in_flight=args.max_in_flight)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", nargs="+", help="Ficheiros NDJSON ou pastas de captura")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="Factor de aceleração (1, 2, 10, ...) ou 'max'")
+    parser.add_argument("--target", default=ASGI_TARGET, help="'asgi' (no próprio processo) ou URL base do servidor")
+    parser.add_argument("--path-prefix", help="Só reproduz os pedidos cujo caminho começa por este prefixo")
+    parser.add_argument("--limit", type=int, help="Máximo de pedidos (os primeiros por ordem de chegada)")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"))
+    parser.add_argument("--output", help="Escreve o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    records = load_capture(args.capture, args.path_prefix, args.limit)
+    if not records:
+        print("Nenhum pedido capturado nos ficheiros indicados", file=sys.stderr)
+        return 1
+    result = asyncio.run(_main_async(args, records))
+    summary = result.summary()
+    print(format_report(summary))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(summary, indent=1, ensure_ascii=False), encoding="utf-8")
+    return 0 if result.replayed.total and not result.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
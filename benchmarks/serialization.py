@@ -0,0 +1,124 @@
+"""
+Compara o custo por resposta de ``/predict`` no caminho anterior e no rápido.
+
+Caminho anterior: dicionário do modelo com os rótulos formatados a cada
+chamada -> ``PredictionOutput(**resultado)`` -> ``serialize_response`` do
+FastAPI (nova validação pelo ``response_model`` + ``jsonable_encoder``) ->
+``JSONResponse`` (``json.dumps``). Caminho rápido:
+``SustainabilityModel._format_result`` (rótulos pré-calculados) ->
+``dump_body`` (orjson), nas formas ``full`` e ``compact``.
+
+Uso::
+
+    python -m benchmarks.serialization --iterations 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import CLASS_LABELS, SustainabilityModel
+from app.schemas import PredictionOutput
+from app.utils.wire import COMPACT, FULL, JSON, dump_body, shape_result
+
+PROBABILITIES = np.array([0.02, 0.05, 0.08, 0.15, 0.70])
+RESPONSE_FIELD = create_response_field(name="Response_predict", type_=PredictionOutput)
+
+
+def legacy_format(model: SustainabilityModel, probabilities_array: np.ndarray) -> Dict[str, Any]:
+    """``_format_result`` tal como era: rótulos formatados e floats convertidos um a um."""
+    probabilities = probabilities_array.tolist()
+    best_index = int(probabilities_array.argmax())
+    return {
+        "prediction": best_index,
+        "probabilities": probabilities,
+        "prediction_label": model.class_labels.get(best_index, "Desconhecido"),
+        "confidence": round(float(probabilities_array[best_index]) * 100.0, 2),
+        "all_probabilities": {
+            model.class_labels.get(i, f"Classe {i}"): float(prob) for i, prob in enumerate(probabilities)
+        },
+        "model_version": model.model_version,
+        "trees_used": None,
+    }
+
+
+def legacy_response(model: SustainabilityModel) -> bytes:
+    output = PredictionOutput(**legacy_format(model, PROBABILITIES))
+    # serialize_response não suspende com is_coroutine=True: corre a corrotina até ao fim.
+    coroutine = serialize_response(field=RESPONSE_FIELD, response_content=output)
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        content = done.value
+    return JSONResponse(content).body
+
+
+def fast_response(shape: str) -> Callable[[SustainabilityModel], bytes]:
+    def run(model: SustainabilityModel) -> bytes:
+        best_index = int(PROBABILITIES.argmax())
+        result = model._format_result(best_index, PROBABILITIES, best_index)  # pylint: disable=protected-access
+        return dump_body(shape_result(result, shape), JSON)
+
+    return run
+
+
+def measure(func: Callable[[SustainabilityModel], bytes], model: SustainabilityModel, iterations: int) -> dict:
+    for _ in range(min(iterations, 1000)):
+        body = func(model)
+
+    started = time.process_time()
+    for _ in range(iterations):
+        func(model)
+    cpu_seconds = time.process_time() - started
+
+    sample = min(iterations, 1000)
+    peaks = 0
+    tracemalloc.start()
+    for _ in range(sample):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(model)
+        peaks += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return {
+        "cpu_us_per_response": cpu_seconds / iterations * 1e6,
+        "peak_bytes_per_response": peaks / sample,
+        "response_bytes": len(body),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    model = SustainabilityModel()
+    model.class_labels = dict(CLASS_LABELS)
+    model.model_version = "latest"
+    results = {
+        "legacy": measure(legacy_response, model, args.iterations),
+        FULL: measure(fast_response(FULL), model, args.iterations),
+        COMPACT: measure(fast_response(COMPACT), model, args.iterations),
+    }
+    for name, result in results.items():
+        print(
+            f"{name:>7}: {result['cpu_us_per_response']:8.2f} µs CPU/resposta, "
+            f"{result['peak_bytes_per_response']:7.0f} bytes alocados (pico), "
+            f"{result['response_bytes']:4d} bytes de resposta"
+        )
+    for name in (FULL, COMPACT):
+        speedup = results["legacy"]["cpu_us_per_response"] / results[name]["cpu_us_per_response"]
+        print(f"redução de CPU ({name}): {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Suite de microbenchmarks do caminho de inferência, com resultados em JSON.
+
+Cobre a validação do ``PredictionInput``, ``normalize_features``,
+``validate_feature_payload``, a descodificação rápida (``decode_features``),
+``SustainabilityModel.predict`` (uma linha) e ``predict_matrix`` em lotes de
+vários tamanhos, a serialização das respostas e o carregamento de cada
+artefacto ``.pkl`` em ``models/latest``.
+
+Cada benchmark é calibrado para que uma ronda dure pelo menos
+``--min-round-ms``; a amostra de cada ronda é o tempo médio por operação
+(``perf_counter_ns``). O relatório indica operações/s, média, desvio padrão e
+percentis p50/p95/p99 dessas amostras e o pico de memória alocada por
+operação (``tracemalloc``). O JSON inclui as amostras e o ambiente (commit,
+versões, CPU, versão do modelo) para comparação entre commits::
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --filter predict_matrix --output /tmp/depois.json \\
+        --compare benchmarks/results/suite-<commit>.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.models import SustainabilityModel
+from app.schemas import PredictionInput
+from app.utils.decoding import decode_features
+from app.utils.validation import normalize_features, validate_feature_payload
+from app.utils.wire import COMPACT, FULL, JSON, dump_batch_results, dump_body, shape_result
+
+SCHEMA_VERSION = 1
+DEFAULT_BATCH_SIZES = (1, 8, 64, 512, 4096)
+RESULTS_DIR = Path("benchmarks/results")
+PERCENTILES = (50, 95, 99)
+
+
+class SkipBenchmark(Exception):
+    """A operação não se aplica neste ambiente (p.ex. artefacto que não carrega isoladamente)."""
+
+
+@dataclass
+class Benchmark:
+    """Uma operação a medir; ``rows`` é o número de linhas processadas por chamada."""
+
+    name: str
+    group: str
+    func: Callable[[], Any]
+    rows: int = 1
+    rounds: Optional[int] = None
+    number: Optional[int] = None
+
+
+def calibrate(func: Callable[[], Any], min_round_ns: int) -> int:
+    """Menor número de chamadas por ronda (potência de 2) que dura pelo menos ``min_round_ns``."""
+    number = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        if time.perf_counter_ns() - started >= min_round_ns or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def allocation_peak(func: Callable[[], Any], calls: int) -> float:
+    """Pico médio de memória alocada (bytes) durante uma chamada, incluindo temporários."""
+    peaks = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            peaks += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return peaks / calls
+
+
+_REFERENCE_VALUES = np.linspace(0.0, 1.0, 256)
+
+
+def reference_workload() -> float:
+    """Carga fixa (interpretador + numpy) usada como controlo da velocidade da máquina."""
+    total = 0.0
+    features = {f"f{index}": float(index) for index in range(24)}
+    for name, value in features.items():
+        total += value * len(name)
+    return total + float(np.dot(_REFERENCE_VALUES, _REFERENCE_VALUES))
+
+
+def _timed_round(func: Callable[[], Any], number: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(number):
+        func()
+    return (time.perf_counter_ns() - started) / number
+
+
+def measure_reference(rounds: int = 10, min_round_ms: float = 2.0) -> List[float]:
+    """Rondas (ns por chamada) de :func:`reference_workload`, sem outro benchmark intercalado."""
+    number = calibrate(reference_workload, int(min_round_ms * 1e6))
+    return [_timed_round(reference_workload, number) for _ in range(rounds)]
+
+
+def run_benchmark(
+    bench: Benchmark,
+    rounds: int,
+    min_round_ms: float,
+    warmup_rounds: int = 2,
+    reference: bool = False,
+) -> Dict[str, Any]:
+    """
+    Mede ``bench`` em ``rounds`` rondas.
+
+    Com ``reference`` cada ronda é precedida por uma ronda de
+    :func:`reference_workload` com a mesma duração aproximada; as amostras
+    ``reference_ns`` permitem descontar variações de velocidade da máquina
+    ao comparar execuções (ver ``benchmarks.regression``).
+    """
+    number = bench.number or calibrate(bench.func, int(min_round_ms * 1e6))
+    rounds = bench.rounds or rounds
+    for _ in range(warmup_rounds * number):
+        bench.func()
+    reference_number = calibrate(reference_workload, int(min_round_ms * 1e6)) if reference else 0
+
+    gc.collect()
+    samples: List[float] = []
+    reference_samples: List[float] = []
+    for _ in range(rounds):
+        if reference:
+            reference_samples.append(_timed_round(reference_workload, reference_number))
+        samples.append(_timed_round(bench.func, number))
+
+    values = np.asarray(samples)
+    mean_ns = float(values.mean())
+    result: Dict[str, Any] = {
+        "name": bench.name,
+        "group": bench.group,
+        "rows": bench.rows,
+        "rounds": rounds,
+        "number": number,
+        "mean_ns": mean_ns,
+        "stdev_ns": float(values.std(ddof=1)) if rounds > 1 else 0.0,
+        "min_ns": float(values.min()),
+        "max_ns": float(values.max()),
+        "ops_per_sec": 1e9 / mean_ns,
+        "rows_per_sec": bench.rows * 1e9 / mean_ns,
+        "alloc_peak_bytes": allocation_peak(bench.func, min(number, 50)),
+        "samples_ns": samples,
+    }
+    if reference:
+        result["reference_ns"] = reference_samples
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result[f"p{percentile}_ns"] = float(value)
+    return result
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        output = subprocess.run(["git", *args], capture_output=True, text=True, timeout=10, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.strip()
+
+
+def collect_environment(model: Optional[SustainabilityModel] = None) -> Dict[str, Any]:
+    """Commit, versões e máquina em que os resultados foram obtidos."""
+    import sklearn  # pylint: disable=import-outside-toplevel
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "model_version": getattr(model, "model_version", None),
+        "inference_engine": getattr(model, "engine_mode", None),
+    }
+
+
+def _example_payload() -> Dict[str, Any]:
+    return dict(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def _feature_rows(model: SustainabilityModel, data_path: Optional[str]) -> np.ndarray:
+    """Linhas reais do dataset (se existir) ou o exemplo do schema."""
+    if data_path and Path(data_path).exists():
+        from ml.score import read_feature_matrix  # pylint: disable=import-outside-toplevel
+
+        return read_feature_matrix(data_path)
+    return model.build_feature_vector(_example_payload()).reshape(1, -1)
+
+
+def build_benchmarks(
+    model: SustainabilityModel,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    data_path: Optional[str] = "dataset_ready_for_ml.csv",
+    artifacts_dir: Optional[str] = "models/latest",
+    metadata_path: str = "./models/metadata.json",
+) -> List[Benchmark]:
+    payload = _example_payload()
+    body = json.dumps(payload).encode()
+    input_data = PredictionInput.model_validate(payload)
+    features = input_data.to_feature_dict()
+    normalized = normalize_features(features)
+    rows = _feature_rows(model, data_path)
+    result = model.predict(payload)
+
+    benchmarks = [
+        Benchmark("validation.prediction_input", "validation", lambda: PredictionInput.model_validate(payload)),
+        Benchmark("validation.prediction_input_json", "validation", lambda: PredictionInput.model_validate_json(body)),
+        Benchmark("features.normalize_features", "features", lambda: normalize_features(features)),
+        Benchmark("features.validate_feature_payload", "features", lambda: validate_feature_payload(normalized)),
+        Benchmark("features.decode_features", "features", lambda: decode_features(body)),
+        Benchmark("model.predict", "model", lambda: model.predict(payload)),
+    ]
+    for size in batch_sizes:
+        matrix = np.resize(rows, (size, rows.shape[1]))
+        benchmarks.append(
+            Benchmark(
+                f"model.predict_matrix[{size}]", "model", lambda matrix=matrix: model.predict_matrix(matrix), rows=size
+            )
+        )
+
+    benchmarks += [
+        Benchmark(f"serialize.{FULL}", "serialize", lambda: dump_body(shape_result(result, FULL), JSON)),
+        Benchmark(f"serialize.{COMPACT}", "serialize", lambda: dump_body(shape_result(result, COMPACT), JSON)),
+    ]
+    batch_rows = max(batch_sizes)
+    batch_results = [result] * batch_rows
+    benchmarks.append(
+        Benchmark(
+            f"serialize.batch[{batch_rows}]",
+            "serialize",
+            lambda: dump_batch_results(
+                batch_rows, list(range(batch_rows)), batch_results, {}, model.model_version, FULL, JSON
+            ),
+            rows=batch_rows,
+        )
+    )
+
+    if artifacts_dir:
+        for artifact in sorted(Path(artifacts_dir).glob("*.pkl")):
+
+            def load(artifact: Path = artifact) -> None:
+                candidate = SustainabilityModel(engine=model.engine_mode)
+                with candidate.metrics_paused():
+                    if not candidate.load(str(artifact), metadata_path):
+                        raise SkipBenchmark(f"{artifact.name} não contém um estimador utilizável")
+                # ``load`` recorre a outros ficheiros quando o pedido falha: não seria este artefacto.
+                if Path(candidate.loaded_path).resolve() != artifact.resolve():
+                    raise SkipBenchmark(f"{artifact.name} não carrega (usado {candidate.loaded_path})")
+
+            benchmarks.append(Benchmark(f"load.{artifact.name}", "load", load, rounds=5, number=1))
+    return benchmarks
+
+
+def run_suite(
+    benchmarks: Sequence[Benchmark],
+    rounds: int = 30,
+    min_round_ms: float = 5.0,
+    name_filter: Sequence[str] = (),
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    reference: bool = False,
+) -> List[Dict[str, Any]]:
+    results = []
+    for bench in benchmarks:
+        if name_filter and not any(part in bench.name for part in name_filter):
+            continue
+        try:
+            result = run_benchmark(bench, rounds, min_round_ms, reference=reference)
+        except SkipBenchmark as reason:
+            result = {"name": bench.name, "group": bench.group, "skipped": str(reason)}
+        except Exception as err:  # pylint: disable=broad-except
+            result = {"name": bench.name, "group": bench.group, "error": str(err)}
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return results
+
+
+def load_results(path: str | Path) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Variação da mediana (p50) por benchmark presente nos dois ficheiros."""
+    previous = {item["name"]: item for item in baseline["results"] if "p50_ns" in item}
+    rows = []
+    for item in current["results"]:
+        before = previous.get(item["name"])
+        if before is None or "p50_ns" not in item:
+            continue
+        rows.append(
+            {
+                "name": item["name"],
+                "baseline_p50_ns": before["p50_ns"],
+                "current_p50_ns": item["p50_ns"],
+                "change": item["p50_ns"] / before["p50_ns"] - 1.0,
+            }
+        )
+    return rows
+
+
+def format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} ns"
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    if "p50_ns" not in result:
+        status = f"ERRO: {result['error']}" if "error" in result else f"omitido: {result['skipped']}"
+        print(f"{result['name']:<48} {status}")
+        return
+    rows = f" {result['rows_per_sec']:>12,.0f} linhas/s" if result["rows"] > 1 else ""
+    print(
+        f"{result['name']:<48} {result['ops_per_sec']:>12,.1f} ops/s  "
+        f"p50 {format_ns(result['p50_ns']):>10}  p95 {format_ns(result['p95_ns']):>10}  "
+        f"p99 {format_ns(result['p99_ns']):>10}  {result['alloc_peak_bytes']:>10,.0f} B{rows}"
+    )
+
+
+def load_benchmark_model(manifest_path: str, metadata_path: str, engine: str) -> SustainabilityModel:
+    model = SustainabilityModel(engine=engine)
+    with model.metrics_paused():
+        if not model.load_manifest(manifest_path, metadata_path=metadata_path):
+            raise SystemExit(f"Não foi possível carregar o modelo de {manifest_path}")
+    return model
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Ficheiro JSON (por omissão benchmarks/results/suite-<commit>.json)")
+    parser.add_argument("--compare", help="Resultados anteriores para comparar as medianas")
+    parser.add_argument("--filter", nargs="*", default=[], help="Só benchmarks cujo nome contém um destes textos")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--min-round-ms", type=float, default=5.0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument("--data", default="dataset_ready_for_ml.csv")
+    parser.add_argument("--artifacts", default="models/latest", help="Pasta dos artefactos a carregar ('' para omitir)")
+    parser.add_argument("--manifest", default="./models/manifest.json")
+    parser.add_argument("--metadata", default="./models/metadata.json")
+    parser.add_argument("--engine", choices=("compiled", "sklearn"), default="compiled")
+    args = parser.parse_args(argv)
+    # A sondagem dos artefactos legados regista dezenas de erros esperados por carregamento.
+    logging.disable(logging.ERROR)
+    try:
+        model = load_benchmark_model(args.manifest, args.metadata, args.engine)
+        benchmarks = build_benchmarks(model, args.batch_sizes, args.data, args.artifacts or None, args.metadata)
+        results = run_suite(benchmarks, args.rounds, args.min_round_ms, args.filter, progress=_print_result)
+    finally:
+        logging.disable(logging.NOTSET)
+    report = {"schema": SCHEMA_VERSION, "environment": collect_environment(model), "results": results}
+
+    commit = report["environment"]["commit"] or "local"
+    output = Path(args.output) if args.output else RESULTS_DIR / f"suite-{commit[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=1), encoding="utf-8")
+    print(f"\nResultados em {output}")
+
+    if args.compare:
+        print(f"\n{'benchmark':<48} {'antes p50':>10} {'agora p50':>10} {'variação':>9}")
+        for row in compare_results(load_results(args.compare), report):
+            print(
+                f"{row['name']:<48} {format_ns(row['baseline_p50_ns']):>10} "
+                f"{format_ns(row['current_p50_ns']):>10} {row['change'] * 100:>+8.1f}%"
+            )
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
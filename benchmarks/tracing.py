@@ -0,0 +1,107 @@
+"""
+Mede o custo dos spans por etapa com o tracing desligado e ligado.
+
+``baseline`` é um ``with`` sobre um context manager vazio; ``desligado`` é
+``span()`` sem trace activo (o caso de produção com ``TRACING_ENABLED=false``
+ou fora de um pedido); ``ligado`` abre um span real dentro de um trace. Mede
+também a construção do header ``Server-Timing`` e do OTLP/JSON de um pedido
+com as cinco etapas de ``/predict/batch``.
+
+Uso::
+
+    python -m benchmarks.tracing --iterations 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from app.tracing import Trace, _current_trace, span
+
+STAGES = ("read_body", "decode", "validate", "inference", "serialize")
+
+
+class _Empty:
+    __slots__ = ()
+
+    def __enter__(self) -> "_Empty":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_EMPTY = _Empty()
+
+
+def per_call_ns(func: Callable[[], None], iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        func()
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def baseline() -> None:
+    with _EMPTY:
+        pass
+
+
+def traced() -> None:
+    with span("inference"):
+        pass
+
+
+def request_trace() -> Trace:
+    trace = Trace("POST /predict/batch", sampled=True)
+    token = _current_trace.set(trace)
+    try:
+        for stage in STAGES:
+            with span(stage, format="json"):
+                pass
+    finally:
+        _current_trace.reset(token)
+    trace.finish()
+    return trace
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    empty_ns = per_call_ns(baseline, args.iterations)
+    disabled_ns = per_call_ns(traced, args.iterations)
+
+    trace = Trace("bench", sampled=False)
+    token = _current_trace.set(trace)
+    try:
+        # Esvazia a lista a cada volta para não medir o crescimento da memória.
+        def enabled() -> None:
+            traced()
+            trace.spans.clear()
+
+        enabled_ns = per_call_ns(enabled, args.iterations)
+    finally:
+        _current_trace.reset(token)
+
+    sample = request_trace()
+    requests = max(args.iterations // 20, 1)
+    request_ns = per_call_ns(request_trace, requests)
+    header_ns = per_call_ns(sample.server_timing, requests)
+    otlp_ns = per_call_ns(lambda: json.dumps(sample.to_otlp(), separators=(",", ":")), requests)
+
+    print(f"baseline (with vazio):      {empty_ns:8.0f} ns/etapa")
+    print(f"span desligado:             {disabled_ns:8.0f} ns/etapa ({disabled_ns - empty_ns:+.0f} ns)")
+    print(f"span ligado:                {enabled_ns:8.0f} ns/etapa")
+    print(f"pedido com {len(STAGES)} etapas:        {request_ns / 1000:8.2f} µs")
+    print(f"header Server-Timing:       {header_ns / 1000:8.2f} µs")
+    print(f"OTLP/JSON (thread export):  {otlp_ns / 1000:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
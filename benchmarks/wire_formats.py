@@ -0,0 +1,138 @@
+"""
+Compara JSON, MessagePack e Arrow IPC em `/predict/batch`.
+
+Para um lote de N linhas mede os bytes do pedido e da resposta e o CPU do
+servidor por linha em cada etapa: descodificação do corpo até à matriz de
+features, chamada ao modelo (``predict_matrix`` para JSON/MessagePack,
+``predict_arrays`` para Arrow) e serialização da resposta. JSON e
+MessagePack seguem o caminho do servidor (``dump_batch_results``).
+Formatos cujo pacote opcional não está instalado são ignorados.
+
+Uso::
+
+    python -m benchmarks.wire_formats --rows 1000 --iterations 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from copy import deepcopy
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.models import SustainabilityModel
+from app.schemas import BatchPredictionInput, PredictionInput
+from app.utils.decoding import decode_many
+from app.utils.validation import format_validation_error
+from app.utils.wire import (
+    ARROW,
+    FULL,
+    JSON,
+    MSGPACK,
+    available_formats,
+    decode_arrow_batch,
+    dump_batch_results,
+    dump_body,
+    encode_arrow_batch,
+    features_to_arrow,
+    load_body,
+)
+from core.settings import settings
+
+
+def make_rows(count: int, seed: int = 0) -> List[dict]:
+    """Linhas variadas a partir do exemplo do schema (valores dentro dos limites)."""
+    rng = np.random.default_rng(seed)
+    example = PredictionInput.model_config["json_schema_extra"]["example"]
+    rows = []
+    for _ in range(count):
+        row = deepcopy(example)
+        for key, value in row.items():
+            if isinstance(value, float):
+                row[key] = round(value * float(rng.uniform(0.9, 1.0)), 4)
+        rows.append(row)
+    return rows
+
+
+def object_pipeline(fmt: str, model: SustainabilityModel) -> Dict[str, Callable]:
+    def decode(body):
+        batch = BatchPredictionInput.model_validate(load_body(body, fmt))
+        matrix, valid, errors = decode_many(batch.items)
+        return matrix, valid, {i: format_validation_error(e) for i, e in errors.items()}
+
+    def encode(results, valid, errors, total):
+        return dump_batch_results(total, valid, results, errors, model.model_version, FULL, fmt)
+
+    return {"decode": decode, "score": model.predict_matrix, "encode": encode}
+
+
+def arrow_pipeline(model: SustainabilityModel) -> Dict[str, Callable]:
+    def encode(results, valid, errors, total):
+        predictions, probabilities = results
+        return encode_arrow_batch(
+            total, valid, predictions, probabilities, model.class_labels, errors, model.model_version
+        )
+
+    return {"decode": decode_arrow_batch, "score": model.predict_arrays, "encode": encode}
+
+
+def measure(pipeline: Dict[str, Callable], body: bytes, rows: int, iterations: int) -> Dict[str, float]:
+    cpu = {"decode": 0.0, "score": 0.0, "encode": 0.0}
+    response = b""
+    for iteration in range(iterations + 1):
+        stage = time.process_time()
+        matrix, valid, errors = pipeline["decode"](body)
+        decoded = time.process_time()
+        results = pipeline["score"](matrix)
+        scored = time.process_time()
+        response = pipeline["encode"](results, valid, errors, rows)
+        encoded = time.process_time()
+        if iteration == 0:
+            continue  # aquecimento
+        cpu["decode"] += decoded - stage
+        cpu["score"] += scored - decoded
+        cpu["encode"] += encoded - scored
+    per_row = {name: seconds / iterations / rows * 1e6 for name, seconds in cpu.items()}
+    per_row["total"] = sum(per_row.values())
+    per_row["request_bytes"] = len(body)
+    per_row["response_bytes"] = len(response)
+    return per_row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--model", default=settings.MODEL_REGISTRY_PATH)
+    args = parser.parse_args()
+
+    model = SustainabilityModel()
+    if not model.load(model_path=args.model, metadata_path=settings.METADATA_FILE):
+        raise SystemExit(f"Não foi possível carregar o modelo {args.model}")
+
+    rows = make_rows(args.rows)
+    formats = available_formats()
+    cases = {}
+    for fmt in (JSON, MSGPACK):
+        if fmt in formats:
+            cases[fmt] = (object_pipeline(fmt, model), dump_body({"items": rows}, fmt))
+    if ARROW in formats:
+        cases[ARROW] = (arrow_pipeline(model), features_to_arrow(rows))
+
+    print(f"{args.rows} linhas por lote, {args.iterations} iterações")
+    print(f"{'formato':>8} {'pedido B':>10} {'resposta B':>11} {'decode':>8} {'modelo':>8} {'encode':>8} {'total':>8}  (µs CPU/linha)")
+    baseline = None
+    for fmt, (pipeline, body) in cases.items():
+        result = measure(pipeline, body, args.rows, args.iterations)
+        baseline = baseline or result
+        print(
+            f"{fmt:>8} {result['request_bytes']:>10} {result['response_bytes']:>11} "
+            f"{result['decode']:8.2f} {result['score']:8.2f} {result['encode']:8.2f} {result['total']:8.2f}"
+            f"  ({baseline['total'] / result['total']:.1f}x vs json)"
+        )
+
+
+if __name__ == "__main__":
+    main()
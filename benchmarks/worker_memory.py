@@ -0,0 +1,150 @@
+"""
+Memória por worker: ``uvicorn --workers N`` contra ``python -m app.launcher``.
+
+Arranca o servidor em cada modo numa porta livre, espera por ``/health``,
+envia alguns pedidos a ``/predict`` (para que cada worker toque no modelo) e
+lê ``/proc/<pid>/smaps_rollup`` do processo pai e de cada worker:
+
+* RSS — páginas residentes, incluindo as partilhadas;
+* PSS — páginas partilhadas divididas pelos processos que as usam;
+* USS — páginas privadas (``Private_Clean + Private_Dirty``), o custo real
+  de cada worker adicional.
+
+Só funciona em Linux. Uso::
+
+    python -m benchmarks.worker_memory --workers 4 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+from app.schemas import PredictionInput
+
+COMMANDS = {
+    "uvicorn": [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--no-access-log"],
+    "launcher": [sys.executable, "-m", "app.launcher", "--host", "127.0.0.1"],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    fields: Dict[str, int] = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, _, value = line.partition(":")
+        fields[name] = int(value.split()[0])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def worker_pids(parent: int) -> List[int]:
+    """Filhos directos de ``parent`` que são workers (exclui o resource tracker)."""
+    pids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            cmdline = (entry / "cmdline").read_bytes()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid == parent and b"resource_tracker" not in cmdline:
+            pids.append(int(entry.name))
+    return sorted(pids)
+
+
+def wait_healthy(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                if json.load(response).get("model_loaded"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Servidor na porta {port} não ficou pronto em {timeout:.0f}s")
+
+
+def send_requests(port: int, count: int, api_key: str) -> None:
+    body = json.dumps(PredictionInput.model_config["json_schema_extra"]["example"]).encode()
+    for _ in range(count):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/predict",
+            data=body,
+            headers={"Content-Type": "application/json", "X-API-KEY": api_key},
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+
+def measure(mode: str, workers: int, requests: int, api_key: str, timeout: float) -> Dict[str, object]:
+    port = free_port()
+    env = {**os.environ, "API_KEY": api_key}
+    command = COMMANDS[mode] + ["--port", str(port), "--workers", str(workers)]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_healthy(port, timeout)
+        while len(worker_pids(process.pid)) < workers:
+            time.sleep(0.2)
+        send_requests(port, requests, api_key)
+        time.sleep(0.5)
+        return {
+            "parent": memory_kb(process.pid),
+            "workers": [memory_kb(pid) for pid in worker_pids(process.pid)],
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--modes", nargs="+", choices=sorted(COMMANDS), default=["uvicorn", "launcher"])
+    args = parser.parse_args()
+    api_key = os.environ.get("API_KEY", "benchmark-key")
+
+    print(f"{args.workers} workers, {args.requests} pedidos (valores em MiB)")
+    print(f"{'modo':>9} {'processo':>9} {'RSS':>8} {'PSS':>8} {'USS':>8}")
+    for mode in args.modes:
+        result = measure(mode, args.workers, args.requests, api_key, args.timeout)
+        rows = [("pai", result["parent"])] + [
+            (f"worker {i}", usage) for i, usage in enumerate(result["workers"])
+        ]
+        for name, usage in rows:
+            print(
+                f"{mode:>9} {name:>9} {usage['rss'] / 1024:8.1f} "
+                f"{usage['pss'] / 1024:8.1f} {usage['uss'] / 1024:8.1f}"
+            )
+        total_pss = sum(usage["pss"] for _, usage in rows)
+        total_uss = sum(usage["uss"] for _, usage in rows)
+        print(f"{mode:>9} {'total':>9} {'':>8} {total_pss / 1024:8.1f} {total_uss / 1024:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
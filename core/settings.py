@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Annotated, List, Union
+from typing import Annotated, List, Literal, Union
 
 from pydantic import Field, ValidationError, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,9 +26,60 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     MODEL_REGISTRY_PATH: str = "./models/latest/sustainability_classification_pipeline.pkl"
     METADATA_FILE: str = "./models/metadata.json"
+    MODEL_LOAD_MODE: Literal["manifest", "legacy"] = "manifest"
+    MODEL_MANIFEST_PATH: str = "./models/manifest.json"
+    MODEL_VERSION: str | None = None
+    MODEL_VERIFY_CHECKSUM: bool = True
+    MODEL_REGISTRY_MAX_BYTES: int = Field(default=256 * 1024 * 1024, ge=0)
+    MODEL_WATCH_ENABLED: bool = False
+    MODEL_WATCH_INTERVAL_SECONDS: float = Field(default=5.0, gt=0)
+    SHADOW_MODEL_VERSION: str | None = None
+    SHADOW_FRACTION: float = Field(default=0.0, ge=0, le=1)
+    SHADOW_MAX_PENDING: int = Field(default=32, ge=1)
     API_KEY: str = Field(..., min_length=3)
     CORS_ORIGINS: Union[str, List[str]] = Field(default="*")
     LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SAMPLE_RATES: str | None = None
+    LOG_QUEUE_SIZE: int = Field(default=10_000, ge=1)
+    LOG_BATCH_SIZE: int = Field(default=256, ge=1)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = Field(default=0.01, ge=0, le=1)
+    TRACING_EXPORT_PATH: str | None = "./traces/spans.jsonl"
+    CAPTURE_ENABLED: bool = False
+    CAPTURE_SAMPLE_RATE: float = Field(default=0.01, ge=0, le=1)
+    CAPTURE_DIR: str = "./captures"
+    CAPTURE_MAX_FILE_BYTES: int = Field(default=64 * 1024 * 1024, ge=1)
+    CAPTURE_MAX_FILES: int = Field(default=10, ge=1)
+    CAPTURE_MAX_BODY_BYTES: int = Field(default=1024 * 1024, ge=0)
+    PREDICT_BATCH_MAX_SIZE: int = Field(default=1000, ge=1)
+    INFERENCE_ENGINE: Literal["compiled", "sklearn"] = "compiled"
+    MICROBATCH_ENABLED: bool = False
+    MICROBATCH_WINDOW_MS: float = Field(default=2.0, ge=0)
+    MICROBATCH_MAX_SIZE: int = Field(default=64, ge=1)
+    INFERENCE_EXECUTOR: Literal["thread", "process"] = "thread"
+    INFERENCE_WORKERS: int | None = Field(default=None, ge=1)
+    INFERENCE_QUEUE_LIMIT: int = Field(default=64, ge=0)
+    WORKERS: int = Field(default=1, ge=1)
+    WORKER_RESTART_MAX: int = Field(default=5, ge=0)
+    WORKER_RESTART_BACKOFF_SECONDS: float = Field(default=0.5, gt=0)
+    WORKER_RESTART_BACKOFF_MAX_SECONDS: float = Field(default=30.0, gt=0)
+    INFERENCE_THREADS_SINGLE: int | None = Field(default=None, ge=1)
+    INFERENCE_THREADS_BATCH: int | None = Field(default=None, ge=1)
+    INFERENCE_BATCH_MIN_ROWS: int = Field(default=64, ge=1)
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ENTRIES: int = Field(default=10_000, ge=1)
+    PREDICTION_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024, ge=1)
+    PREDICTION_CACHE_TTL_SECONDS: float = Field(default=3600.0, gt=0)
+    PREDICTION_CACHE_QUANTIZE_DECIMALS: int | None = Field(default=None, ge=0)
+    PREDICT_STREAM_CHUNK_SIZE: int = Field(default=256, ge=1)
+    PREDICT_STREAM_MAX_LINE_BYTES: int = Field(default=65536, ge=1)
+    REQUEST_TIMEOUT_MS: float | None = Field(default=5000.0, gt=0)
+    ADMISSION_MAX_IN_FLIGHT: int = Field(default=128, ge=1)
+    EARLY_EXIT_ENABLED: bool = False
+    EARLY_EXIT_TREE_CHUNK: int = Field(default=16, ge=1)
+    EARLY_EXIT_MIN_ROWS: int = Field(default=256, ge=1)
+    EARLY_EXIT_TIME_BUDGET_MS: float | None = Field(default=None, gt=0)
 
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
@@ -29,10 +29,9 @@ if [ -n "${MODEL_REGISTRY_PATH}" ]; then
     fi
 fi
 
-# Executa uvicorn com os parâmetros configurados
-exec uvicorn app.main:app \
+# Carrega o modelo uma vez e faz fork dos workers uvicorn (partilham a cópia do modelo)
+exec python -m app.launcher \
     --host "${HOST}" \
     --port "${PORT}" \
-    --workers "${WORKERS}" \
-    --no-access-log
+    --workers "${WORKERS}"
 
@@ -0,0 +1,188 @@
+"""
+Manifesto dos artefactos do modelo (``models/manifest.json``).
+
+Regista, por versão, o único artefacto válido: caminho (relativo à pasta do
+manifesto), formato, checksum SHA-256, ordem das features e rótulos das
+classes. Com o manifesto o arranque faz uma única desserialização directa,
+em vez de sondar vários pickles até encontrar um com estimador.
+
+Formatos:
+
+* ``joblib-dict`` — dicionário gravado por ``train_model.py``; o estimador
+  está na chave ``model_key`` (por omissão ``"model"``);
+* ``joblib-estimator`` — o estimador (ou Pipeline) gravado directamente.
+
+Escrito por ``train_model.py``; para artefactos existentes::
+
+    python -m ml.manifest models/latest/sustainability_classification_pipeline.pkl --version latest
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+
+from ml.tree_engine import file_sha256
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = Path("./models/manifest.json")
+MANIFEST_SCHEMA_VERSION = 1
+ARTIFACT_FORMATS = ("joblib-dict", "joblib-estimator")
+
+
+class ManifestError(RuntimeError):
+    """Manifesto ausente, inválido ou inconsistente com o artefacto."""
+
+
+def read_manifest(path: str | Path = MANIFEST_PATH) -> Dict[str, Any]:
+    target = Path(path)
+    try:
+        with target.open(encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError as exc:
+        raise ManifestError(f"Manifesto não encontrado em {target}") from exc
+    except (OSError, ValueError) as exc:
+        raise ManifestError(f"Manifesto inválido em {target}: {exc}") from exc
+    if not isinstance(manifest.get("versions"), dict) or not manifest["versions"]:
+        raise ManifestError(f"Manifesto sem versões em {target}")
+    return manifest
+
+
+def resolve_entry(manifest: Dict[str, Any], version: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """Entrada da ``version`` pedida (ou da ``default_version`` do manifesto)."""
+    version = version or manifest.get("default_version")
+    entry = manifest["versions"].get(version) if version else None
+    if entry is None:
+        available = ", ".join(sorted(manifest["versions"]))
+        raise ManifestError(f"Versão {version!r} não existe no manifesto (disponíveis: {available})")
+    if entry.get("format") not in ARTIFACT_FORMATS:
+        raise ManifestError(f"Formato de artefacto desconhecido: {entry.get('format')}")
+    return version, entry
+
+
+def artifact_path(manifest_path: str | Path, entry: Dict[str, Any]) -> Path:
+    """Caminho do artefacto; caminhos relativos são relativos à pasta do manifesto."""
+    path = Path(entry["artifact"])
+    return path if path.is_absolute() else Path(manifest_path).parent / path
+
+
+def load_artifact(
+    manifest_path: str | Path = MANIFEST_PATH,
+    version: Optional[str] = None,
+    verify_checksum: bool = True,
+) -> Tuple[Any, str, Dict[str, Any], Path]:
+    """
+    Carrega o estimador de uma versão com uma única desserialização.
+
+    Devolve ``(estimador, versão, entrada do manifesto, caminho do artefacto)``.
+    """
+    version, entry = resolve_entry(read_manifest(manifest_path), version)
+    path = artifact_path(manifest_path, entry)
+    if not path.exists():
+        raise ManifestError(f"Artefacto da versão {version} não encontrado: {path}")
+    if verify_checksum and entry.get("sha256") and file_sha256(path) != entry["sha256"]:
+        raise ManifestError(f"Checksum de {path} não coincide com o manifesto")
+
+    loaded = joblib.load(path)
+    if entry["format"] == "joblib-dict":
+        key = entry.get("model_key", "model")
+        if not isinstance(loaded, dict) or key not in loaded:
+            raise ManifestError(f"{path} não contém a chave {key!r} indicada no manifesto")
+        loaded = loaded[key]
+    if not (hasattr(loaded, "predict") and hasattr(loaded, "predict_proba")):
+        raise ManifestError(f"{path} não contém um estimador com predict/predict_proba")
+    logger.info("Modelo %s carregado de %s (manifesto)", version, path)
+    return loaded, version, entry, path
+
+
+def write_manifest(
+    artifact: str | Path,
+    version: str,
+    feature_names: Sequence[str],
+    class_labels: Dict[int, str],
+    artifact_format: str = "joblib-dict",
+    model_key: str = "model",
+    metadata: Optional[Dict[str, Any]] = None,
+    manifest_path: str | Path = MANIFEST_PATH,
+    make_default: bool = True,
+) -> Dict[str, Any]:
+    """Acrescenta (ou substitui) a entrada de ``version`` e grava o manifesto."""
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ManifestError(f"Formato de artefacto desconhecido: {artifact_format}")
+    manifest_path = Path(manifest_path)
+    try:
+        manifest = read_manifest(manifest_path)
+    except ManifestError:
+        manifest = {"schema_version": MANIFEST_SCHEMA_VERSION, "versions": {}}
+
+    artifact = Path(artifact)
+    try:
+        relative = artifact.resolve().relative_to(manifest_path.parent.resolve())
+    except ValueError:
+        relative = artifact.resolve()
+    entry: Dict[str, Any] = {
+        "artifact": relative.as_posix(),
+        "format": artifact_format,
+        "sha256": file_sha256(artifact),
+        "size_bytes": artifact.stat().st_size,
+        "feature_names": list(feature_names),
+        "class_labels": {str(key): value for key, value in class_labels.items()},
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "metadata": metadata or {},
+    }
+    if artifact_format == "joblib-dict":
+        entry["model_key"] = model_key
+    manifest["versions"][version] = entry
+    if make_default or not manifest.get("default_version"):
+        manifest["default_version"] = version
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    tmp_path.replace(manifest_path)
+    return entry
+
+
+def main(argv: List[str] | None = None) -> None:
+    from app.models import CLASS_LABELS  # pylint: disable=import-outside-toplevel
+    from app.utils.feature_aliases import CANONICAL_FEATURES  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("artifact", help="Artefacto joblib a registar")
+    parser.add_argument("--version", required=True)
+    parser.add_argument("--format", choices=ARTIFACT_FORMATS, default=None, help="Por omissão é detectado")
+    parser.add_argument("--manifest", default=str(MANIFEST_PATH))
+    parser.add_argument("--no-default", action="store_true", help="Não tornar esta versão a versão por omissão")
+    args = parser.parse_args(argv)
+
+    artifact_format = args.format
+    metadata: Dict[str, Any] = {}
+    if artifact_format is None:
+        loaded = joblib.load(args.artifact)
+        artifact_format = "joblib-dict" if isinstance(loaded, dict) else "joblib-estimator"
+        if isinstance(loaded, dict):
+            if "model" not in loaded:
+                raise SystemExit(f"{args.artifact} é um dicionário sem a chave 'model' (só metadados?)")
+            metadata = dict(loaded.get("performance") or {})
+    entry = write_manifest(
+        args.artifact,
+        args.version,
+        CANONICAL_FEATURES,
+        CLASS_LABELS,
+        artifact_format=artifact_format,
+        metadata=metadata,
+        manifest_path=args.manifest,
+        make_default=not args.no_default,
+    )
+    print(f"{args.version}: {entry['artifact']} ({entry['format']}, sha256 {entry['sha256'][:12]}…)")
+
+
+if __name__ == "__main__":
+    main()
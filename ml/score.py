@@ -0,0 +1,363 @@
+"""
+Classificação offline em massa de ficheiros CSV.
+
+Lê o CSV em blocos de tamanho fixo, mapeia as colunas (com acentos ou já
+normalizadas) para ``CANONICAL_FEATURES``, deriva as features que o
+``train_model.py`` também deriva e distribui os blocos por um pool de
+processos. O modelo é carregado uma vez no processo principal e partilhado
+com os workers via ``fork``. Os resultados são escritos incrementalmente,
+pela ordem de entrada, em CSV ou Parquet (requer ``pyarrow``).
+
+Uso::
+
+    python -m ml.score dataset_ready_for_ml.csv -o predicoes.csv
+    python -m ml.score export.csv -o predicoes.parquet --chunk-size 50000 --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models import CLASS_LABELS
+from app.utils.feature_aliases import CANONICAL_FEATURES, resolve_feature_name
+from ml.model_loader import load_model
+from ml.tree_engine import load_or_compile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "./models/latest/sustainability_classification_pipeline.pkl"
+DEFAULT_CHUNK_SIZE = 10_000
+PRICE_CATEGORY_BINS = 5
+
+# Modelo partilhado com os workers (definido antes do fork).
+_SCORER: Optional["Scorer"] = None
+
+
+class Scorer:
+    """Estimador carregado e, quando possível, o respectivo motor compilado."""
+
+    def __init__(self, estimator, engine=None) -> None:
+        self.estimator = estimator
+        self.engine = engine
+        self.classes = np.asarray(getattr(estimator, "classes_", np.arange(len(CLASS_LABELS))))
+
+    @classmethod
+    def load(cls, model_path: str, engine: str = "compiled") -> "Scorer":
+        loaded, resolved_path = load_model(model_path)
+        estimator = loaded.get("model") if isinstance(loaded, dict) else loaded
+        if not hasattr(estimator, "predict_proba"):
+            raise ValueError(f"Artefacto sem estimador utilizável: {resolved_path}")
+        compiled = load_or_compile(estimator, resolved_path) if engine == "compiled" else None
+        logger.info(
+            "Modelo %s carregado de %s (motor %s)",
+            type(estimator).__name__, resolved_path, "compilado" if compiled is not None else "nativo",
+        )
+        return cls(estimator, compiled)
+
+    def predict_proba(self, matrix: np.ndarray) -> np.ndarray:
+        if self.engine is not None:
+            return self.engine.predict_proba(matrix)
+        return np.asarray(self.estimator.predict_proba(matrix))
+
+
+class PriceBins:
+    """Limites de ``price_category`` equivalentes a ``pd.cut(bins=5)`` sobre a coluna inteira."""
+
+    def __init__(self, minimum: float, maximum: float, bins: int = PRICE_CATEGORY_BINS) -> None:
+        if minimum == maximum:
+            minimum -= 0.001 * abs(minimum) if minimum != 0 else 0.001
+            maximum += 0.001 * abs(maximum) if maximum != 0 else 0.001
+            edges = np.linspace(minimum, maximum, bins + 1)
+        else:
+            edges = np.linspace(minimum, maximum, bins + 1)
+            edges[0] -= (maximum - minimum) * 0.001
+        self.edges = edges
+
+    def categorize(self, prices: np.ndarray) -> np.ndarray:
+        # Intervalos fechados à direita, como no pd.cut: (a, b]
+        category = np.searchsorted(self.edges, prices, side="left") - 1
+        return np.clip(category, 0, len(self.edges) - 2).astype(np.float64)
+
+
+def _canonical_columns(columns: Sequence[str]) -> Dict[str, str]:
+    """Mapeia colunas do ficheiro para nomes canónicos (a primeira ocorrência ganha)."""
+    mapping: Dict[str, str] = {}
+    for column in columns:
+        canonical = resolve_feature_name(column)
+        if canonical in CANONICAL_FEATURES and canonical not in mapping.values():
+            mapping[column] = canonical
+    return mapping
+
+
+# Features que o ficheiro pode omitir e as colunas de que são derivadas (train_model.py).
+DERIVED_FEATURES: Dict[str, Tuple[str, ...]] = {
+    "price_sust_ratio": ("sustainability_index", "price_per_night_usd"),
+    "eco_value_score": ("eco_value_ratio",),
+    "total_sust_score": ("sustainability_index",),
+    "price_category": ("price_per_night_usd",),
+    "water_consumption_ratio": ("water_usage_index",),
+}
+
+
+def check_columns(mapping: Dict[str, str]) -> None:
+    """Lança ``ValueError`` com as colunas em falta, incluindo as fontes das features derivadas."""
+    present = set(mapping.values())
+    missing: List[str] = []
+    for feature in CANONICAL_FEATURES:
+        if feature in present:
+            continue
+        sources = DERIVED_FEATURES.get(feature)
+        if sources is None:
+            missing.append(feature)
+        else:
+            missing.extend(source for source in sources if source not in present)
+    if missing:
+        raise ValueError(f"Colunas em falta no ficheiro: {list(dict.fromkeys(missing))}")
+
+
+def _price_column(mapping: Dict[str, str]) -> str:
+    return next(column for column, canonical in mapping.items() if canonical == "price_per_night_usd")
+
+
+def scan_price_bins(path: Path, price_column: str, chunk_size: int) -> PriceBins:
+    """Primeira passagem (só a coluna de preço) para obter o mínimo e o máximo."""
+    minimum, maximum = np.inf, -np.inf
+    for chunk in pd.read_csv(path, usecols=[price_column], chunksize=chunk_size):
+        prices = pd.to_numeric(chunk[price_column], errors="coerce")
+        minimum = min(minimum, prices.min())
+        maximum = max(maximum, prices.max())
+    if not np.isfinite(minimum) or not np.isfinite(maximum):
+        raise ValueError(f"Coluna {price_column} sem valores numéricos")
+    return PriceBins(float(minimum), float(maximum))
+
+
+def build_feature_matrix(
+    chunk: pd.DataFrame, mapping: Dict[str, str], price_bins: Optional[PriceBins] = None
+) -> np.ndarray:
+    """Converte um bloco do CSV numa matriz float64 na ordem de ``CANONICAL_FEATURES``."""
+    check_columns(mapping)
+    features = {
+        canonical: pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=np.float64)
+        for column, canonical in mapping.items()
+    }
+    # Features derivadas (mesmas fórmulas do train_model.py)
+    if "price_sust_ratio" not in features:
+        features["price_sust_ratio"] = features["sustainability_index"] / (features["price_per_night_usd"] + 1)
+    if "eco_value_score" not in features:
+        features["eco_value_score"] = features["eco_value_ratio"] * 100
+    if "total_sust_score" not in features:
+        features["total_sust_score"] = features["sustainability_index"]
+    if "price_category" not in features:
+        if price_bins is None:
+            raise ValueError("price_category ausente e sem limites de preço calculados")
+        features["price_category"] = price_bins.categorize(features["price_per_night_usd"])
+    if "water_consumption_ratio" not in features:
+        features["water_consumption_ratio"] = features["water_usage_index"] / 100
+
+    matrix = np.empty((len(chunk), len(CANONICAL_FEATURES)), dtype=np.float64)
+    for column, feature in enumerate(CANONICAL_FEATURES):
+        matrix[:, column] = features[feature]
+    return matrix
+
+
+def read_feature_matrix(path: str | Path) -> np.ndarray:
+    """Lê um CSV pequeno por inteiro e devolve a matriz de features (p.ex. para benchmarks)."""
+    frame = pd.read_csv(path)
+    mapping = _canonical_columns(frame.columns.tolist())
+    check_columns(mapping)
+    price_bins = None
+    if "price_category" not in mapping.values():
+        prices = pd.to_numeric(frame[_price_column(mapping)], errors="coerce")
+        price_bins = PriceBins(float(prices.min()), float(prices.max()))
+    return build_feature_matrix(frame, mapping, price_bins)
+
+
+def _score_chunk(matrix: np.ndarray) -> Tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    probabilities = _SCORER.predict_proba(matrix)
+    return probabilities, time.perf_counter() - started
+
+
+class _Writer:
+    """Escrita incremental em CSV ou Parquet."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.parquet = path.suffix.lower() in (".parquet", ".pq")
+        self._parquet_writer = None
+        self._first = True
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+            except ImportError as exc:
+                raise RuntimeError("Saída Parquet requer o pacote 'pyarrow'") from exc
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa  # pylint: disable=import-outside-toplevel
+            import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _result_frame(
+    chunk: pd.DataFrame, keep_columns: List[str], probabilities: np.ndarray, classes: np.ndarray
+) -> pd.DataFrame:
+    best = probabilities.argmax(axis=1)
+    predictions = classes[best].astype(int)
+    frame = chunk[keep_columns].reset_index(drop=True) if keep_columns else pd.DataFrame(index=range(len(chunk)))
+    frame["prediction"] = predictions
+    frame["prediction_label"] = [CLASS_LABELS.get(int(p), "Desconhecido") for p in predictions]
+    frame["confidence"] = np.round(probabilities[np.arange(len(best)), best] * 100.0, 2)
+    for column, class_value in enumerate(classes):
+        frame[f"prob_{class_value}"] = probabilities[:, column]
+    return frame
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    scorer: Scorer,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    keep_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Classifica ``input_path`` e escreve em ``output_path``; devolve as estatísticas."""
+    global _SCORER  # pylint: disable=global-statement
+    timings = {"scan": 0.0, "read": 0.0, "prepare": 0.0, "score": 0.0, "write": 0.0}
+    started = time.perf_counter()
+
+    header = pd.read_csv(input_path, nrows=0).columns.tolist()
+    mapping = _canonical_columns(header)
+    check_columns(mapping)
+    keep_columns = [column for column in (keep_columns or []) if column in header]
+
+    price_bins = None
+    if "price_category" not in mapping.values():
+        stage = time.perf_counter()
+        price_bins = scan_price_bins(input_path, _price_column(mapping), chunk_size)
+        timings["scan"] = time.perf_counter() - stage
+
+    _SCORER = scorer
+    pool = None
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+
+    writer = _Writer(output_path)
+    # Blocos em curso: limitados para que a memória dependa só do tamanho do bloco.
+    in_flight: Deque[Tuple[pd.DataFrame, Future]] = deque()
+    max_in_flight = max(workers, 1) * 2
+    rows = 0
+
+    def drain_one() -> None:
+        nonlocal rows
+        chunk, future = in_flight.popleft()
+        probabilities, score_seconds = future.result()
+        timings["score"] += score_seconds
+        stage = time.perf_counter()
+        writer.write(_result_frame(chunk, keep_columns, probabilities, scorer.classes))
+        timings["write"] += time.perf_counter() - stage
+        rows += len(chunk)
+
+    try:
+        reader: Iterator[pd.DataFrame] = iter(
+            pd.read_csv(input_path, usecols=list(mapping) + keep_columns, chunksize=chunk_size)
+        )
+        while True:
+            stage = time.perf_counter()
+            chunk = next(reader, None)
+            timings["read"] += time.perf_counter() - stage
+            if chunk is None:
+                break
+
+            stage = time.perf_counter()
+            matrix = build_feature_matrix(chunk, mapping, price_bins)
+            timings["prepare"] += time.perf_counter() - stage
+
+            if pool is not None:
+                future = pool.submit(_score_chunk, matrix)
+            else:
+                future = Future()
+                future.set_result(_score_chunk(matrix))
+            in_flight.append((chunk[keep_columns], future))
+            if len(in_flight) >= max_in_flight:
+                drain_one()
+        while in_flight:
+            drain_one()
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        _SCORER = None
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0.0,
+        "timings": timings,
+        "workers": workers if pool is not None else 1,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Classificação offline de ficheiros CSV.")
+    parser.add_argument("input", help="CSV de entrada (formato dataset_ready_for_ml.csv)")
+    parser.add_argument("-o", "--output", required=True, help="Ficheiro de saída (.csv ou .parquet)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Caminho do artefacto do modelo")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Linhas por bloco")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Processos de classificação (1 = sem pool)"
+    )
+    parser.add_argument("--engine", choices=("compiled", "sklearn"), default="compiled")
+    parser.add_argument(
+        "--keep", default="", help="Colunas do ficheiro a copiar para a saída, separadas por vírgulas"
+    )
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size e --workers devem ser >= 1")
+
+    logging.basicConfig(level=logging.INFO)
+    load_started = time.perf_counter()
+    scorer = Scorer.load(args.model, engine=args.engine)
+    load_seconds = time.perf_counter() - load_started
+
+    keep = [column.strip() for column in args.keep.split(",") if column.strip()]
+    stats = score_file(
+        Path(args.input), Path(args.output), scorer,
+        chunk_size=args.chunk_size, workers=args.workers, keep_columns=keep,
+    )
+
+    print(
+        f"{stats['rows']} linhas em {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:.0f} linhas/s, {stats['workers']} processo(s)) -> {args.output}"
+    )
+    print(f"  load:    {load_seconds:.3f}s")
+    for stage, seconds in stats["timings"].items():
+        print(f"  {stage + ':':<8} {seconds:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""
+Política de threads da inferência em serviço.
+
+O artefacto de treino guarda ``n_jobs=-1`` nos estimadores, pelo que cada
+``predict_proba`` — mesmo de uma só linha — passa pelo despacho paralelo do
+joblib, e os pools OpenMP/BLAS de cada processo tentam usar todos os cores.
+Com vários workers do uvicorn (``WORKERS``) e um executor de inferência com
+várias chamadas em simultâneo, o CPU fica sobre-subscrito.
+
+:class:`ThreadPolicy` reparte os cores disponíveis pelos workers do uvicorn e
+pelas chamadas concorrentes do executor e define dois valores:
+
+* ``single_threads`` — threads por chamada com menos de ``batch_min_rows``
+  linhas (por omissão 1: o custo de despacho excede o ganho);
+* ``batch_threads`` — threads por chamada de lote.
+
+Ao carregar o modelo (:meth:`ThreadPolicy.apply`) o ``n_jobs`` dos estimadores
+sklearn passa a ``None``, para que cada chamada use o ``parallel_config`` do
+joblib devolvido por :meth:`ThreadPolicy.context` (thread-local); o XGBoost,
+que não consulta o joblib, recebe ``batch_threads``. Os pools OpenMP/BLAS do
+processo são limitados a ``batch_threads`` via threadpoolctl.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List
+
+from joblib import parallel_config
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+except ImportError:  # pragma: no cover - depende do ambiente
+    threadpool_info = None
+    threadpool_limits = None
+
+logger = logging.getLogger(__name__)
+
+# Abaixo deste número de linhas a chamada usa ``single_threads``.
+DEFAULT_BATCH_MIN_ROWS = 64
+
+
+def available_cpus() -> int:
+    """Cores utilizáveis por este processo (respeita a afinidade de CPU)."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:  # pragma: no cover - plataformas sem sched_getaffinity
+        return os.cpu_count() or 1
+
+
+def _estimators(obj: Any) -> List[Any]:
+    """Estimadores contidos em ``obj`` (pipelines e meta-estimadores incluídos)."""
+    found = [obj]
+    for _, step in getattr(obj, "steps", None) or []:
+        found.extend(_estimators(step))
+    for attribute in ("estimator", "base_estimator", "final_estimator"):
+        nested = getattr(obj, attribute, None)
+        if nested is not None and hasattr(nested, "get_params"):
+            found.extend(_estimators(nested))
+    return found
+
+
+class ThreadPolicy:
+    """Número de threads por chamada ao modelo, calculado a partir dos cores e dos workers."""
+
+    def __init__(
+        self,
+        uvicorn_workers: int = 1,
+        concurrency: int = 1,
+        single_threads: int | None = None,
+        batch_threads: int | None = None,
+        batch_min_rows: int = DEFAULT_BATCH_MIN_ROWS,
+        cpus: int | None = None,
+    ) -> None:
+        self.cpus = cpus or available_cpus()
+        self.uvicorn_workers = max(uvicorn_workers, 1)
+        self.concurrency = max(concurrency, 1)
+        budget = max(1, self.cpus // (self.uvicorn_workers * self.concurrency))
+        self.single_threads = single_threads or 1
+        self.batch_threads = batch_threads or budget
+        self.batch_min_rows = batch_min_rows
+        self.estimator_n_jobs: Dict[str, Any] = {}
+
+    def threads_for(self, n_rows: int) -> int:
+        return self.single_threads if n_rows < self.batch_min_rows else self.batch_threads
+
+    def context(self, n_rows: int):
+        """Contexto joblib (thread-local) para uma chamada sklearn com ``n_rows`` linhas."""
+        return parallel_config(n_jobs=self.threads_for(n_rows))
+
+    def apply(self, model: Any) -> None:
+        """Ajusta o ``n_jobs`` dos estimadores de ``model`` e limita os pools nativos."""
+        self.estimator_n_jobs = {}
+        for estimator in _estimators(model):
+            try:
+                params = estimator.get_params(deep=False)
+            except Exception:  # pylint: disable=broad-except
+                continue
+            if "n_jobs" not in params:
+                continue
+            name = type(estimator).__name__
+            if hasattr(estimator, "get_booster"):
+                # XGBoost usa o seu próprio pool OpenMP e ignora o joblib.
+                estimator.set_params(n_jobs=self.batch_threads)
+            else:
+                estimator.set_params(n_jobs=None)
+            self.estimator_n_jobs[name] = estimator.get_params(deep=False)["n_jobs"]
+        self.limit_native_threads()
+        logger.info(
+            "Política de threads: %d cores, %d workers x %d chamadas, single=%d, batch=%d",
+            self.cpus, self.uvicorn_workers, self.concurrency,
+            self.single_threads, self.batch_threads,
+        )
+
+    def limit_native_threads(self) -> None:
+        """Limita os pools OpenMP/BLAS deste processo (chamar também em cada worker)."""
+        if threadpool_limits is None:
+            logger.warning("threadpoolctl não instalado: pools OpenMP/BLAS sem limite")
+            return
+        threadpool_limits(limits=self.batch_threads)
+
+    def describe(self) -> Dict[str, Any]:
+        """Configuração efectiva, exposta em ``/model/info``."""
+        native = []
+        if threadpool_info is not None:
+            native = [
+                {
+                    "user_api": pool.get("user_api"),
+                    "internal_api": pool.get("internal_api"),
+                    "num_threads": pool.get("num_threads"),
+                }
+                for pool in threadpool_info()
+            ]
+        return {
+            "cpus": self.cpus,
+            "uvicorn_workers": self.uvicorn_workers,
+            "inference_concurrency": self.concurrency,
+            "single_threads": self.single_threads,
+            "batch_threads": self.batch_threads,
+            "batch_min_rows": self.batch_min_rows,
+            "estimator_n_jobs": dict(self.estimator_n_jobs),
+            "native_pools": native,
+        }
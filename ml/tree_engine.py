@@ -0,0 +1,621 @@
+"""
+Motor de inferência compilado para ensembles de árvores.
+
+Converte um ``RandomForestClassifier`` (ou ``ExtraTreesClassifier``) do
+scikit-learn, ou um ``XGBClassifier``, em arrays NumPy planos (feature,
+threshold, filhos e valor das folhas) e avalia todas as árvores de um lote
+de linhas com uma travessia vectorizada nível a nível, sem passar pelas
+verificações de entrada nem pelo despacho joblib do ``predict_proba``.
+
+Uso via linha de comandos (compila e grava ao lado do artefacto)::
+
+    python -m ml.tree_engine models/latest/model.pkl
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tolerância absoluta aceite entre o motor compilado e o predict_proba original.
+PARITY_ATOL = 1e-5
+# Número máximo de linhas avaliadas de uma vez (limita a memória intermédia).
+ROW_CHUNK_SIZE = 1024
+# Árvores avaliadas entre verificações de paragem antecipada.
+DEFAULT_TREE_CHUNK = 16
+COMPILED_SUFFIX = ".compiled.npz"
+FORMAT_VERSION = 1
+
+_SUPPORTED_XGB_OBJECTIVES = {"multi:softprob", "multi:softmax", "binary:logistic"}
+
+
+class CompiledForest:
+    """
+    Ensemble de árvores compilado em arrays planos.
+
+    Todas as árvores partilham os mesmos arrays de nós; ``roots`` indica o nó
+    raiz de cada árvore. As folhas apontam para si próprias, de modo que a
+    travessia pode correr ``max_depth`` níveis sem testar se o nó é folha.
+    """
+
+    def __init__(
+        self,
+        *,
+        kind: str,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        tree_column: np.ndarray,
+        max_depth: int,
+        classes: np.ndarray,
+        n_features: int,
+        objective: str = "",
+        base_margin: float = 0.0,
+        source_sha256: str = "",
+    ) -> None:
+        self.kind = kind
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.tree_column = np.ascontiguousarray(tree_column, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.classes = np.asarray(classes)
+        self.n_features = int(n_features)
+        self.objective = objective
+        self.base_margin = float(base_margin)
+        self.source_sha256 = source_sha256
+
+        # Estruturas derivadas para a travessia: filhos intercalados (direita, esquerda),
+        # de modo que o próximo nó é children[2 * nó + vai_para_esquerda].
+        self._children = np.stack([self.right, self.left], axis=1).ravel().astype(np.intp)
+        self._feature = self.feature.astype(np.intp)
+        self._roots = self.roots.astype(np.intp)
+        if self.kind == "xgboost":
+            # Cada folha XGBoost contribui para uma única coluna: acumula-se o valor
+            # escalar e agrega-se por coluna com uma multiplicação de matrizes.
+            self._leaf_scalar = self.value.sum(axis=1)
+            self._tree_onehot = np.zeros((self.n_trees, self.value.shape[1]), dtype=np.float64)
+            self._tree_onehot[np.arange(self.n_trees), self.tree_column] = 1.0
+        else:
+            self._value_columns = [
+                np.ascontiguousarray(self.value[:, column]) for column in range(self.value.shape[1])
+            ]
+        self._suffix_max, self._suffix_min, self._first_exit = self._leaf_bounds()
+
+    @property
+    def n_trees(self) -> int:
+        return int(self.roots.shape[0])
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.feature.shape[0])
+
+    @property
+    def first_exit(self) -> int:
+        """Número mínimo de árvores antes de qualquer linha poder parar antecipadamente."""
+        return self._first_exit
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays compilados, em bytes."""
+        arrays = (
+            self.feature, self.threshold, self.left, self.right,
+            self.default_left, self.value, self.roots, self.tree_column,
+        )
+        return int(sum(array.nbytes for array in arrays))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Calcula as probabilidades por classe, como o ``predict_proba`` original."""
+        return self.scores_to_proba(self.raw_scores(X), self.n_trees)
+
+    def predict_proba_early(
+        self,
+        X: np.ndarray,
+        tree_chunk: int = DEFAULT_TREE_CHUNK,
+        deadline: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Avalia as árvores em blocos de ``tree_chunk`` e pára cada linha logo que
+        a classe líder já não pode ser ultrapassada pelas árvores restantes.
+
+        O limite usa, por classe, a soma dos valores máximo e mínimo das folhas
+        das árvores que faltam; a classe prevista é por isso sempre a do
+        ensemble completo. Com ``deadline`` (``time.perf_counter()``) as linhas
+        ainda indecisas param quando o tempo acaba, com a classe líder parcial.
+
+        Devolve ``(probabilidades, árvores usadas por linha)``.
+        """
+        X = self._prepare_input(X)
+        tree_chunk = max(int(tree_chunk), 1)
+        scores = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        trees_used = np.zeros(X.shape[0], dtype=np.int64)
+        active = np.arange(X.shape[0])
+        start = 0
+        while active.size and start < self.n_trees:
+            # Antes de ``_first_exit`` árvores nenhuma linha pode parar: avalia-as de uma vez.
+            stop = min(max(start + tree_chunk, self._first_exit), self.n_trees)
+            leaves = self._leaf_indices(X[active], self._roots[start:stop])
+            scores[active] += self._accumulate(leaves, start, stop)
+            trees_used[active] = stop
+            start = stop
+            if start >= self.n_trees:
+                break
+            active = active[~self._decided(scores[active], start)]
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.scores_to_proba(scores, trees_used), trees_used
+
+    def _decided(self, scores: np.ndarray, next_tree: int) -> np.ndarray:
+        """Linhas cuja classe final já está garantida após ``next_tree`` árvores."""
+        upper = scores + self._suffix_max[next_tree]
+        lower = scores + self._suffix_min[next_tree]
+        if scores.shape[1] == 1:
+            # binary:logistic: basta que o sinal da margem já não possa mudar.
+            return (lower[:, 0] + self.base_margin > 0) | (upper[:, 0] + self.base_margin < 0)
+        rows = np.arange(scores.shape[0])
+        leader = scores.argmax(axis=1)
+        leader_lower = lower[rows, leader]
+        upper[rows, leader] = -np.inf
+        return leader_lower > upper.max(axis=1)
+
+    def _leaf_bounds(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Somas (das árvores ``t`` em diante) dos valores máximo/mínimo de folha por
+        classe e o primeiro ``t`` em que alguma linha pode, em teoria, parar.
+        """
+        leaf_nodes = np.flatnonzero(self.left == np.arange(self.n_nodes))
+        leaf_tree = np.searchsorted(self.roots, leaf_nodes, side="right") - 1
+        n_outputs = self.value.shape[1]
+        tree_max = np.full((self.n_trees, n_outputs), -np.inf)
+        tree_min = np.full((self.n_trees, n_outputs), np.inf)
+        np.maximum.at(tree_max, leaf_tree, self.value[leaf_nodes])
+        np.minimum.at(tree_min, leaf_tree, self.value[leaf_nodes])
+        if self.kind == "xgboost":
+            # Cada árvore só contribui para a sua coluna; as outras ficam a zero.
+            other = np.ones_like(tree_max, dtype=bool)
+            other[np.arange(self.n_trees), self.tree_column] = False
+            tree_max[other] = 0.0
+            tree_min[other] = 0.0
+        suffix_max = np.zeros((self.n_trees + 1, n_outputs))
+        suffix_min = np.zeros((self.n_trees + 1, n_outputs))
+        suffix_max[:-1] = np.cumsum(tree_max[::-1], axis=0)[::-1]
+        suffix_min[:-1] = np.cumsum(tree_min[::-1], axis=0)[::-1]
+        prefix_max = suffix_max[0] - suffix_max
+        prefix_min = suffix_min[0] - suffix_min
+
+        if n_outputs == 1:
+            possible = (prefix_max[:, 0] + suffix_min[:, 0] + self.base_margin > 0) | (
+                prefix_min[:, 0] + suffix_max[:, 0] + self.base_margin < 0
+            )
+        else:
+            # Maior vantagem possível de a sobre b após t árvores, contra o pior caso restante.
+            best_lead = (prefix_max + suffix_min)[:, :, None] - (prefix_min + suffix_max)[:, None, :]
+            best_lead[:, np.arange(n_outputs), np.arange(n_outputs)] = -np.inf
+            possible = (best_lead > 0).any(axis=(1, 2))
+        first_exit = int(np.argmax(possible)) if possible.any() else self.n_trees
+        return suffix_max, suffix_min, first_exit
+
+    def raw_scores(self, X: np.ndarray, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Soma os valores das folhas das árvores ``[start:stop]`` para cada linha.
+
+        Para florestas aleatórias devolve a soma das distribuições de classe;
+        para XGBoost devolve a soma das margens (sem ``base_margin``).
+        """
+        X = self._prepare_input(X)
+        scores = np.empty((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for row_start in range(0, X.shape[0], ROW_CHUNK_SIZE):
+            chunk = X[row_start:row_start + ROW_CHUNK_SIZE]
+            leaves = self._leaf_indices(chunk, self._roots[start:stop])
+            scores[row_start:row_start + chunk.shape[0]] = self._accumulate(leaves, start, stop)
+        return scores
+
+    def _accumulate(self, leaves: np.ndarray, start: int, stop: Optional[int]) -> np.ndarray:
+        if self.kind == "xgboost":
+            return self._leaf_scalar[leaves] @ self._tree_onehot[start:stop]
+        return np.stack(
+            [column[leaves].sum(axis=1) for column in self._value_columns], axis=1
+        )
+
+    def scores_to_proba(self, scores: np.ndarray, n_trees_used: int | np.ndarray) -> np.ndarray:
+        """Converte somas de folhas (de ``n_trees_used`` árvores, global ou por linha) em probabilidades."""
+        if self.kind == "random_forest":
+            used = np.maximum(np.asarray(n_trees_used, dtype=np.float64), 1.0)
+            return scores / (used[:, None] if used.ndim else used)
+
+        margin = scores + self.base_margin
+        if self.objective == "binary:logistic":
+            positive = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        margin = margin - margin.max(axis=1, keepdims=True)
+        exp_margin = np.exp(margin)
+        return exp_margin / exp_margin.sum(axis=1, keepdims=True)
+
+    def _prepare_input(self, X: np.ndarray) -> np.ndarray:
+        # As árvores comparam valores float32 (sklearn e XGBoost fazem o mesmo).
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Número de features inválido: esperado {self.n_features}, recebido {X.shape[1]}"
+            )
+        return X
+
+    def _leaf_indices(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        """Travessia vectorizada nível a nível: devolve (linhas x árvores) índices de folha."""
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+        node = np.broadcast_to(roots, (n_rows, roots.shape[0])).copy()
+        has_missing = bool(np.isnan(flat_X).any())
+        for _ in range(self.max_depth):
+            values = flat_X[row_offset + self._feature[node]]
+            go_left = values <= self.threshold[node]
+            if has_missing:
+                go_left = np.where(np.isnan(values), self.default_left[node], go_left)
+            node = self._children[2 * node + go_left]
+        return node
+
+    def save(self, path: str | Path) -> Path:
+        """
+        Grava os arrays compilados num ficheiro ``.npz`` (sem pickle).
+
+        Escreve num temporário na mesma pasta e troca-o com ``os.replace``: com
+        ``uvicorn --workers N`` vários workers compilam o mesmo artefacto e
+        nenhum pode ler um ficheiro a meio da escrita.
+        """
+        target = Path(path)
+        if target.suffix != ".npz":
+            target = target.with_name(target.name + ".npz")
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("wb") as handle:
+                self._write_npz(handle)
+            os.replace(tmp_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return target
+
+    def _write_npz(self, handle) -> None:
+        np.savez(
+            handle,
+            format_version=np.array(FORMAT_VERSION),
+            kind=np.array(self.kind),
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            tree_column=self.tree_column,
+            max_depth=np.array(self.max_depth),
+            classes=self.classes,
+            n_features=np.array(self.n_features),
+            objective=np.array(self.objective),
+            base_margin=np.array(self.base_margin),
+            source_sha256=np.array(self.source_sha256),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompiledForest":
+        """Carrega um ensemble compilado gravado com :meth:`save`."""
+        with np.load(Path(path), allow_pickle=False) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"Formato compilado incompatível em {path}")
+            return cls(
+                kind=str(data["kind"]),
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                default_left=data["default_left"],
+                value=data["value"],
+                roots=data["roots"],
+                tree_column=data["tree_column"],
+                max_depth=int(data["max_depth"]),
+                classes=data["classes"],
+                n_features=int(data["n_features"]),
+                objective=str(data["objective"]),
+                base_margin=float(data["base_margin"]),
+                source_sha256=str(data["source_sha256"]),
+            )
+
+
+def compile_estimator(estimator: Any, source_sha256: str = "") -> Optional[CompiledForest]:
+    """
+    Compila um estimador suportado. Devolve ``None`` para estimadores não suportados
+    (pipelines, modelos lineares, etc.), que continuam a usar ``predict_proba``.
+    """
+    if hasattr(estimator, "get_booster"):
+        return _compile_xgboost(estimator, source_sha256)
+    estimators = getattr(estimator, "estimators_", None)
+    if estimators is not None and all(hasattr(tree, "tree_") for tree in estimators):
+        if getattr(estimator, "n_outputs_", 1) != 1:
+            return None
+        return _compile_sklearn_forest(estimator, source_sha256)
+    return None
+
+
+def _compile_sklearn_forest(estimator: Any, source_sha256: str) -> CompiledForest:
+    n_classes = len(estimator.classes_)
+    features: List[np.ndarray] = []
+    thresholds: List[np.ndarray] = []
+    lefts: List[np.ndarray] = []
+    rights: List[np.ndarray] = []
+    defaults: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    roots: List[int] = []
+    offset = 0
+    max_depth = 0
+
+    for tree_estimator in estimator.estimators_:
+        tree = tree_estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # sklearn: vai para a esquerda quando X[feature] <= threshold.
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        missing_left = getattr(tree, "missing_go_to_left", None)
+        defaults.append(
+            np.where(is_leaf, True, missing_left.astype(bool))
+            if missing_left is not None
+            else np.ones(tree.node_count, dtype=bool)
+        )
+        leaf_values = tree.value[:, 0, :n_classes].astype(np.float64)
+        totals = leaf_values.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values.append(leaf_values / totals)
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    return CompiledForest(
+        kind="random_forest",
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        default_left=np.concatenate(defaults),
+        value=np.concatenate(values),
+        roots=np.asarray(roots),
+        tree_column=np.zeros(len(roots)),
+        max_depth=max_depth,
+        classes=np.asarray(estimator.classes_),
+        n_features=int(estimator.n_features_in_),
+        source_sha256=source_sha256,
+    )
+
+
+def _compile_xgboost(estimator: Any, source_sha256: str) -> Optional[CompiledForest]:
+    booster = estimator.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective not in _SUPPORTED_XGB_OBJECTIVES:
+        logger.info("Objectivo XGBoost não suportado pelo motor compilado: %s", objective)
+        return None
+
+    model_param = config["learner"]["learner_model_param"]
+    n_classes = max(int(model_param.get("num_class", "0")), 1)
+    n_features = int(model_param["num_feature"])
+    base_score = float(model_param.get("base_score", "0.5"))
+    feature_names = booster.feature_names or [f"f{index}" for index in range(n_features)]
+    feature_index = {name: index for index, name in enumerate(feature_names)}
+
+    parallel_trees = max(int(config["learner"]["gradient_booster"].get("gbtree_model_param", {}).get("num_parallel_tree", "1")), 1)
+
+    if objective == "binary:logistic":
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+        output_columns = 1
+    else:
+        # O softmax é invariante a uma constante comum: base_score não altera o resultado.
+        base_margin = base_score
+        output_columns = n_classes
+
+    features: List[int] = []
+    thresholds: List[float] = []
+    lefts: List[int] = []
+    rights: List[int] = []
+    defaults: List[bool] = []
+    leaf_rows: List[tuple] = []
+    roots: List[int] = []
+    tree_columns: List[int] = []
+    max_depth = 0
+
+    for tree_index, dump in enumerate(booster.get_dump(dump_format="json")):
+        tree = json.loads(dump)
+        # Ordem do XGBoost: por ronda, por classe, por árvore paralela.
+        target_column = (tree_index // parallel_trees) % output_columns
+        offset = len(features)
+        nodes: Dict[int, Dict[str, Any]] = {}
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            nodes[node["nodeid"]] = node
+            max_depth = max(max_depth, depth)
+            for child in node.get("children", []):
+                stack.append((child, depth + 1))
+
+        # Renumera os nós de forma contígua para esta árvore.
+        local_ids = {node_id: offset + position for position, node_id in enumerate(sorted(nodes))}
+        for node_id in sorted(nodes):
+            node = nodes[node_id]
+            global_id = local_ids[node_id]
+            if "leaf" in node:
+                features.append(0)
+                thresholds.append(np.inf)
+                lefts.append(global_id)
+                rights.append(global_id)
+                defaults.append(True)
+                leaf_rows.append((global_id, target_column, float(node["leaf"])))
+                continue
+            split = node["split"]
+            features.append(feature_index[split] if split in feature_index else int(split.lstrip("f")))
+            # XGBoost vai para "yes" quando x < split (em float32); equivalente a
+            # x <= maior float32 inferior ao limiar.
+            threshold32 = np.float32(node["split_condition"])
+            thresholds.append(float(np.nextafter(threshold32, np.float32(-np.inf))))
+            lefts.append(local_ids[node["yes"]])
+            rights.append(local_ids[node["no"]])
+            defaults.append(node.get("missing") == node["yes"])
+        roots.append(local_ids[tree["nodeid"]])
+        tree_columns.append(target_column)
+
+    value = np.zeros((len(features), output_columns), dtype=np.float64)
+    for global_id, column, leaf_value in leaf_rows:
+        value[global_id, column] = leaf_value
+
+    classes = getattr(estimator, "classes_", None)
+    if classes is None:
+        classes = np.arange(max(n_classes, 2))
+
+    return CompiledForest(
+        kind="xgboost",
+        feature=np.asarray(features),
+        threshold=np.asarray(thresholds),
+        left=np.asarray(lefts),
+        right=np.asarray(rights),
+        default_left=np.asarray(defaults),
+        value=value,
+        roots=np.asarray(roots),
+        tree_column=np.asarray(tree_columns),
+        max_depth=max_depth,
+        classes=np.asarray(classes),
+        n_features=n_features,
+        objective=objective,
+        base_margin=base_margin,
+        source_sha256=source_sha256,
+    )
+
+
+def compiled_path_for(artifact_path: str | Path) -> Path:
+    """Caminho do ficheiro compilado gravado ao lado do artefacto."""
+    artifact = Path(artifact_path)
+    return artifact.with_name(artifact.stem + COMPILED_SUFFIX)
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def smoke_matrix(forest: CompiledForest, rows: int = 64, seed: int = 0) -> np.ndarray:
+    """Gera linhas em torno dos limiares do ensemble, para exercitar vários ramos."""
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((rows, forest.n_features), dtype=np.float64)
+    is_split = np.isfinite(forest.threshold)
+    for feature in range(forest.n_features):
+        candidates = forest.threshold[is_split & (forest.feature == feature)]
+        if candidates.size:
+            picks = rng.choice(candidates, size=rows)
+            matrix[:, feature] = picks * rng.uniform(0.9, 1.1, size=rows)
+    return matrix
+
+
+def verify_parity(forest: CompiledForest, estimator: Any, X: Optional[np.ndarray] = None) -> float:
+    """Devolve o maior desvio absoluto entre o motor compilado e ``predict_proba``."""
+    if X is None:
+        X = smoke_matrix(forest)
+    expected = np.asarray(estimator.predict_proba(X), dtype=np.float64)
+    actual = forest.predict_proba(X)
+    if expected.shape != actual.shape:
+        return float("inf")
+    return float(np.abs(expected - actual).max())
+
+
+def load_or_compile(
+    estimator: Any,
+    artifact_path: str | Path | None = None,
+    source_sha256: str | None = None,
+) -> Optional[CompiledForest]:
+    """
+    Obtém o ensemble compilado do estimador.
+
+    Reutiliza o ``.compiled.npz`` ao lado do artefacto quando o checksum coincide;
+    caso contrário compila, valida contra ``predict_proba`` e tenta gravar o resultado.
+    Devolve ``None`` se o estimador não for suportado ou a validação falhar.
+    ``source_sha256`` evita recalcular o checksum quando já é conhecido (manifesto).
+    """
+    compiled_path = None
+    if artifact_path is not None and Path(artifact_path).exists():
+        source_sha256 = source_sha256 or file_sha256(artifact_path)
+        compiled_path = compiled_path_for(artifact_path)
+        if compiled_path.exists():
+            try:
+                forest = CompiledForest.load(compiled_path)
+                if forest.source_sha256 == source_sha256:
+                    logger.info("Motor compilado carregado de %s", compiled_path)
+                    return forest
+                logger.info("Motor compilado desactualizado em %s, a recompilar", compiled_path)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Falha ao carregar motor compilado de %s: %s", compiled_path, exc)
+
+    forest = compile_estimator(estimator, source_sha256 or "")
+    if forest is None:
+        return None
+
+    deviation = verify_parity(forest, estimator)
+    if not deviation <= PARITY_ATOL:
+        logger.warning(
+            "Motor compilado diverge do predict_proba (desvio máximo %.3g); a usar o estimador original",
+            deviation,
+        )
+        return None
+
+    if compiled_path is not None:
+        try:
+            forest.save(compiled_path)
+            logger.info("Motor compilado gravado em %s", compiled_path)
+        except OSError as exc:
+            logger.warning("Não foi possível gravar o motor compilado em %s: %s", compiled_path, exc)
+    return forest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compila um artefacto de ensemble de árvores.")
+    parser.add_argument("artifact", help="Caminho do artefacto .pkl (estimador ou dicionário com 'model')")
+    args = parser.parse_args(argv)
+
+    from ml.model_loader import load_model  # pylint: disable=import-outside-toplevel
+
+    loaded, resolved_path = load_model(args.artifact)
+    estimator = loaded.get("model") if isinstance(loaded, dict) else loaded
+    forest = load_or_compile(estimator, resolved_path)
+    if forest is None:
+        print(f"Estimador {type(estimator).__name__} não suportado ou sem paridade")
+        return 1
+    print(
+        f"{forest.kind}: {forest.n_trees} árvores, {forest.n_nodes} nós, "
+        f"profundidade {forest.max_depth}, {forest.nbytes / 1024:.1f} KiB -> "
+        f"{compiled_path_for(resolved_path)}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,6 +8,8 @@ from fastapi.testclient import TestClient
 
 # Configura variáveis antes de carregar módulos da aplicação
 os.environ.setdefault("API_KEY", "test-api-key")
+# Os registos são escritos por uma thread própria, fora da captura do pytest
+os.environ.setdefault("LOG_LEVEL", "WARNING")
 # Força uso de caminhos absolutos para o registry e metadata durante os testes
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 os.environ.setdefault("MODEL_REGISTRY_PATH", str(PROJECT_ROOT / "models" / "latest" / "sustainability_classification_pipeline.pkl"))
@@ -102,3 +104,22 @@ def client(api_key: str) -> Generator[TestClient, None, None]:
     with TestClient(app) as test_client:
         yield test_client
 
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--perf", action="store_true", default=False, help="Corre os testes de regressão de desempenho (marcador perf)"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: controlo de regressões de desempenho (só corre com --perf)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--perf"):
+        return
+    skip_perf = pytest.mark.skip(reason="teste de desempenho: use --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
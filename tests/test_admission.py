@@ -0,0 +1,103 @@
+import asyncio
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+import app.main as app_main
+from app.admission import AdmissionController, AdmissionRejectedError, Deadline, DeadlineExceededError
+from app.batching import MicroBatcher
+from app.executor import InferenceExecutor
+from app.schemas import PredictionInput
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict_matrix(self, matrix):
+        self.calls += 1
+        return [sum(row) for row in matrix]
+
+
+def _expired() -> Deadline:
+    return Deadline(0.0, started_at=0.0)
+
+
+def test_admission_controller_rejects_above_limit():
+    controller = AdmissionController(max_in_flight=2)
+    controller.acquire()
+    controller.acquire()
+    with pytest.raises(AdmissionRejectedError):
+        controller.acquire()
+    controller.release()
+    controller.acquire()
+    assert controller.in_flight == 2
+
+
+def test_deadline_uses_header_or_default():
+    assert Deadline.from_timeout_ms(None, None).remaining() is None
+    assert Deadline.from_timeout_ms(None, 1000).remaining() == pytest.approx(1.0, abs=0.05)
+    assert Deadline.from_timeout_ms(50, 1000).remaining() == pytest.approx(0.05, abs=0.05)
+    assert _expired().expired()
+
+
+def test_executor_drops_expired_deadline_before_inference():
+    executor = InferenceExecutor(mode="thread", max_workers=1, max_queue=0)
+    model = _CountingModel()
+
+    async def scenario():
+        with pytest.raises(DeadlineExceededError):
+            await executor.call(model, "predict_matrix", [[1, 2]], deadline=_expired())
+        return await executor.call(model, "predict_matrix", [[1, 2]], deadline=Deadline(5.0))
+
+    try:
+        assert asyncio.run(scenario()) == [3]
+    finally:
+        executor.shutdown()
+    assert model.calls == 1
+
+
+def test_batcher_removes_expired_rows_from_batch():
+    batch_sizes = []
+
+    def scorer(matrix):
+        batch_sizes.append(len(matrix))
+        return [{"sum": float(row.sum())} for row in matrix]
+
+    batcher = MicroBatcher(scorer, window_ms=20, max_batch_size=8)
+
+    async def scenario():
+        results = await asyncio.gather(
+            batcher.submit(np.ones(2), deadline=Deadline(5.0)),
+            batcher.submit(np.ones(2), deadline=_expired()),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return results
+
+    fresh, expired = asyncio.run(scenario())
+    assert fresh == {"sum": 2.0}
+    assert isinstance(expired, DeadlineExceededError)
+    assert batch_sizes == [1]
+
+
+def test_predict_returns_429_when_admission_is_full(client, api_key, monkeypatch):
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    monkeypatch.setattr(app_main.admission, "max_in_flight", 0)
+    response = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert app_main.admission.in_flight == 0
+
+
+def test_predict_returns_504_when_deadline_expired(client, api_key, monkeypatch):
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    monkeypatch.setattr(app_main, "prediction_cache", None)
+    monkeypatch.setattr(app_main.Deadline, "from_timeout_ms", classmethod(lambda cls, *_: _expired()))
+    response = client.post(
+        "/predict", json=payload, headers={"X-API-KEY": api_key, "X-Request-Timeout-Ms": "1"}
+    )
+    assert response.status_code == 504
+    batch = client.post("/predict/batch", json={"items": [payload]}, headers={"X-API-KEY": api_key})
+    assert batch.status_code == 504
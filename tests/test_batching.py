@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def _row_sum_scorer(batch_sizes):
+    def score(matrix):
+        batch_sizes.append(matrix.shape[0])
+        return [{"total": float(row.sum())} for row in matrix]
+
+    return score
+
+
+def test_concurrent_requests_are_coalesced():
+    batch_sizes = []
+    batcher = MicroBatcher(_row_sum_scorer(batch_sizes), window_ms=50, max_batch_size=4)
+
+    async def scenario():
+        rows = [np.full(3, float(index)) for index in range(10)]
+        results = await asyncio.gather(*(batcher.submit(row) for row in rows))
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [result["total"] for result in results] == [3.0 * index for index in range(10)]
+    assert sum(batch_sizes) == 10
+    assert max(batch_sizes) <= 4
+    assert len(batch_sizes) < 10
+
+
+def test_window_zero_scores_without_waiting():
+    batch_sizes = []
+    batcher = MicroBatcher(_row_sum_scorer(batch_sizes), window_ms=0, max_batch_size=8)
+
+    async def scenario():
+        result = await batcher.submit(np.ones(2))
+        await batcher.close()
+        return result
+
+    assert asyncio.run(scenario()) == {"total": 2.0}
+    assert batch_sizes == [1]
+
+
+def test_scoring_errors_propagate_to_every_request():
+    def failing(matrix):
+        raise ValueError("falha no modelo")
+
+    batcher = MicroBatcher(failing, window_ms=10, max_batch_size=4)
+
+    async def scenario():
+        results = await asyncio.gather(
+            batcher.submit(np.ones(2)), batcher.submit(np.ones(2)), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_close_with_drain_scores_queued_requests():
+    batch_sizes = []
+    batcher = MicroBatcher(_row_sum_scorer(batch_sizes), window_ms=1000, max_batch_size=8)
+
+    async def scenario():
+        pending = [asyncio.ensure_future(batcher.submit(np.full(2, 1.0))) for _ in range(3)]
+        await asyncio.sleep(0)
+        await batcher.close(drain=True)
+        return await asyncio.gather(*pending)
+
+    started = time.perf_counter()
+    assert asyncio.run(scenario()) == [{"total": 2.0}] * 3
+    assert time.perf_counter() - started < 0.5
+    assert batch_sizes == [3]
+
+
+def test_invalid_max_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda matrix: [], max_batch_size=0)
+
+
+def test_predict_endpoint_through_batcher(client, api_key, monkeypatch):
+    import app.main as app_main
+    from app.schemas import PredictionInput
+
+    payload = PredictionInput.model_config["json_schema_extra"]["example"]
+    direct = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+
+    monkeypatch.setattr(app_main, "batcher", MicroBatcher(app_main.model.predict_matrix, window_ms=1))
+    batched = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+
+    assert batched.status_code == 200
+    assert batched.json()["prediction"] == direct.json()["prediction"]
+    np.testing.assert_allclose(batched.json()["probabilities"], direct.json()["probabilities"])
@@ -0,0 +1,48 @@
+import json
+
+import app.main as app_main
+from benchmarks import suite
+
+
+def test_suite_reports_percentiles_and_allocations():
+    benchmarks = suite.build_benchmarks(app_main.model, batch_sizes=(1, 8), data_path=None, artifacts_dir=None)
+    names = [bench.name for bench in benchmarks]
+    assert "validation.prediction_input" in names and "model.predict_matrix[8]" in names
+    results = suite.run_suite(benchmarks, rounds=3, min_round_ms=0.1, name_filter=["predict_matrix", "serialize.full"])
+    assert [result["name"] for result in results] == [
+        "model.predict_matrix[1]", "model.predict_matrix[8]", "serialize.full",
+    ]
+    batch = results[1]
+    assert batch["rows"] == 8 and len(batch["samples_ns"]) == 3
+    assert batch["min_ns"] <= batch["p50_ns"] <= batch["p95_ns"] <= batch["p99_ns"] <= batch["max_ns"]
+    assert batch["rows_per_sec"] == 8 * batch["ops_per_sec"]
+    assert batch["alloc_peak_bytes"] > 0
+
+
+def test_failing_and_skipped_benchmarks_are_recorded():
+    def skip():
+        raise suite.SkipBenchmark("não se aplica")
+
+    results = suite.run_suite(
+        [suite.Benchmark("boom", "x", lambda: 1 / 0), suite.Benchmark("skip", "x", skip)], rounds=2
+    )
+    assert "division by zero" in results[0]["error"]
+    assert results[1]["skipped"] == "não se aplica"
+
+
+def test_main_writes_comparable_json(tmp_path):
+    output = tmp_path / "atual.json"
+    argv = [
+        "--filter", "serialize.compact", "--rounds", "3", "--min-round-ms", "0.1",
+        "--artifacts", "", "--batch-sizes", "1", "--data", "", "--output", str(output),
+    ]
+    assert suite.main(argv) == 0
+    report = json.loads(output.read_text())
+    assert report["schema"] == suite.SCHEMA_VERSION
+    assert report["environment"]["python"] and "model_version" in report["environment"]
+    assert [result["name"] for result in report["results"]] == ["serialize.compact"]
+
+    slower = json.loads(output.read_text())
+    slower["results"][0]["p50_ns"] *= 2
+    (row,) = suite.compare_results(slower, report)
+    assert row["name"] == "serialize.compact" and round(row["change"], 6) == -0.5
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from app.cache import PredictionCache
+from app.models import SustainabilityModel
+from app.utils.feature_aliases import CANONICAL_FEATURES
+
+
+def _fake_model(token=1, version="v1"):
+    return SimpleNamespace(load_token=token, model_version=version)
+
+
+def test_cache_hit_and_lru_eviction():
+    cache = PredictionCache(max_entries=2)
+    model = _fake_model()
+    rows = [np.full(3, float(index)) for index in range(3)]
+
+    cache.put(model, rows[0], {"prediction": 0})
+    cache.put(model, rows[1], {"prediction": 1})
+    assert cache.get(model, rows[0]) == {"prediction": 0}  # rows[0] passa a mais recente
+    cache.put(model, rows[2], {"prediction": 2})
+
+    assert len(cache) == 2
+    assert cache.get(model, rows[1]) is None
+    assert cache.get(model, rows[0]) == {"prediction": 0}
+    assert cache.get(model, rows[2]) == {"prediction": 2}
+
+
+def test_cache_key_includes_model_version_and_token():
+    cache = PredictionCache()
+    row = np.ones(4)
+    cache.put(_fake_model(1, "v1"), row, {"prediction": 1})
+    assert cache.get(_fake_model(1, "v2"), row) is None
+    assert cache.get(_fake_model(2, "v1"), row) is None
+    assert cache.get(_fake_model(1, "v1"), row) == {"prediction": 1}
+
+
+def test_cache_respects_byte_budget_and_ttl(monkeypatch):
+    cache = PredictionCache(max_bytes=2000, ttl_seconds=10)
+    model = _fake_model()
+    for index in range(50):
+        cache.put(model, np.full(2, float(index)), {"probabilities": [0.1] * 5})
+    assert 0 < cache.total_bytes <= 2000
+    assert len(cache) < 50
+
+    import app.cache as cache_module
+
+    now = cache_module.time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 11)
+    assert cache.get(model, np.full(2, 49.0)) is None
+
+
+def test_cache_quantization_groups_close_rows():
+    cache = PredictionCache(quantize_decimals=2)
+    model = _fake_model()
+    cache.put(model, np.array([0.123, 5.0]), {"prediction": 3})
+    assert cache.get(model, np.array([0.1231, 5.0])) == {"prediction": 3}
+    assert cache.get(model, np.array([0.13, 5.0])) is None
+
+
+def test_cache_invalidated_when_model_reloads(tmp_path):
+    artifact = tmp_path / "model.pkl"
+    X = np.random.rand(30, len(CANONICAL_FEATURES))
+    joblib.dump(LogisticRegression().fit(X, np.arange(30) % 2), artifact)
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text(json.dumps({"version": "v1"}), encoding="utf-8")
+
+    cache = PredictionCache()
+    model = SustainabilityModel()
+    model.add_reload_listener(cache.invalidate_model)
+    assert model.load(model_path=str(artifact), metadata_path=str(metadata))
+
+    row = X[0]
+    cache.put(model, row, {"prediction": 0})
+    assert cache.get(model, row) is not None
+
+    assert model.load(model_path=str(artifact), metadata_path=str(metadata))
+    assert len(cache) == 0
+    assert cache.get(model, row) is None
+
+
+def test_predict_endpoint_uses_cache(client, api_key):
+    import app.main as app_main
+    from app.schemas import PredictionInput
+    from app.utils.metrics import PREDICTION_CACHE_HITS
+
+    if app_main.prediction_cache is None:
+        return
+    payload = dict(PredictionInput.model_config["json_schema_extra"]["example"])
+    payload["rating"] = 3.21
+    first = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+    hits_before = PREDICTION_CACHE_HITS._value.get()
+    second = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+    assert first.json() == second.json()
+    assert PREDICTION_CACHE_HITS._value.get() == hits_before + 1
@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.capture import CapturedRequest, CaptureMiddleware, CaptureWriter
+from benchmarks.replay import format_report, load_capture, parse_speed, replay
+from benchmarks.loadgen import open_client
+
+
+def _captured_app(writer, sample_rate=1.0):
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict(request: Request):
+        return {"prediction": len(await request.json())}
+
+    @app.post("/predict/batch")
+    async def predict_batch(request: Request):
+        return {"rows": len((await request.json())["items"])}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    app.add_middleware(CaptureMiddleware, writer=writer, sample_rate=sample_rate)
+    return app
+
+
+def _read_lines(directory):
+    return [json.loads(line) for path in sorted(directory.glob("*.ndjson")) for line in path.read_text().splitlines()]
+
+
+def test_middleware_captures_predict_requests(tmp_path):
+    writer = CaptureWriter(tmp_path)
+    client = TestClient(_captured_app(writer))
+    raw = '{"avaliação_clientes": 4.5,  "rating": 4}'.encode("utf-8")
+    client.post(
+        "/predict",
+        content=raw,
+        headers={
+            "X-API-KEY": "segredo",
+            "Content-Type": "application/json",
+            "X-Model-Version": "v2",
+            "X-Request-Timeout-Ms": "250",
+        },
+    )
+    client.post("/predict/batch?explain=1", json={"items": [{}, {}]})
+    client.get("/health")
+    writer.shutdown()
+
+    records = _read_lines(tmp_path)
+    assert [record["path"] for record in records] == ["/predict", "/predict/batch"]
+    first, second = records
+    assert CapturedRequest.from_record(first).body == raw
+    assert first["status"] == 200 and first["latency_ms"] > 0
+    assert first["headers"] == {
+        "accept": "*/*",
+        "content-type": "application/json",
+        "x-model-version": "v2",
+        "x-request-timeout-ms": "250",
+    }
+    assert "segredo" not in json.dumps(records)
+    assert second["query"] == "explain=1" and second["ts"] >= first["ts"]
+
+
+def test_unsampled_requests_are_not_captured(tmp_path):
+    writer = CaptureWriter(tmp_path)
+    client = TestClient(_captured_app(writer, sample_rate=0.0))
+    client.post("/predict", json={"a": 1})
+    writer.shutdown()
+    assert not list(tmp_path.glob("*.ndjson"))
+
+
+def test_writer_rotates_and_keeps_max_files(tmp_path):
+    writer = CaptureWriter(tmp_path, max_file_bytes=200, max_files=2)
+    for index in range(20):
+        writer.write(CapturedRequest(index, "POST", "/predict", "", {"content-type": "application/json"}, b'{"x":1}', 200, 1.0))
+        writer.shutdown()  # um lote por pedido, para forçar a rotação
+    files = sorted(tmp_path.glob("*.ndjson"))
+    assert len(files) == 2
+    assert all(path.stat().st_size <= 200 for path in files)
+    assert [record["ts"] for record in _read_lines(tmp_path)][-1] == 19
+
+
+def test_load_capture_merges_files_by_arrival(tmp_path):
+    (tmp_path / "a.ndjson").write_text(
+        '{"ts": 3.0, "path": "/predict", "body_text": "{\\"k\\": 1}", "status": 200, "latency_ms": 1.0}\n'
+        '{"ts": 1.0, "path": "/predict/batch", "body_b64": "e30=", "status": 200, "latency_ms": 2.0}\n'
+        '{"ts": 4.0, "path": "/pred'
+    )
+    (tmp_path / "b.ndjson").write_text('{"ts": 2.0, "path": "/predict", "status": 422, "latency_ms": 0.5}\n')
+    records = load_capture([tmp_path])
+    assert [record.ts for record in records] == [1.0, 2.0, 3.0]
+    assert records[0].body == b"{}" and records[2].body == b'{"k": 1}'
+    assert [record.ts for record in load_capture([tmp_path], path_prefix="/predict/batch")] == [1.0]
+    assert parse_speed("max") is None and parse_speed("4x") == 4.0
+
+
+def test_replay_preserves_inter_arrival_times(tmp_path):
+    records = [
+        CapturedRequest(100.0 + offset, "POST", "/predict", "", {"content-type": "application/json"}, b'{"a": 1}', 200, 1.0)
+        for offset in (0.0, 0.2, 0.4)
+    ]
+    records.append(CapturedRequest(100.6, "POST", "/predict/v0", "", {"content-type": "application/json"}, b"{}", 200, 1.0))
+    app = _captured_app(CaptureWriter(tmp_path), sample_rate=0.0)
+
+    async def scenario(speed):
+        async with open_client(app=app, run_lifespan=False) as client:
+            return await replay(client, records, speed=speed)
+
+    timed = asyncio.run(scenario(2.0))
+    assert timed.sent == 4 and timed.replayed.total == 4
+    assert 0.28 <= timed.duration_s < 1.0
+    assert timed.same_status == 3 and dict(timed.status_changes) == {"200→404": 1}
+    assert len(timed.deltas_ms) == 4
+
+    fast = asyncio.run(scenario(None))
+    assert fast.duration_s < timed.duration_s and fast.replayed.total == 4
+    summary = fast.summary()
+    assert summary["speed"] == "max" and summary["latency_ms"]["p50"]["recorded"] == 1.0
+    assert "velocidade máxima" in format_report(summary)
+
+
+def test_replay_sends_captured_headers_and_raw_body():
+    seen = []
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict(request: Request):
+        seen.append((dict(request.headers), await request.body()))
+        return {"ok": True}
+
+    raw = b'{"rating":  4}'
+    headers = {"content-type": "application/json", "x-model-version": "v2", "x-request-timeout-ms": "250"}
+    records = [CapturedRequest(1.0, "POST", "/predict", "", headers, raw, 200, 1.0)]
+
+    async def scenario():
+        async with open_client(app=app, run_lifespan=False) as client:
+            return await replay(client, records, speed=None, headers={"X-API-KEY": "k"})
+
+    assert asyncio.run(scenario()).same_status == 1
+    received, body = seen[0]
+    assert body == raw
+    assert {name: received[name] for name in headers} == headers and received["x-api-key"] == "k"
@@ -0,0 +1,83 @@
+import json
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import PredictionInput
+from app.utils.decoding import (
+    JSONBodyError,
+    decode_features,
+    decode_many,
+    decode_mapping,
+    request_validation_errors,
+)
+from app.utils.feature_aliases import CANONICAL_FEATURES
+
+
+@pytest.fixture
+def example():
+    return deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def _reference_vector(payload):
+    values = PredictionInput.model_validate(payload).to_feature_dict()
+    return np.array([values[feature] for feature in CANONICAL_FEATURES], dtype=np.float32)
+
+
+def test_decode_matches_schema_order(example):
+    row = decode_features(json.dumps(example).encode())
+    assert row.dtype == np.float32
+    np.testing.assert_array_equal(row, _reference_vector(example))
+
+
+def test_decode_accepts_canonical_names(example):
+    canonical = PredictionInput.model_validate(example).to_feature_dict()
+    np.testing.assert_array_equal(decode_mapping(canonical), _reference_vector(example))
+
+
+def test_decode_falls_back_to_schema_coercion(example):
+    example["rating"] = "4.5"
+    example["eco_keyword_count"] = 4.0
+    np.testing.assert_array_equal(decode_mapping(example), _reference_vector(example))
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda payload: payload.update(rating=9.0),
+        lambda payload: payload.update(eco_keyword_count=1.5),
+        lambda payload: payload.pop("eco_value_score"),
+        lambda payload: payload.update(desconhecida=1.0),
+        lambda payload: payload.update(avaliacao_clientes=payload["avaliação_clientes"]),
+        lambda payload: payload.update(possui_selo_sustentável_encoded=True),
+    ],
+)
+def test_decode_errors_match_schema(example, mutate):
+    mutate(example)
+    try:
+        PredictionInput.model_validate(example)
+    except ValidationError as expected:
+        with pytest.raises(ValidationError) as actual:
+            decode_mapping(example)
+        assert actual.value.errors() == expected.errors()
+    else:
+        np.testing.assert_array_equal(decode_mapping(example), _reference_vector(example))
+
+
+def test_invalid_json_body_errors():
+    with pytest.raises(JSONBodyError) as exc:
+        decode_features(b"{nope")
+    errors = request_validation_errors(exc.value)
+    assert errors[0]["type"] == "json_invalid"
+    assert errors[0]["loc"] == ("body", 1)
+
+
+def test_decode_many_reports_errors_by_index(example):
+    invalid = deepcopy(example)
+    invalid["rating"] = -1
+    matrix, valid_indices, errors = decode_many([example, invalid, example])
+    assert matrix.shape == (2, len(CANONICAL_FEATURES))
+    assert valid_indices == [0, 2]
+    assert list(errors) == [1]
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.executor import ExecutorSaturatedError, InferenceExecutor
+
+
+class _SlowModel:
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+
+    def predict_matrix(self, matrix):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        time.sleep(self.delay)
+        return [sum(row) for row in matrix]
+
+
+def test_thread_executor_keeps_event_loop_responsive():
+    executor = InferenceExecutor(mode="thread", max_workers=1, max_queue=0)
+    model = _SlowModel(delay=0.2)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        result = await executor.call(model, "predict_matrix", [[1, 2], [3, 4]])
+        ticker_task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    executor.shutdown()
+    assert result == [3, 7]
+    assert ticks >= 5
+
+
+def test_executor_rejects_when_saturated():
+    gate = threading.Event()
+    executor = InferenceExecutor(mode="thread", max_workers=1, max_queue=1)
+    model = _SlowModel(gate=gate)
+
+    async def scenario():
+        first = asyncio.create_task(executor.call(model, "predict_matrix", [[1]]))
+        second = asyncio.create_task(executor.call(model, "predict_matrix", [[2]]))
+        await asyncio.sleep(0.05)
+        assert executor.pending == 2
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.call(model, "predict_matrix", [[3]])
+        gate.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [[1], [2]]
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_process_executor_uses_worker_model():
+    executor = InferenceExecutor(mode="process", max_workers=1, max_queue=4)
+    model = _SlowModel()
+    executor.start(model)
+
+    async def scenario():
+        return await executor.call(model, "predict_matrix", [[1, 1], [2, 2]])
+
+    try:
+        assert asyncio.run(scenario()) == [2, 4]
+    finally:
+        executor.shutdown()
+
+
+def test_invalid_executor_mode():
+    with pytest.raises(ValueError):
+        InferenceExecutor(mode="gpu")
@@ -0,0 +1,78 @@
+from copy import deepcopy
+
+import numpy as np
+
+import app.main as app_main
+from app import launcher
+from app.schemas import PredictionInput
+from app.utils.metrics import (
+    FEATURE_DECODE_SECONDS,
+    INFERENCE_ROWS,
+    INFERENCE_SECONDS,
+    PREDICTED_CLASSES,
+    batch_size_label,
+)
+
+
+def _sample(metric, suffix="", **labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith(suffix) and sample.labels == labels:
+                return sample.value
+    return 0.0
+
+
+def test_batch_size_labels_have_bounded_cardinality():
+    assert [batch_size_label(n) for n in (1, 2, 8, 9, 64, 65, 512, 513, 10_000)] == [
+        "1", "2-8", "2-8", "9-64", "9-64", "65-512", "65-512", "513+", "513+",
+    ]
+
+
+def test_model_records_latency_rows_and_classes():
+    model = app_main.model
+    version = model.model_version
+    row = model.build_feature_vector(PredictionInput.model_config["json_schema_extra"]["example"])
+    rows_before = _sample(INFERENCE_ROWS, "_total", model_version=version)
+    calls_before = _sample(INFERENCE_SECONDS, "_count", model_version=version, batch_size="9-64")
+
+    results = model.predict_matrix(np.tile(row, (10, 1)))
+    prediction = str(results[0]["prediction"])
+    assert _sample(INFERENCE_ROWS, "_total", model_version=version) == rows_before + 10
+    assert _sample(INFERENCE_SECONDS, "_count", model_version=version, batch_size="9-64") == calls_before + 1
+    classes_before = _sample(PREDICTED_CLASSES, "_total", model_version=version, prediction=prediction)
+
+    with model.metrics_paused():
+        model.predict_matrix(np.tile(row, (3, 1)))
+    assert _sample(INFERENCE_ROWS, "_total", model_version=version) == rows_before + 10
+    model.predict_matrix(row.reshape(1, -1))
+    assert _sample(PREDICTED_CLASSES, "_total", model_version=version, prediction=prediction) == classes_before + 1
+
+
+def test_predict_endpoint_records_decode_time(client, api_key):
+    before = _sample(FEATURE_DECODE_SECONDS, "_count", endpoint="predict", format="json")
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    assert client.post("/predict", json=payload, headers={"X-API-KEY": api_key}).status_code == 200
+    assert _sample(FEATURE_DECODE_SECONDS, "_count", endpoint="predict", format="json") == before + 1
+    assert "rihs_inference_seconds_bucket" in client.get("/metrics").text
+
+
+def test_prepare_metrics_dir_clears_stale_files(tmp_path, monkeypatch):
+    (tmp_path / "counter_1.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    path, created = launcher.prepare_metrics_dir()
+    assert path == tmp_path and not created
+    assert not list(tmp_path.glob("*.db"))
+
+    # Sem a variável e com o prometheus_client já importado o modo não pode ser activado.
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    assert launcher.prepare_metrics_dir() == (None, False)
+
+
+def test_metrics_endpoint_aggregates_multiprocess_dir(client, tmp_path, monkeypatch):
+    assert [route.path for route in app_main.app.routes].count("/metrics") == 1
+    assert "rihs_inference_seconds_bucket" in client.get("/metrics").text
+    # Pasta vazia: só o que os processos escreveram nela, não o registo deste worker.
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "rihs_inference_seconds_bucket" not in response.text
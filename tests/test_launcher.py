@@ -0,0 +1,62 @@
+import gc
+
+import app.main as app_main
+from app import launcher
+
+
+def test_preload_warms_loaded_model():
+    assert launcher.preload(app_main.model, lambda: False)
+    assert app_main.model.is_loaded()
+
+
+def test_preload_starts_degraded_when_model_fails_to_load():
+    class _Unloaded:
+        def is_loaded(self):
+            return False
+
+    attempts = []
+    assert launcher.preload(_Unloaded(), lambda: attempts.append(1) or False) is False
+    assert attempts == [1]
+
+
+def test_freeze_heap_moves_objects_to_permanent_generation():
+    try:
+        launcher.freeze_heap()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_bind_socket_is_inheritable():
+    sock = launcher.bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+        assert sock.getsockname()[1] > 0
+    finally:
+        sock.close()
+
+
+def test_thread_policy_sized_for_launcher_workers(monkeypatch):
+    original = app_main.thread_policy
+    monkeypatch.setattr(app_main, "thread_policy", original)
+    monkeypatch.setattr(app_main.model, "thread_policy", original)
+    monkeypatch.setattr(app_main.settings, "INFERENCE_THREADS_BATCH", None)
+    try:
+        launcher.size_thread_policy(app_main, 4)
+        policy = app_main.thread_policy
+        assert policy.uvicorn_workers == 4 and app_main.model.thread_policy is policy
+        assert app_main.build_model().thread_policy is policy
+        assert policy.batch_threads == max(1, policy.cpus // (4 * policy.concurrency))
+    finally:
+        original.apply(app_main.model.model)
+
+
+def test_restart_policy_backs_off_and_gives_up():
+    policy = launcher.RestartPolicy(max_restarts=4, backoff_seconds=0.5, max_backoff_seconds=2.0, stable_seconds=60.0)
+    assert [policy.next_delay(1.0) for _ in range(5)] == [0.5, 1.0, 2.0, 2.0, None]
+
+
+def test_restart_policy_resets_after_stable_worker():
+    policy = launcher.RestartPolicy(max_restarts=2, backoff_seconds=0.5, max_backoff_seconds=30.0, stable_seconds=60.0)
+    assert [policy.next_delay(1.0) for _ in range(2)] == [0.5, 1.0]
+    assert policy.next_delay(120.0) == 0.5
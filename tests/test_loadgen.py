@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from benchmarks.loadgen import (
+    LatencyHistogram,
+    load_payloads,
+    open_client,
+    run_closed_loop,
+    run_open_loop,
+)
+
+
+def test_histogram_percentiles_within_relative_error():
+    histogram = LatencyHistogram(significant_digits=2)
+    for value in range(1, 100_001):
+        histogram.record(value)
+    for percentile in (50, 95, 99, 99.9):
+        exact = percentile / 100 * 100_000
+        assert abs(histogram.percentile(percentile) - exact) / exact < 0.01
+    assert histogram.percentile(100) == histogram.max == 100_000
+    assert len(histogram.counts) < 2_000
+
+    other = LatencyHistogram()
+    other.record(250_000)
+    histogram.merge(other)
+    assert histogram.total == 100_001 and histogram.percentile(100) == 250_000
+
+
+def test_payloads_skip_rows_rejected_by_schema():
+    payloads = load_payloads("dataset_ready_for_ml.csv")
+    items = [json.loads(body) for body in payloads]
+    assert items and all(item["price_category"] <= 3 for item in items)
+    assert "avaliação_clientes" in items[0]
+
+    batches = load_payloads("dataset_ready_for_ml.csv", batch_size=4, limit=2)
+    assert len(batches) == 2 and all(len(json.loads(body)["items"]) == 4 for body in batches)
+
+
+def test_closed_and_open_loop_in_process(client, api_key):
+    payloads = load_payloads("dataset_ready_for_ml.csv", limit=8)
+
+    async def scenario():
+        # O ``client`` da sessão já correu o lifespan (modelo e executor prontos).
+        async with open_client(run_lifespan=False) as http:
+            closed = await run_closed_loop(
+                http, payloads, users=2, duration=5.0, headers={"X-API-KEY": api_key}, max_requests=20, seed=1
+            )
+            opened = await run_open_loop(http, payloads, rate=100, duration=0.1, headers={"X-API-KEY": api_key})
+            denied = await run_closed_loop(
+                http, payloads, users=1, duration=5.0, headers={"X-API-KEY": "errada"}, max_requests=3
+            )
+        return closed, opened, denied
+
+    closed, opened, denied = asyncio.run(scenario())
+    assert closed.sent == 20 and closed.ok == 20 and not closed.errors
+    assert closed.histogram.total == 20
+    summary = closed.summary()
+    assert summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99.9"] <= summary["latency_ms"]["max"]
+    assert 8 <= opened.sent <= 11 and opened.ok == opened.sent
+    assert denied.ok == 0 and set(denied.errors) == {"http_403"}
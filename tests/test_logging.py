@@ -0,0 +1,112 @@
+import io
+import json
+import logging
+import os
+import queue
+
+import pytest
+
+from app.utils.logging import (
+    DroppingQueueHandler,
+    JSONFormatter,
+    SamplingFilter,
+    parse_sample_rates,
+    setup_logging,
+    shutdown_logging,
+)
+from app.utils.metrics import LOG_RECORDS_DROPPED
+
+
+class _CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def _record(name="app.main", level=logging.INFO, msg="olá %s", args=("mundo",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_emits_structured_line():
+    try:
+        raise ValueError("falhou")
+    except ValueError:
+        record = _record(level=logging.ERROR, request_id="abc")
+        import sys
+
+        record.exc_info = sys.exc_info()
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == "olá mundo"
+    assert entry["level"] == "ERROR" and entry["logger"] == "app.main"
+    assert entry["request_id"] == "abc"
+    assert "ValueError: falhou" in entry["exc_info"]
+
+
+def test_sampling_uses_longest_prefix_and_keeps_warnings():
+    sampler = SamplingFilter(parse_sample_rates("app=1,app.main=0"))
+    before = LOG_RECORDS_DROPPED.labels(reason="sampled")._value.get()
+    assert not sampler.filter(_record("app.main"))
+    assert sampler.filter(_record("app.main", level=logging.WARNING))
+    assert sampler.filter(_record("app.models"))
+    assert sampler.filter(_record("app.mainframe"))
+    assert LOG_RECORDS_DROPPED.labels(reason="sampled")._value.get() == before + 1
+    with pytest.raises(ValueError):
+        parse_sample_rates("app=2")
+
+
+def test_full_queue_drops_without_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    before = LOG_RECORDS_DROPPED.labels(reason="queue_full")._value.get()
+    for _ in range(5):
+        handler.handle(_record())
+    assert handler.queue.qsize() == 2
+    assert LOG_RECORDS_DROPPED.labels(reason="queue_full")._value.get() == before + 3
+
+
+def test_writer_thread_formats_and_batches_writes():
+    stream = _CountingStream()
+    root = logging.getLogger()
+    previous_level = root.level
+    setup_logging(level=logging.INFO, stream=stream)
+    try:
+        log = logging.getLogger("tests.logging")
+        for index in range(200):
+            log.info("registo %d", index, extra={"index": index})
+        shutdown_logging()
+        lines = stream.getvalue().splitlines()
+        entries = [json.loads(line) for line in lines if '"tests.logging"' in line]
+        assert [entry["index"] for entry in entries] == list(range(200))
+        assert entries[-1]["message"] == "registo 199"
+        assert stream.writes < 200
+    finally:
+        setup_logging(level=previous_level)
+
+
+def test_fork_restarts_the_current_writer_without_new_hooks(monkeypatch):
+    registered = []
+    monkeypatch.setattr(os, "register_at_fork", lambda **hooks: registered.append(hooks))
+    root = logging.getLogger()
+    previous_level = root.level
+    read_fd, write_fd = os.pipe()
+    try:
+        setup_logging(level=logging.INFO, stream=io.StringIO())
+        setup_logging(level=logging.INFO, stream=os.fdopen(write_fd, "w", closefd=False))
+        assert registered == []
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - corre no processo filho
+            logging.getLogger("tests.fork").info("no filho")
+            shutdown_logging()
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd) as pipe:
+            entries = [json.loads(line) for line in pipe.read().splitlines() if '"tests.fork"' in line]
+        assert [entry["message"] for entry in entries] == ["no filho"]
+    finally:
+        setup_logging(level=previous_level)
@@ -0,0 +1,56 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.models import CLASS_LABELS, SustainabilityModel
+from app.utils.feature_aliases import CANONICAL_FEATURES
+from ml.manifest import ManifestError, load_artifact, write_manifest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+ARTIFACT = PROJECT_ROOT / "models" / "latest" / "sustainability_classification_pipeline.pkl"
+
+
+@pytest.fixture
+def manifest_dir(tmp_path):
+    target = tmp_path / "latest" / ARTIFACT.name
+    target.parent.mkdir()
+    shutil.copy(ARTIFACT, target)
+    write_manifest(
+        target, "v1", CANONICAL_FEATURES, CLASS_LABELS, metadata={"accuracy": 0.9},
+        manifest_path=tmp_path / "manifest.json",
+    )
+    return tmp_path
+
+
+def test_repository_manifest_matches_artifact():
+    estimator, version, entry, path = load_artifact(PROJECT_ROOT / "models" / "manifest.json")
+    assert path.resolve() == ARTIFACT.resolve()
+    assert entry["feature_names"] == list(CANONICAL_FEATURES)
+    assert hasattr(estimator, "predict_proba")
+
+
+def test_model_loads_from_manifest_with_relative_artifact(manifest_dir):
+    manifest = json.loads((manifest_dir / "manifest.json").read_text())
+    assert manifest["default_version"] == "v1"
+    assert manifest["versions"]["v1"]["artifact"] == f"latest/{ARTIFACT.name}"
+
+    model = SustainabilityModel(engine="sklearn")
+    assert model.load_manifest(str(manifest_dir / "manifest.json"))
+    assert model.model_version == "v1"
+    assert model.metadata["accuracy"] == 0.9
+    assert model.class_labels == CLASS_LABELS
+
+
+def test_manifest_rejects_checksum_mismatch_and_unknown_version(manifest_dir):
+    manifest_path = manifest_dir / "manifest.json"
+    with pytest.raises(ManifestError, match="não existe"):
+        load_artifact(manifest_path, version="v2")
+
+    with (manifest_dir / "latest" / ARTIFACT.name).open("ab") as artifact:
+        artifact.write(b"\0")
+    with pytest.raises(ManifestError, match="Checksum"):
+        load_artifact(manifest_path)
+    # Sem sondagem de outros ficheiros: o carregamento simplesmente falha
+    assert not SustainabilityModel(engine="sklearn").load_manifest(str(manifest_path))
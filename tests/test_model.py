@@ -72,3 +72,52 @@ def test_predict_normalizes_features(tmp_path):
     assert "prediction" in result
     assert len(result["probabilities"]) > 0
 
+
+
+def test_predict_many_returns_rows_in_order(tmp_path):
+    metadata_path = tmp_path / "metadata.json"
+    artifact_path = tmp_path / "registry" / "v3" / "model.pkl"
+
+    _create_dummy_model(artifact_path)
+    _write_metadata(metadata_path, "v3", artifact_path)
+
+    model = SustainabilityModel()
+    assert model.load(model_path=str(artifact_path), metadata_path=str(metadata_path))
+
+    payloads = [
+        {feature: float(idx + row) for idx, feature in enumerate(CANONICAL_FEATURES)}
+        for row in range(3)
+    ]
+    invalid = dict(payloads[0])
+    invalid.pop("rating")
+
+    results = model.predict_many([payloads[0], invalid, payloads[1], payloads[2]])
+    assert len(results) == 4
+    assert "error" in results[1]
+    for result, payload in zip([results[0], results[2], results[3]], payloads):
+        expected = model.predict(payload)
+        assert result["prediction"] == expected["prediction"]
+        assert np.allclose(result["probabilities"], expected["probabilities"])
+
+
+def test_predict_matrix_reports_trees_used_with_early_exit(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1, size=(60, len(CANONICAL_FEATURES)))
+    y = (X[:, 0] > 0.5).astype(int)
+    artifact_path = tmp_path / "model.pkl"
+    joblib.dump(RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y), artifact_path)
+    metadata_path = tmp_path / "metadata.json"
+    _write_metadata(metadata_path, "v-early", artifact_path)
+
+    full = SustainabilityModel()
+    early = SustainabilityModel(early_exit=True, early_exit_tree_chunk=2, early_exit_min_rows=1)
+    for model in (full, early):
+        assert model.load(model_path=str(artifact_path), metadata_path=str(metadata_path))
+
+    expected = full.predict_matrix(X)
+    results = early.predict_matrix(X)
+    assert all(result["trees_used"] == 30 for result in expected)
+    assert [r["prediction"] for r in results] == [r["prediction"] for r in expected]
+    assert min(result["trees_used"] for result in results) < 30
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from benchmarks import regression
+
+
+def _entry(commit, scale=1.0, reference=1.0, model_version="v1", **extra):
+    rng = np.random.default_rng(0)
+    samples = (rng.normal(1000.0, 10.0, 30) * scale).tolist()
+    latencies = [[int(value), 1] for value in rng.normal(5000.0, 100.0, 400) * scale]
+    entry = {
+        "commit": commit,
+        "dirty": False,
+        "model_version": model_version,
+        "profile": "quick",
+        "host": "x86_64-1cpu",
+        "benchmarks": {
+            "model.predict": {
+                "p50_ns": float(np.median(samples)),
+                "samples_ns": samples,
+                "reference_ns": [100.0 * reference] * 30,
+            }
+        },
+        "load": {
+            "closed-8": {
+                "mode": "closed",
+                "throughput_rps": 800.0 / scale,
+                "latency_ms": {
+                    "p50": float(np.percentile([bucket for bucket, _ in latencies], 50)) / 1000,
+                    "p99": float(np.percentile([bucket for bucket, _ in latencies], 99)) / 1000,
+                },
+                "histogram": {"counts": latencies},
+                "reference_ns": [100.0 * reference] * 20,
+            }
+        },
+    }
+    entry.update(extra)
+    return entry
+
+
+def _verdicts(rows):
+    return {row.name: row.verdict for row in rows}
+
+
+def test_regression_needs_change_beyond_budget_with_confidence():
+    budgets = regression.Budgets(default=0.10, tail=0.25, alpha=0.05)
+    baseline = _entry("a")
+
+    slower = _verdicts(regression.compare_entries(baseline, _entry("b", scale=1.3), budgets))
+    assert slower["model.predict"] == regression.REGRESSION
+    assert slower["loadtest.closed-8.p50"] == regression.REGRESSION
+    assert slower["loadtest.closed-8.throughput"] == regression.INCONCLUSIVE
+
+    within = _verdicts(regression.compare_entries(baseline, _entry("b", scale=1.05), budgets))
+    assert within["model.predict"] == regression.UNCHANGED
+
+    faster = _verdicts(regression.compare_entries(baseline, _entry("b", scale=0.7), budgets))
+    assert faster["model.predict"] == regression.IMPROVEMENT
+
+
+def test_machine_speed_is_discounted_by_reference_rounds():
+    budgets = regression.Budgets()
+    # Tudo 40% mais lento, incluindo o controlo: a máquina, não o código.
+    rows = regression.compare_entries(_entry("a"), _entry("b", scale=1.4, reference=1.4), budgets)
+    assert set(_verdicts(rows).values()) == {regression.UNCHANGED}
+    assert rows[0].current > rows[0].baseline * 1.3
+
+
+def test_baseline_selection_prefers_pinned_then_other_commits():
+    current = _entry("ccc")
+    history = [
+        _entry("aaa", baseline=True),
+        _entry("bbb"),
+        _entry("zzz", model_version="v2"),
+        _entry("ccc"),
+    ]
+    assert regression.select_baseline(history, current)["commit"] == "aaa"
+    assert regression.select_baseline(history[1:], current)["commit"] == "bbb"
+    assert regression.select_baseline(history, current, ref="zz")["commit"] == "zzz"
+    assert regression.select_baseline(history[2:], current) is None
+    assert regression.select_baseline(history[3:], _entry("ccc", dirty=True))["commit"] == "ccc"
+
+
+def test_budget_overrides_use_glob_patterns():
+    budgets = regression.Budgets(default=0.1, tail=0.3, overrides={"loadtest.*.p50": 0.2})
+    assert budgets.for_metric("loadtest.closed-8.p50") == 0.2
+    assert budgets.for_metric("loadtest.closed-8.p99", tail=True) == 0.3
+    assert budgets.for_metric("model.predict") == 0.1
+
+
+def test_check_exits_non_zero_on_regression(tmp_path, monkeypatch, capsys):
+    history = tmp_path / "history.jsonl"
+    runs = iter([_entry("aaa"), _entry("bbb", scale=1.5), _entry("bbb", scale=1.5, reference=1.0)])
+    monkeypatch.setattr(regression, "run_scenarios", lambda *args, **kwargs: next(runs))
+
+    assert regression.main(["record", "--baseline", "--history", str(history)]) == 0
+    assert regression.main(["check", "--history", str(history)]) == 1
+    report = capsys.readouterr().out
+    assert "model.predict" in report and regression.REGRESSION in report
+    assert [entry["commit"] for entry in regression.load_history(history)] == ["aaa", "bbb"]
+
+
+@pytest.mark.perf
+def test_no_performance_regression(client):
+    baseline, current, rows = regression.check(run_lifespan=False)
+    if baseline is None:
+        pytest.skip(f"Sem baseline comparável: execução registada em {regression.DEFAULT_HISTORY}")
+    regressions = [row for row in rows if row.verdict == regression.REGRESSION]
+    assert not regressions, regression.format_report(rows, baseline, current)
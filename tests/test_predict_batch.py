@@ -0,0 +1,82 @@
+from copy import deepcopy
+
+import pytest
+
+from app.schemas import PredictionInput
+
+
+@pytest.fixture
+def valid_payload():
+    return deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def test_predict_batch_preserves_order_and_reports_errors(client, api_key, valid_payload):
+    invalid_payload = deepcopy(valid_payload)
+    invalid_payload["rating"] = 9.0  # fora do intervalo permitido (0-5)
+
+    response = client.post(
+        "/predict/batch",
+        json={"items": [valid_payload, invalid_payload, valid_payload]},
+        headers={"X-API-KEY": api_key},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert body["succeeded"] == 2
+    assert body["failed"] == 1
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["result"]["prediction_label"]
+    assert body["results"][1]["result"] is None
+    assert "rating" in body["results"][1]["error"]
+    assert body["results"][0]["result"] == body["results"][2]["result"]
+
+
+def test_predict_batch_matches_single_predict(client, api_key, valid_payload):
+    single = client.post("/predict", json=valid_payload, headers={"X-API-KEY": api_key})
+    batch = client.post(
+        "/predict/batch",
+        json={"items": [valid_payload]},
+        headers={"X-API-KEY": api_key},
+    )
+    assert single.status_code == 200
+    assert batch.status_code == 200
+    assert batch.json()["results"][0]["result"] == single.json()
+
+
+def test_predict_batch_rejects_oversized_batch(client, api_key, valid_payload, monkeypatch):
+    from core.settings import settings
+
+    monkeypatch.setattr(settings, "PREDICT_BATCH_MAX_SIZE", 2)
+    response = client.post(
+        "/predict/batch",
+        json={"items": [valid_payload] * 3},
+        headers={"X-API-KEY": api_key},
+    )
+    assert response.status_code == 413
+
+
+def test_predict_batch_checks_size_before_validating_items(client, api_key, valid_payload, monkeypatch):
+    import app.main as app_main
+    from core.settings import settings
+
+    def fail_validation(payload):
+        raise AssertionError("o lote não devia ser validado")
+
+    monkeypatch.setattr(settings, "PREDICT_BATCH_MAX_SIZE", 2)
+    monkeypatch.setattr(app_main.BatchPredictionInput, "model_validate", fail_validation)
+    response = client.post(
+        "/predict/batch",
+        json={"items": [valid_payload] * 3},
+        headers={"X-API-KEY": api_key},
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Lote com 3 itens excede o máximo de 2"
+
+
+def test_predict_batch_requires_api_key(client, valid_payload):
+    response = client.post(
+        "/predict/batch",
+        json={"items": [valid_payload]},
+        headers={"X-API-KEY": "wrong"},
+    )
+    assert response.status_code == 403
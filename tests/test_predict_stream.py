@@ -0,0 +1,194 @@
+import asyncio
+import json
+from copy import deepcopy
+
+import pytest
+
+from app import streaming
+from app.schemas import PredictionInput
+
+
+@pytest.fixture
+def valid_payload():
+    return deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def _ndjson(*lines):
+    return "\n".join(lines).encode("utf-8") + b"\n"
+
+
+def test_predict_stream_scores_lines_in_order(client, api_key, valid_payload):
+    invalid_payload = deepcopy(valid_payload)
+    invalid_payload["rating"] = 9.0
+
+    body = _ndjson(
+        json.dumps(valid_payload),
+        "{isto não é json",
+        "",
+        json.dumps(invalid_payload),
+        json.dumps(valid_payload),
+    )
+    response = client.post(
+        "/predict/stream",
+        content=body,
+        headers={"X-API-KEY": api_key, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["line"] for record in records] == [1, 2, 4, 5]
+    assert records[0]["prediction_label"]
+    assert "JSON inválido" in records[1]["error"]
+    assert "rating" in records[2]["error"]
+    assert {k: v for k, v in records[3].items() if k != "line"} == {
+        k: v for k, v in records[0].items() if k != "line"
+    }
+
+
+def test_predict_stream_matches_single_predict(client, api_key, valid_payload):
+    single = client.post("/predict", json=valid_payload, headers={"X-API-KEY": api_key})
+    streamed = client.post(
+        "/predict/stream",
+        content=_ndjson(json.dumps(valid_payload)),
+        headers={"X-API-KEY": api_key},
+    )
+    record = json.loads(streamed.text)
+    record.pop("line")
+    assert record == single.json()
+
+
+def test_predict_stream_rejects_wrong_api_key(client):
+    response = client.post("/predict/stream", content=b"{}\n", headers={"X-API-KEY": "wrong"})
+    assert response.status_code == 403
+
+
+def _collect(byte_chunks, chunk_size=2, max_line_bytes=1024):
+    calls = []
+
+    async def score(matrix, deadline):
+        calls.append(matrix.shape[0])
+        return [{"value": float(row[0])} for row in matrix]
+
+    async def source():
+        for chunk in byte_chunks:
+            yield chunk
+
+    async def run():
+        return [
+            json.loads(line)
+            async for line in streaming.score_ndjson(source(), score, chunk_size, max_line_bytes)
+        ]
+
+    return asyncio.run(run()), calls
+
+
+def test_score_ndjson_chunks_and_split_lines(valid_payload):
+    line = json.dumps(valid_payload).encode("utf-8")
+    # Linhas partidas entre chunks de transporte e última linha sem "\n".
+    payload = line + b"\n" + line + b"\n" + line
+    pieces = [payload[i:i + 7] for i in range(0, len(payload), 7)]
+
+    records, calls = _collect(pieces, chunk_size=2)
+    assert [record["line"] for record in records] == [1, 2, 3]
+    assert calls == [2, 1]
+    assert all(record["value"] == pytest.approx(valid_payload["price_per_night_usd"]) for record in records)
+
+
+def test_score_ndjson_rejects_oversized_lines(valid_payload):
+    line = json.dumps(valid_payload).encode("utf-8")
+    records, _ = _collect([b"[" * 2048 + b"\n", line + b"\n"], max_line_bytes=len(line))
+    assert records[0] == {"line": 1, "error": f"Linha excede {len(line)} bytes"}
+    assert records[1]["line"] == 2 and "value" in records[1]
+
+
+def test_score_ndjson_flushes_error_lines_without_valid_rows(valid_payload):
+    produced = []
+    scored = []
+
+    async def score(matrix, deadline):
+        scored.append(len(matrix))
+        return [{"value": 1.0} for _ in matrix]
+
+    async def source():
+        for index in range(10):
+            produced.append(index)
+            yield _ndjson(json.dumps(valid_payload) if index == 7 else "{nope")
+
+    async def run():
+        seen = []
+        async for line in streaming.score_ndjson(source(), score, chunk_size=3):
+            seen.append((len(produced), json.loads(line)))
+        return seen
+
+    seen = asyncio.run(run())
+    assert [record["line"] for _, record in seen] == list(range(1, 11))
+    # As linhas com erro saem a cada bloco, sem esperar por linhas válidas.
+    assert seen[0][0] <= 3
+    assert all(produced_so_far - record["line"] < 3 for produced_so_far, record in seen)
+    assert "value" in seen[7][1] and all("error" in record for _, record in seen if record["line"] != 8)
+    assert scored == [1]
+
+
+def test_score_ndjson_ends_stream_when_executor_stays_saturated(monkeypatch, valid_payload):
+    from app.executor import ExecutorSaturatedError
+
+    monkeypatch.setattr(streaming, "SATURATION_BACKOFF_SECONDS", 0.0)
+    attempts = []
+
+    async def score(matrix, deadline):
+        attempts.append(deadline)
+        raise ExecutorSaturatedError("saturado")
+
+    async def source():
+        yield _ndjson(*[json.dumps(valid_payload)] * 3)
+
+    async def run():
+        return [json.loads(line) async for line in streaming.score_ndjson(source(), score, chunk_size=2)]
+
+    records = asyncio.run(run())
+    assert records == [{"line": 1, "error": "Serviço sobrecarregado: stream interrompido"}]
+    assert len(attempts) == streaming.SATURATION_RETRIES + 1
+
+
+def test_score_ndjson_starts_block_deadline_when_block_is_submitted(valid_payload):
+    from app.admission import Deadline
+
+    deadlines = []
+
+    async def score(matrix, deadline):
+        deadlines.append(deadline)
+        deadline.start_inference()
+        return [{"value": 1.0} for _ in matrix]
+
+    async def source():
+        # Upload lento: mais demorado do que o prazo do pedido.
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            yield _ndjson(json.dumps(valid_payload))
+
+    request_deadline = Deadline(0.04)
+
+    async def run():
+        return [
+            json.loads(line)
+            async for line in streaming.score_ndjson(source(), score, chunk_size=2, deadline=request_deadline)
+        ]
+
+    records = asyncio.run(run())
+    assert [record["line"] for record in records] == [1, 2, 3]
+    assert all("value" in record for record in records)
+    assert all(deadline is not request_deadline for deadline in deadlines)
+    assert [deadline.expires_at - deadline.started_at for deadline in deadlines] == pytest.approx([0.04, 0.04])
+    assert deadlines[0].started_at >= request_deadline.started_at + 0.1
+
+
+def test_predict_stream_counts_against_admission(client, api_key, monkeypatch, valid_payload):
+    import app.main as app_main
+
+    monkeypatch.setattr(app_main.admission, "max_in_flight", 0)
+    response = client.post(
+        "/predict/stream", content=_ndjson(json.dumps(valid_payload)), headers={"X-API-KEY": api_key}
+    )
+    assert response.status_code == 429
+    assert app_main.admission.in_flight == 0
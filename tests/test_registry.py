@@ -0,0 +1,99 @@
+import asyncio
+from copy import deepcopy
+
+import pytest
+
+import app.main as app_main
+from app.batching import MicroBatcher
+from app.registry import ModelRegistry, UnknownModelVersionError
+from app.schemas import PredictionInput
+
+
+class _FakeModel:
+    def __init__(self, version=None):
+        self.model_version = version
+        self.loaded_path = None
+        self.engine = None
+
+
+def _registry(max_bytes, loads, evicted):
+    default = _FakeModel("latest")
+
+    def load_version(model, version):
+        loads.append(version)
+        model.model_version = version
+        return True
+
+    registry = ModelRegistry(
+        default=lambda: default,
+        build=_FakeModel,
+        load_version=load_version,
+        list_versions=lambda: ["latest", "a", "b", "c"],
+        max_bytes=max_bytes,
+        on_evict=evicted.append,
+    )
+    return registry, default
+
+
+def test_registry_loads_lazily_once_and_pins_default(monkeypatch):
+    monkeypatch.setattr("app.registry.estimate_model_bytes", lambda model: 10)
+    loads, evicted = [], []
+    registry, default = _registry(max_bytes=100, loads=loads, evicted=evicted)
+
+    async def scenario():
+        first, second = await asyncio.gather(registry.get("a"), registry.get("a"))
+        return first, second, await registry.get(None), await registry.get("latest")
+
+    first, second, none_version, latest = asyncio.run(scenario())
+    assert first is second and first.model_version == "a"
+    assert none_version is default and latest is default
+    assert loads == ["a"]
+    with pytest.raises(UnknownModelVersionError):
+        asyncio.run(registry.get("z"))
+
+
+def test_registry_evicts_least_recently_used_under_budget(monkeypatch):
+    monkeypatch.setattr("app.registry.estimate_model_bytes", lambda model: 10)
+    loads, evicted = [], []
+    registry, default = _registry(max_bytes=20, loads=loads, evicted=evicted)
+
+    async def scenario():
+        a = await registry.get("a")
+        await registry.get("b")
+        await registry.get("a")  # "b" passa a ser o menos usado
+        await registry.get("c")
+        return a
+
+    a = asyncio.run(scenario())
+    assert [model.model_version for model in evicted] == ["b"]
+    assert registry.loaded_versions() == ["a", "c"]
+    assert registry.is_live(a) and registry.is_live(default)
+    assert not registry.is_live(evicted[0])
+
+
+def test_predict_selects_version_by_header_or_query(client, api_key, monkeypatch):
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    headers = {"X-API-KEY": api_key}
+
+    default = client.post("/predict", json=payload, headers=headers).json()
+    baseline = client.post("/predict", json=payload, headers={**headers, "X-Model-Version": "baseline"})
+    assert baseline.status_code == 200
+    assert baseline.json()["model_version"] == "baseline" != default["model_version"]
+
+    query = client.post("/predict/batch?model_version=baseline", json={"items": [payload]}, headers=headers)
+    assert query.json()["model_version"] == "baseline"
+
+    missing = client.post("/predict", json=payload, headers={**headers, "X-Model-Version": "inexistente"})
+    assert missing.status_code == 404
+
+
+def test_versions_get_separate_micro_batchers(monkeypatch):
+    default_batcher = MicroBatcher(lambda matrix: [], window_ms=1)
+    monkeypatch.setattr(app_main, "batcher", default_batcher)
+    monkeypatch.setattr(app_main, "version_batchers", {})
+    baseline = asyncio.run(app_main.registry.get("baseline"))
+
+    assert app_main._batcher_for(app_main.model) is default_batcher
+    version_batcher = app_main._batcher_for(baseline)
+    assert version_batcher is not default_batcher
+    assert app_main._batcher_for(baseline) is version_batcher
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+import app.main as app_main
+from app.reloader import ModelReloader, ReloadError, smoke_batch, validate_model
+from app.schemas import PredictionInput
+
+
+class _BrokenModel:
+    class_labels = {0: "a", 1: "b"}
+    model_version = "quebrado"
+
+    def predict_matrix(self, matrix):
+        return [{} for _ in matrix]
+
+    def predict_arrays(self, matrix):
+        return np.zeros(len(matrix), dtype=np.int64), np.full((len(matrix), 2), 0.7)
+
+
+class _VersionModel:
+    class_labels = {0: "a", 1: "b"}
+
+    def __init__(self, version, delay=0.0):
+        self.model_version = version
+        self.delay = delay
+
+    def predict_matrix(self, matrix):
+        time.sleep(self.delay)
+        return [{"model_version": self.model_version} for _ in matrix]
+
+    def predict_arrays(self, matrix):
+        return np.zeros(len(matrix), dtype=np.int64), np.full((len(matrix), 2), 0.5)
+
+
+def test_validate_model_rejects_bad_probabilities():
+    with pytest.raises(ReloadError, match="somam 1"):
+        validate_model(_BrokenModel(), smoke_batch(8))
+    validate_model(app_main.model, smoke_batch(8))
+
+
+def test_admin_reload_swaps_model_and_keeps_serving(client, api_key):
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    before = app_main.model
+    expected = client.post("/predict", json=payload, headers={"X-API-KEY": api_key}).json()
+
+    response = client.post("/admin/reload", headers={"X-API-KEY": api_key})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["version"] == body["previous_version"] == before.model_version
+    assert app_main.model is not before and app_main.model.is_loaded()
+
+    after = client.post("/predict", json=payload, headers={"X-API-KEY": api_key}).json()
+    assert after["probabilities"] == pytest.approx(expected["probabilities"])
+
+
+def test_failed_reload_keeps_current_model(client, api_key, monkeypatch):
+    before = app_main.model
+    monkeypatch.setattr(app_main.reloader, "_load", lambda candidate: False)
+    response = client.post("/admin/reload", headers={"X-API-KEY": api_key})
+    assert response.status_code == 500
+    assert app_main.model is before
+
+
+def test_in_flight_call_finishes_on_previous_model():
+    old, new = _VersionModel("v1", delay=0.2), _VersionModel("v2")
+    current = {"model": old}
+
+    def swap(candidate):
+        previous, current["model"] = current["model"], candidate
+        return previous
+
+    reloader = ModelReloader(lambda: new, lambda candidate: True, swap, smoke_rows=4)
+
+    async def scenario():
+        in_flight = asyncio.create_task(asyncio.to_thread(current["model"].predict_matrix, smoke_batch(1)))
+        await asyncio.sleep(0.05)
+        result = await reloader.reload()
+        return await in_flight, result
+
+    rows, result = asyncio.run(scenario())
+    assert rows[0]["model_version"] == "v1"
+    assert result == {**result, "previous_version": "v1", "version": "v2"}
+    assert current["model"] is new
+
+
+
+def test_swap_finishes_queued_batch_on_previous_model(monkeypatch):
+    old, new = _VersionModel("v1"), _VersionModel("v2")
+    monkeypatch.setattr(app_main.settings, "MICROBATCH_WINDOW_MS", 50)
+    monkeypatch.setattr(app_main, "prediction_cache", None)
+    monkeypatch.setattr(app_main, "model", old)
+    monkeypatch.setattr(app_main, "batcher", app_main._build_batcher(old))
+
+    async def scenario():
+        queued = asyncio.ensure_future(app_main.batcher.submit(smoke_batch(1)[0]))
+        await asyncio.sleep(0)
+        app_main.swap_model(new)
+        after = await app_main.batcher.submit(smoke_batch(1)[0])
+        result = await queued
+        await app_main.batcher.close()
+        return result, after
+
+    result, after = asyncio.run(scenario())
+    assert result["model_version"] == "v1"
+    assert after["model_version"] == "v2"
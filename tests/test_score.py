@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.score import DEFAULT_MODEL_PATH, PriceBins, Scorer, read_feature_matrix, score_file
+
+DATASET = "dataset_ready_for_ml.csv"
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return Scorer.load(DEFAULT_MODEL_PATH, engine="sklearn")
+
+
+def test_price_bins_match_pd_cut():
+    prices = pd.read_csv(DATASET)["price_per_night_usd"]
+    expected = pd.cut(prices, bins=5, labels=[0, 1, 2, 3, 4]).astype(int).to_numpy()
+    bins = PriceBins(prices.min(), prices.max())
+    assert np.array_equal(bins.categorize(prices.to_numpy()), expected)
+
+
+def test_score_file_is_independent_of_chunking_and_workers(tmp_path, scorer):
+    single = tmp_path / "single.csv"
+    pooled = tmp_path / "pooled.csv"
+
+    stats = score_file(DATASET, single, scorer, chunk_size=1000, workers=1, keep_columns=["id_hotel"])
+    score_file(DATASET, pooled, scorer, chunk_size=7, workers=2, keep_columns=["id_hotel"])
+
+    expected = pd.read_csv(single)
+    result = pd.read_csv(pooled)
+    assert stats["rows"] == len(expected) == len(pd.read_csv(DATASET))
+    assert list(result.columns[:4]) == ["id_hotel", "prediction", "prediction_label", "confidence"]
+    pd.testing.assert_frame_equal(result, expected)
+    probabilities = result.filter(like="prob_").to_numpy()
+    assert np.allclose(probabilities.sum(axis=1), 1.0)
+
+
+@pytest.mark.parametrize("dropped", [["price_per_night_usd", "price_category"], ["water_usage_index"]])
+def test_missing_source_columns_raise_readable_error(tmp_path, scorer, dropped):
+    frame = pd.read_csv(DATASET)
+    frame = frame.drop(columns=[column for column in dropped + ["water_consumption_ratio"] if column in frame])
+    path = tmp_path / "incompleto.csv"
+    frame.to_csv(path, index=False)
+    for call in (lambda: read_feature_matrix(path), lambda: score_file(path, tmp_path / "out.csv", scorer)):
+        with pytest.raises(ValueError, match="Colunas em falta") as excinfo:
+            call()
+        assert dropped[0] in str(excinfo.value)
@@ -0,0 +1,60 @@
+from copy import deepcopy
+
+import numpy as np
+
+from app.models import SustainabilityModel
+from app.schemas import BatchPredictionOutput, PredictionInput, PredictionOutput
+from app.utils.wire import COMPACT, FULL, shape_result
+
+
+def _payload():
+    return deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def test_full_response_matches_schema(client, api_key):
+    response = client.post("/predict", json=_payload(), headers={"X-API-KEY": api_key})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert PredictionOutput.model_validate(body).model_dump() == body
+    assert list(body["all_probabilities"].values()) == body["probabilities"]
+
+
+def test_compact_shape_drops_duplicate_probabilities(client, api_key):
+    headers = {"X-API-KEY": api_key}
+    full = client.post("/predict", json=_payload(), headers=headers).json()
+    compact = client.post("/predict?shape=compact", json=_payload(), headers=headers).json()
+    assert "all_probabilities" not in compact
+    assert compact == {key: value for key, value in full.items() if key != "all_probabilities"}
+
+    batch = client.post(
+        "/predict/batch?shape=compact", json={"items": [_payload(), {"rating": 9}]}, headers=headers
+    ).json()
+    assert batch["succeeded"] == 1 and batch["failed"] == 1
+    assert "all_probabilities" not in batch["results"][0]["result"]
+    assert batch["results"][1]["result"] is None and batch["results"][1]["error"]
+
+    invalid = client.post("/predict?shape=tiny", json=_payload(), headers=headers)
+    assert invalid.status_code == 422
+
+
+def test_batch_response_matches_schema(client, api_key):
+    response = client.post("/predict/batch", json={"items": [_payload()]}, headers={"X-API-KEY": api_key})
+    body = response.json()
+    assert BatchPredictionOutput.model_validate(body).model_dump() == body
+
+
+def test_shape_result_leaves_cached_result_untouched():
+    result = {"prediction": 1, "all_probabilities": {"Baixo": 1.0}}
+    assert shape_result(result, FULL) is result
+    assert shape_result(result, COMPACT) == {"prediction": 1}
+    assert "all_probabilities" in result
+
+
+def test_label_keys_follow_loaded_labels():
+    model = SustainabilityModel()
+    model.class_labels = {0: "A", 1: "B"}
+    model._mark_loaded()
+    result = model._format_result(1, np.array([0.25, 0.5, 0.25]), 1)
+    assert result["all_probabilities"] == {"A": 0.25, "B": 0.5, "Classe 2": 0.25}
+    assert result["prediction_label"] == "B" and result["confidence"] == 50.0
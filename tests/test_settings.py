@@ -29,3 +29,20 @@ def test_settings_invalid_cors(monkeypatch, tmp_path):
     except Exception as exc:
         assert "CORS_ORIGINS" in str(exc)
 
+
+
+def test_settings_load_env_example(monkeypatch, tmp_path):
+    filled = {
+        "API_KEY": "abc123",
+        "MODEL_REGISTRY_PATH": "./models/latest/model.pkl",
+        "METADATA_FILE": "./models/metadata.json",
+    }
+    lines = []
+    for line in open(".env.example", encoding="utf-8").read().splitlines():
+        name = line.split("=", 1)[0]
+        lines.append(f"{name}={filled[name]}" if name in filled else line)
+    env_file = tmp_path / ".env"
+    env_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.delenv("API_KEY", raising=False)
+    settings = Settings(_env_file=env_file)
+    assert settings.LOG_SAMPLE_RATES is None
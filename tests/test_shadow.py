@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from copy import deepcopy
+
+import pytest
+
+import app.main as app_main
+from app.schemas import PredictionInput
+from app.shadow import ShadowScorer
+
+
+class _StubModel:
+    def __init__(self, prediction, gate=None):
+        self.prediction = prediction
+        self.gate = gate
+
+    def predict_matrix(self, matrix):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [{"prediction": self.prediction}]
+
+
+def _scorer(candidate, **kwargs):
+    async def resolve():
+        return candidate
+
+    return ShadowScorer(resolve, **kwargs)
+
+
+def _wait_idle(scorer, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while scorer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scorer.pending == 0
+
+
+def test_shadow_aggregates_agreement_and_confusion():
+    scorer = _scorer(_StubModel(prediction=2), fraction=1.0)
+
+    async def scenario():
+        for primary in (2, 2, 3, 2):
+            await scorer.submit([0.0], {"prediction": primary}, primary_seconds=0.0)
+
+    asyncio.run(scenario())
+    _wait_idle(scorer)
+    summary = scorer.summary()
+    assert summary["compared"] == 4
+    assert summary["agreement_rate"] == pytest.approx(0.75)
+    assert summary["confusion"] == {"2->2": 3, "3->2": 1}
+    assert summary["mean_latency_delta_ms"] is not None
+    scorer.shutdown()
+
+
+def test_shadow_drops_work_when_worker_is_saturated():
+    gate = threading.Event()
+    scorer = _scorer(_StubModel(prediction=1, gate=gate), fraction=1.0, max_pending=2)
+
+    async def scenario():
+        for _ in range(5):
+            await scorer.submit([0.0], {"prediction": 1}, primary_seconds=0.0)
+
+    asyncio.run(scenario())
+    assert scorer.pending == 2
+    gate.set()
+    _wait_idle(scorer)
+    assert scorer.summary()["compared"] == 2
+    scorer.shutdown()
+
+
+def test_shadow_fraction_controls_sampling():
+    with pytest.raises(ValueError):
+        _scorer(_StubModel(0), fraction=1.5)
+    assert not any(_scorer(_StubModel(0), fraction=0.0).sample() for _ in range(100))
+    half = _scorer(_StubModel(0), fraction=0.5, seed=1)
+    sampled = sum(half.sample() for _ in range(1000))
+    assert 0 < sampled < 1000
+
+
+def test_predict_is_shadow_scored_by_candidate_version(client, api_key, monkeypatch):
+    scorer = ShadowScorer(lambda: app_main.registry.get("baseline"), fraction=1.0)
+    monkeypatch.setattr(app_main, "shadow", scorer)
+    monkeypatch.setattr(app_main.settings, "SHADOW_MODEL_VERSION", "baseline")
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+    response = client.post("/predict", json=payload, headers={"X-API-KEY": api_key})
+    assert response.status_code == 200
+    _wait_idle(scorer)
+    assert scorer.summary()["compared"] == 1
+
+    metrics = client.get("/metrics").text
+    assert "rihs_shadow_agreement_rate" in metrics
+    assert "rihs_shadow_comparisons_total" in metrics
+    scorer.shutdown()
@@ -0,0 +1,40 @@
+from joblib import effective_n_jobs
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml.thread_policy import ThreadPolicy
+
+
+def test_policy_splits_cores_between_workers_and_executor():
+    policy = ThreadPolicy(uvicorn_workers=2, concurrency=2, cpus=16)
+    assert policy.single_threads == 1
+    assert policy.batch_threads == 4
+    assert policy.threads_for(1) == 1
+    assert policy.threads_for(policy.batch_min_rows) == 4
+    # Nunca abaixo de uma thread, mesmo com mais workers do que cores
+    assert ThreadPolicy(uvicorn_workers=8, concurrency=4, cpus=2).batch_threads == 1
+    assert ThreadPolicy(batch_threads=3, cpus=16).batch_threads == 3
+
+
+def test_apply_clears_pickled_n_jobs_and_uses_call_context():
+    forest = RandomForestClassifier(n_estimators=2, n_jobs=-1)
+    pipeline = Pipeline([("scale", StandardScaler()), ("model", forest)])
+    policy = ThreadPolicy(concurrency=1, cpus=4, batch_min_rows=10)
+    policy.apply(pipeline)
+
+    assert forest.n_jobs is None
+    assert policy.estimator_n_jobs == {"RandomForestClassifier": None}
+    with policy.context(1):
+        assert effective_n_jobs(forest.n_jobs) == 1
+    with policy.context(10):
+        assert effective_n_jobs(forest.n_jobs) == 4
+
+
+def test_model_info_reports_thread_policy(client, api_key):
+    response = client.get("/model/info", headers={"X-API-KEY": api_key})
+    assert response.status_code == 200
+    threading = response.json()["threading"]
+    assert threading["single_threads"] == 1
+    assert threading["batch_threads"] >= 1
+    assert threading["estimator_n_jobs"]["RandomForestClassifier"] is None
@@ -0,0 +1,113 @@
+import json
+import os
+from copy import deepcopy
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.schemas import PredictionInput
+from app.tracing import (
+    _NOOP_SPAN,
+    FileSpanExporter,
+    Trace,
+    TracingMiddleware,
+    _current_trace,
+    current_trace,
+    span,
+)
+from app.utils.logging import timing_decorator
+
+
+def _traced_app(sample_rate=0.0, exporter=None):
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        with span("decode", format="json"):
+            with span("validate"):
+                pass
+        with span("inference", rows=3):
+            pass
+        return {"ok": True}
+
+    app.add_middleware(TracingMiddleware, sample_rate=sample_rate, exporter=exporter)
+    return app
+
+
+def test_span_without_trace_is_shared_noop():
+    assert current_trace() is None
+    with span("decode", format="json") as stage:
+        stage.set_attribute("rows", 1)
+    assert stage is _NOOP_SPAN
+
+
+def test_server_timing_lists_top_level_stages():
+    response = TestClient(_traced_app()).get("/work")
+    assert response.status_code == 200
+    entries = [part.split(";dur=") for part in response.headers["server-timing"].split(", ")]
+    assert [name for name, _ in entries] == ["decode", "inference", "total"]
+    durations = [float(value) for _, value in entries]
+    assert all(value >= 0 for value in durations)
+    assert durations[-1] >= durations[0] + durations[1]
+
+
+def test_sampled_traces_are_exported_as_otlp_json(tmp_path):
+    exporter = FileSpanExporter(tmp_path / "traces" / "spans.jsonl")
+    client = TestClient(_traced_app(sample_rate=1.0, exporter=exporter))
+    for _ in range(3):
+        client.get("/work")
+    exporter.shutdown()
+
+    lines = (tmp_path / "traces" / "spans.jsonl").read_text().splitlines()
+    assert len(lines) == 3
+    resource = json.loads(lines[0])["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "rihs-api"}
+    spans = {item["name"]: item for item in resource["scopeSpans"][0]["spans"]}
+    assert set(spans) == {"GET /work", "decode", "validate", "inference"}
+    root = spans["GET /work"]
+    assert "parentSpanId" not in root and root["kind"] == 2
+    assert spans["decode"]["parentSpanId"] == root["spanId"]
+    assert spans["validate"]["parentSpanId"] == spans["decode"]["spanId"]
+    assert {item["traceId"] for item in spans.values()} == {root["traceId"]}
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert int(root["endTimeUnixNano"]) >= int(spans["inference"]["endTimeUnixNano"])
+    assert {"key": "rows", "value": {"intValue": "3"}} in spans["inference"]["attributes"]
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+
+def test_exporter_drops_when_queue_is_full(tmp_path):
+    exporter = FileSpanExporter(tmp_path / "spans.jsonl", max_queue=1)
+    exporter._pid = os.getpid()  # sem thread: a fila não é esvaziada
+    trace = Trace("GET /", sampled=True)
+    trace.finish()
+    for _ in range(3):
+        exporter.export(trace)
+    assert exporter.dropped == 2
+
+
+def test_timing_decorator_records_span():
+    @timing_decorator
+    def load():
+        return 42
+
+    trace = Trace("job", sampled=False)
+    token = _current_trace.set(trace)
+    try:
+        assert load() == 42
+    finally:
+        _current_trace.reset(token)
+    assert [stage.name for stage in trace.spans] == ["load"]
+
+
+def test_predict_stages_with_tracing_enabled(api_key):
+    import app.main as app_main
+
+    app = FastAPI()
+    app.add_api_route("/predict", app_main.predict, methods=["POST"])
+    app.dependency_overrides = app_main.app.dependency_overrides
+    app.add_middleware(TracingMiddleware)
+    payload = deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+    response = TestClient(app).post("/predict", json=payload, headers={"X-API-KEY": api_key})
+    assert response.status_code == 200
+    names = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    assert names == ["read_body", "decode", "inference", "serialize", "total"]
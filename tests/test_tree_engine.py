@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from ml.tree_engine import (
+    CompiledForest,
+    compile_estimator,
+    compiled_path_for,
+    load_or_compile,
+    smoke_matrix,
+)
+
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    rng = np.random.default_rng(7)
+    X = rng.uniform(0, 100, size=(300, 6))
+    y = (X[:, 0] + X[:, 3] > 100).astype(int) + (X[:, 1] > 70).astype(int)
+    clf = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0).fit(X, y)
+    return clf, X
+
+
+def test_compiled_random_forest_matches_predict_proba(forest_and_data):
+    clf, X = forest_and_data
+    forest = compile_estimator(clf)
+    assert forest is not None
+    assert forest.n_trees == 25
+    for matrix in (X, X[:1], smoke_matrix(forest, rows=200)):
+        np.testing.assert_allclose(forest.predict_proba(matrix), clf.predict_proba(matrix), atol=1e-9)
+
+
+def test_compiled_forest_handles_missing_values(forest_and_data):
+    clf, X = forest_and_data
+    forest = compile_estimator(clf)
+    matrix = X[:20].copy()
+    matrix[::3, 0] = np.nan
+    probabilities = forest.predict_proba(matrix)
+    assert np.isfinite(probabilities).all()
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+
+
+def test_compiled_forest_roundtrip_and_cache(tmp_path, forest_and_data):
+    import joblib
+
+    clf, X = forest_and_data
+    artifact = tmp_path / "model.pkl"
+    joblib.dump(clf, artifact)
+
+    forest = load_or_compile(clf, artifact)
+    compiled_file = compiled_path_for(artifact)
+    assert compiled_file.exists()
+
+    reloaded = CompiledForest.load(compiled_file)
+    assert reloaded.source_sha256 == forest.source_sha256
+    np.testing.assert_allclose(reloaded.predict_proba(X), clf.predict_proba(X), atol=1e-9)
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")] == []
+
+
+def test_save_replaces_target_atomically(tmp_path, forest_and_data, monkeypatch):
+    forest = compile_estimator(forest_and_data[0])
+    target = tmp_path / "model.compiled.npz"
+    forest.save(target)
+    before = target.read_bytes()
+
+    def interrupted(handle):
+        handle.write(b"parcial")
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(forest, "_write_npz", interrupted)
+    with pytest.raises(OSError):
+        forest.save(target)
+    assert target.read_bytes() == before
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["model.compiled.npz"]
+
+
+def test_compile_unsupported_estimator_returns_none():
+    X = np.random.rand(20, 3)
+    clf = LogisticRegression().fit(X, np.arange(20) % 2)
+    assert compile_estimator(clf) is None
+    assert load_or_compile(clf) is None
+
+
+def test_compiled_xgboost_matches_predict_proba():
+    xgboost = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 1, size=(200, 5)).astype(np.float32)
+    y = (X[:, 0] * 3).astype(int)
+    clf = xgboost.XGBClassifier(n_estimators=15, max_depth=3, n_jobs=1).fit(X, y)
+    forest = compile_estimator(clf)
+    assert forest is not None
+    np.testing.assert_allclose(forest.predict_proba(X), clf.predict_proba(X), atol=1e-5)
+
+
+def test_sustainability_model_uses_compiled_engine(tmp_path, forest_and_data):
+    import json
+
+    import joblib
+
+    from app.models import SustainabilityModel
+    from app.utils.feature_aliases import CANONICAL_FEATURES
+
+    rng = np.random.default_rng(1)
+    X = rng.uniform(0, 1, size=(80, len(CANONICAL_FEATURES)))
+    y = rng.integers(0, 5, size=80)
+    clf = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    artifact = tmp_path / "model.pkl"
+    joblib.dump(clf, artifact)
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text(json.dumps({"version": "t"}), encoding="utf-8")
+
+    compiled = SustainabilityModel(engine="compiled")
+    assert compiled.load(model_path=str(artifact), metadata_path=str(metadata))
+    assert compiled.engine is not None
+
+    reference = SustainabilityModel(engine="sklearn")
+    assert reference.load(model_path=str(artifact), metadata_path=str(metadata))
+    assert reference.engine is None
+
+    for expected, actual in zip(reference.predict_matrix(X), compiled.predict_matrix(X)):
+        assert expected["prediction"] == actual["prediction"]
+        np.testing.assert_allclose(expected["probabilities"], actual["probabilities"], atol=1e-9)
+
+
+def test_early_exit_keeps_full_ensemble_prediction(forest_and_data):
+    clf, X = forest_and_data
+    forest = compile_estimator(clf)
+    full = forest.predict_proba(X)
+
+    probabilities, trees_used = forest.predict_proba_early(X, tree_chunk=2)
+    np.testing.assert_array_equal(probabilities.argmax(axis=1), full.argmax(axis=1))
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+    assert trees_used.max() <= forest.n_trees
+    assert trees_used.min() < forest.n_trees  # algumas linhas param antes do fim
+    finished = trees_used == forest.n_trees
+    np.testing.assert_allclose(probabilities[finished], full[finished], atol=1e-12)
+
+
+def test_early_exit_stops_at_deadline(forest_and_data):
+    clf, X = forest_and_data
+    forest = compile_estimator(clf)
+    _, trees_used = forest.predict_proba_early(X, tree_chunk=1, deadline=0.0)
+    # Apenas a primeira passagem (até ao primeiro ponto de paragem possível) é avaliada.
+    assert (trees_used == trees_used[0]).all()
+    assert trees_used[0] < forest.n_trees
+
+
+def test_early_exit_xgboost_keeps_prediction():
+    xgboost = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(5)
+    X = rng.uniform(0, 1, size=(200, 4)).astype(np.float32)
+    y = (X[:, 0] * 3).astype(int)
+    clf = xgboost.XGBClassifier(n_estimators=40, max_depth=2, n_jobs=1).fit(X, y)
+    forest = compile_estimator(clf)
+    probabilities, trees_used = forest.predict_proba_early(X, tree_chunk=3)
+    np.testing.assert_array_equal(probabilities.argmax(axis=1), clf.predict_proba(X).argmax(axis=1))
+    assert trees_used.min() < forest.n_trees
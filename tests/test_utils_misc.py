@@ -1,10 +1,14 @@
+import logging
+
 from app.utils.logging import setup_logging, timing_decorator
 from app.utils.security import verify_api_key
 
 
 def test_setup_logging_no_errors():
     # Apenas garante que a configuração não lança exceções
+    previous_level = logging.getLogger().level
     setup_logging()
+    setup_logging(level=previous_level)
 
 
 def test_timing_decorator_executes_function():
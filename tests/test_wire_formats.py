@@ -0,0 +1,116 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from app.schemas import PredictionInput
+from app.utils.wire import ARROW, JSON, MSGPACK, request_format, response_format
+
+msgpack = pytest.importorskip("msgpack")
+
+MSGPACK_TYPE = "application/msgpack"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+
+@pytest.fixture
+def valid_payload():
+    return deepcopy(PredictionInput.model_config["json_schema_extra"]["example"])
+
+
+def test_response_format_honours_accept_quality():
+    allowed = (JSON, MSGPACK)
+    assert response_format(None, allowed) == JSON
+    assert response_format("*/*", allowed) == JSON
+    assert response_format(f"{MSGPACK_TYPE}", allowed) == MSGPACK
+    assert response_format(f"application/json;q=0.5, {MSGPACK_TYPE}", allowed) == MSGPACK
+    assert response_format(f"{MSGPACK_TYPE};q=0.1, application/json", allowed) == JSON
+    # Arrow não é permitido neste endpoint: cai para JSON
+    assert response_format(ARROW_TYPE, allowed) == JSON
+
+
+def test_request_format_defaults_to_json():
+    assert request_format(None, (JSON,)) == JSON
+    assert request_format("text/plain", (JSON,)) == JSON
+    assert request_format(f"{MSGPACK_TYPE}; charset=binary", (JSON, MSGPACK)) == MSGPACK
+
+
+def test_predict_msgpack_round_trip_matches_json(client, api_key, valid_payload):
+    expected = client.post("/predict", json=valid_payload, headers={"X-API-KEY": api_key}).json()
+    response = client.post(
+        "/predict",
+        content=msgpack.packb(valid_payload),
+        headers={"X-API-KEY": api_key, "Content-Type": MSGPACK_TYPE, "Accept": MSGPACK_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK_TYPE
+    assert msgpack.unpackb(response.content) == expected
+
+
+def test_predict_rejects_arrow_and_bad_msgpack(client, api_key):
+    arrow = client.post(
+        "/predict", content=b"x", headers={"X-API-KEY": api_key, "Content-Type": ARROW_TYPE}
+    )
+    assert arrow.status_code == 415
+    broken = client.post(
+        "/predict", content=b"\xc1", headers={"X-API-KEY": api_key, "Content-Type": MSGPACK_TYPE}
+    )
+    assert broken.status_code == 400
+
+
+def test_predict_batch_msgpack_reports_item_errors(client, api_key, valid_payload):
+    invalid_payload = deepcopy(valid_payload)
+    invalid_payload["rating"] = 9.0
+    response = client.post(
+        "/predict/batch",
+        content=msgpack.packb({"items": [valid_payload, invalid_payload]}),
+        headers={"X-API-KEY": api_key, "Content-Type": MSGPACK_TYPE, "Accept": MSGPACK_TYPE},
+    )
+    assert response.status_code == 200
+    body = msgpack.unpackb(response.content)
+    assert body["succeeded"] == 1 and body["failed"] == 1
+    assert "rating" in body["results"][1]["error"]
+
+
+def test_predict_batch_arrow_round_trip(client, api_key, valid_payload):
+    pa = pytest.importorskip("pyarrow")
+    from app.utils.wire import features_to_arrow
+
+    invalid_payload = deepcopy(valid_payload)
+    invalid_payload["rating"] = 9.0
+    rows = [valid_payload, invalid_payload, valid_payload]
+
+    expected = client.post(
+        "/predict/batch", json={"items": rows}, headers={"X-API-KEY": api_key}
+    ).json()
+    response = client.post(
+        "/predict/batch",
+        content=features_to_arrow(rows),
+        headers={"X-API-KEY": api_key, "Content-Type": ARROW_TYPE, "Accept": ARROW_TYPE},
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("index").to_pylist() == [0, 1, 2]
+    assert table.schema.metadata[b"model_version"] == expected["model_version"].encode()
+
+    first = expected["results"][0]["result"]
+    assert table.column("prediction").to_pylist() == [first["prediction"], None, first["prediction"]]
+    assert table.column("prediction_label")[0].as_py() == first["prediction_label"]
+    assert table.column("confidence")[0].as_py() == pytest.approx(first["confidence"])
+    probabilities = [table.column(f"prob_{i}")[0].as_py() for i in range(len(first["probabilities"]))]
+    assert np.allclose(probabilities, first["probabilities"])
+    assert "rating" in table.column("error")[1].as_py()
+    assert table.column("error")[0].as_py() is None
+
+
+def test_predict_batch_arrow_rejects_missing_columns(client, api_key, valid_payload):
+    pytest.importorskip("pyarrow")
+    from app.utils.wire import features_to_arrow
+
+    del valid_payload["rating"]
+    response = client.post(
+        "/predict/batch",
+        content=features_to_arrow([valid_payload]),
+        headers={"X-API-KEY": api_key, "Content-Type": ARROW_TYPE},
+    )
+    assert response.status_code == 400
+    assert "rating" in response.json()["detail"]
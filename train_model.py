@@ -225,6 +225,29 @@ model_only_path = MODEL_OUTPUT_DIR / "model.pkl"
 joblib.dump(best_model, model_only_path)
 print(f"   ✓ Modelo (apenas) salvo em: {model_only_path}")
 
+# 9. Compilar o ensemble para o motor de inferência vectorizado
+from ml.tree_engine import compiled_path_for, load_or_compile
+
+compiled = load_or_compile(best_model, model_only_path)
+if compiled is not None:
+    print(f"   ✓ Motor compilado salvo em: {compiled_path_for(model_only_path)}")
+else:
+    print("   ⚠️  Estimador não suportado pelo motor compilado (usa predict_proba)")
+
+# 10. Registar o artefacto no manifesto (carregamento directo no arranque da API)
+from app.models import CLASS_LABELS
+from ml.manifest import MANIFEST_PATH, write_manifest
+
+write_manifest(
+    model_path,
+    MODEL_OUTPUT_DIR.name,
+    available_features,
+    CLASS_LABELS,
+    artifact_format="joblib-dict",
+    metadata=model_info["performance"],
+)
+print(f"   ✓ Manifesto actualizado em: {MANIFEST_PATH}")
+
 print("\n" + "=" * 80)
 print("TREINAMENTO CONCLUÍDO COM SUCESSO!")
 print("=" * 80)